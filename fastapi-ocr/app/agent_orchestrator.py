@@ -1,7 +1,6 @@
 import os
 import re
-import concurrent.futures
-from pymongo import MongoClient
+import asyncio
 from bson import ObjectId
 from dotenv import load_dotenv
 
@@ -18,9 +17,13 @@ from .tools.collection_analyzer import CollectionAnalyzer
 from .tools.risk_analysis_agent import RiskAnalysisAgent
 from .tools.cognitive_analysis import CognitiveAgent
 from .tools.sentiment_agent import SentimentAgent
+from .tools.fused_analysis_agent import FusedAnalysisAgent
 
 from .tools.llm_loader import load_llm 
 from .nlp_pipeline import clean_text
+from .mongo_registry import get_client
+from .rag_engine import StreamingCallback
+from src.single_flight import single_flight
 from .generators.chart_generator import generate_chart
 from .generators.report_generator import render_html_report
 
@@ -29,6 +32,10 @@ from langchain_core.output_parsers import StrOutputParser
 
 load_dotenv()
 
+# One JSON call for all requested analysis fields; individual agents only
+# run for fields the fused answer is missing or got wrong
+FUSED_ANALYSIS = os.getenv("FUSED_ANALYSIS", "true").lower() == "true"
+
 # --- SPECIALIZED LAW ENFORCEMENT PROMPTS ---
 LE_PROMPTS = {
     "criminal_profile": """
@@ -86,7 +93,8 @@ LE_PROMPTS = {
 class AgenticReportPipeline:
     def __init__(self):
         self.mongo_url = os.getenv("MONGO_URL")
-        self.client = MongoClient(self.mongo_url)
+        # Shared pooled client; a client per request leaked a whole pool each time
+        self.client = get_client(self.mongo_url)
         self.db = self.client[os.getenv("MONGO_DB_NAME")]
         self.collection = self.db["ocrrecords"] 
 
@@ -105,6 +113,7 @@ class AgenticReportPipeline:
         self.risk_agent = RiskAnalysisAgent()
         self.cognitive_agent = CognitiveAgent()
         self.sentiment_agent = SentimentAgent()
+        self.fused_agent = FusedAnalysisAgent()
         
         # ---------------------------------------------------------
         # PATH CONFIGURATION
@@ -134,13 +143,13 @@ class AgenticReportPipeline:
         clean = re.sub(r'[^\w\s-]', '', text).strip().lower()
         return re.sub(r'[-\s]+', '_', clean)
 
-    def _identify_document(self, text):
+    async def _identify_document(self, text):
         try:
             id_chain = PromptTemplate.from_template(
                 "Identify this document type (e.g., FIR, Statement, Invoice). Return ONLY the type name:\n{text}"
             ) | self.llm | StrOutputParser()
-            return id_chain.invoke({"text": text[:500]})
-        except:
+            return await id_chain.ainvoke({"text": text[:500]})
+        except Exception:
             return "Document"
 
     def _get_active_agents(self, report_type):
@@ -172,7 +181,7 @@ class AgenticReportPipeline:
 
         return active
 
-    def _generate_specialized_report(self, report_type, context, risks, sentiment, cognitive):
+    def _specialized_chain(self, report_type):
         rt = report_type.lower()
         template = None
 
@@ -187,18 +196,11 @@ class AgenticReportPipeline:
         
         if template:
             prompt = PromptTemplate.from_template(template)
-            chain = prompt | self.llm | StrOutputParser()
-            return chain.invoke({
-                "text": context,
-                "risks": risks,
-                "sentiment": sentiment,
-                "cognitive": cognitive
-            })
+            return prompt | self.llm | StrOutputParser()
         return None
 
-    def run(self, user_id: str, report_type: str, keyword: str = None, new_file_text: str = None):
-        print(f"\n--- 🚀 Pipeline Started for User: {user_id} ---")
-        print(f"📋 Report Type Requested: {report_type}")
+    def _load_text(self, user_id, keyword=None, new_file_text=None):
+        """Cleaned analysis text (document plus keyword history), or None if there is none."""
         # 1. Fetch Data
         current_text = new_file_text or ""
         user_query = self._get_user_query(user_id)
@@ -208,7 +210,7 @@ class AgenticReportPipeline:
             if last_record and "extractedText" in last_record:
                 current_text = last_record["extractedText"]
             else:
-                return {"success": False, "error": "No text available for analysis."}
+                return None
 
         # 2. Prepare Context (Limit size for speed)
         # Performance: Reduced history size from 2000 to 1000 chars per doc
@@ -222,7 +224,40 @@ class AgenticReportPipeline:
                 history_text = "\n".join([d.get('extractedText', '')[:1000] for d in docs])
 
         full_context = f"{current_text}\n{history_text}"
-        cleaned_text = clean_text(full_context)[:12000] 
+        return clean_text(full_context)[:12000]
+
+    def run(self, user_id: str, report_type: str, keyword: str = None, new_file_text: str = None, on_event=None):
+        """
+        Synchronous entry point: runs arun() on a private event loop.
+        Call it from a thread without a running loop; async code awaits
+        arun() directly.
+        """
+        return asyncio.run(self.arun(user_id, report_type, keyword, new_file_text, on_event))
+
+    # Concurrent identical requests (same user, type and input) share one run;
+    # streaming callers get their own so they receive their events
+    @single_flight(
+        "agentic_report",
+        key=lambda self, user_id, report_type, keyword=None, new_file_text=None, on_event=None:
+            None if on_event else (user_id, report_type, keyword, new_file_text),
+    )
+    async def arun(self, user_id: str, report_type: str, keyword: str = None, new_file_text: str = None, on_event=None):
+        """
+        Build a report. `on_event(event, data)`, when given, receives a
+        "stage" event as each analysis finishes and a "token" event for
+        every token of the final report text.
+
+        Agents run as coroutines on the event loop with their models' async
+        clients, so a report holds no threads while it waits on the LLM.
+        Mongo reads, chart drawing and file rendering go to worker threads.
+        """
+        emit = on_event or (lambda event, data: None)
+        print(f"\n--- 🚀 Pipeline Started for User: {user_id} ---")
+        print(f"📋 Report Type Requested: {report_type}")
+
+        cleaned_text = await asyncio.to_thread(self._load_text, user_id, keyword, new_file_text)
+        if cleaned_text is None:
+            return {"success": False, "error": "No text available for analysis."}
         
         # 3. Agent Execution
         active_agents = self._get_active_agents(report_type)
@@ -237,76 +272,106 @@ class AgenticReportPipeline:
         
         doc_identity = "Document"
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = {}
+        def record(task_type, res):
+            nonlocal doc_identity
+            emit("stage", {"name": task_type, "status": "done"})
+            if task_type == "identity":
+                doc_identity = res
+            elif isinstance(res, list):
+                results[task_type] = res
+            else:
+                results[task_type] = self._clean_llm_output(res)
 
-            # Always run ID
-            futures[executor.submit(self._identify_document, cleaned_text)] = "identity"
+        # Optimization: Use shorter text for sentiment/keywords if text is huge
+        short_text = cleaned_text[:4000]
 
-            # Optimization: Use shorter text for sentiment/keywords if text is huge
-            short_text = cleaned_text[:4000]
+        tasks = {"identity": (self._identify_document, cleaned_text)}  # Always run ID
 
-            if "summary" in active_agents:
-                futures[executor.submit(self.summarizer.run, cleaned_text)] = "summary"
-            
-            if "keywords" in active_agents:
-                futures[executor.submit(self.keyword_agent.run, short_text)] = "keywords"
-
-            if "decision" in active_agents:
-                futures[executor.submit(self.decision_agent.run, cleaned_text)] = "decisions"
-
-            if "trends" in active_agents:
-                futures[executor.submit(self.trend_agent.run, cleaned_text)] = "trends"
-
-            if "risks" in active_agents:
-                futures[executor.submit(self.risk_agent.run, cleaned_text)] = "risks"
-
-            if "sentiment" in active_agents:
-                # Sentiment usually works fine with less context
-                futures[executor.submit(self.sentiment_agent.run, short_text)] = "sentiment"
-
-            if "cognitive" in active_agents:
-                futures[executor.submit(self.cognitive_agent.run, cleaned_text)] = "cognitive"
-
-            if "chart" in active_agents and len(cleaned_text) > 200:
-                futures[executor.submit(self.data_extractor.run, cleaned_text, keyword or "Metrics")] = "chart_data"
-
-            for future in concurrent.futures.as_completed(futures):
-                task_type = futures[future]
-                try:
-                    res = future.result()
-                    if task_type == "identity":
-                        doc_identity = res
-                    elif task_type == "chart_data":
-                        if res and res.get("values"):
-                            # Save chart to static/reports so it is accessible via URL if needed
-                            results["chart_path"] = os.path.abspath(generate_chart(res))
-                    else:
-                        if isinstance(res, list):
-                            results[task_type] = res
-                        else:
-                            results[task_type] = self._clean_llm_output(res)
-                except Exception as e:
-                    print(f"⚠ Agent {task_type} failed: {e}")
+        if "summary" in active_agents:
+            tasks["summary"] = (self.summarizer.arun, cleaned_text)
+
+        if "keywords" in active_agents:
+            tasks["keywords"] = (self.keyword_agent.arun, short_text)
+
+        if "decision" in active_agents:
+            tasks["decisions"] = (self.decision_agent.arun, cleaned_text)
+
+        if "trends" in active_agents:
+            tasks["trends"] = (self.trend_agent.arun, cleaned_text)
+
+        if "risks" in active_agents:
+            tasks["risks"] = (self.risk_agent.arun, cleaned_text)
+
+        if "sentiment" in active_agents:
+            # Sentiment usually works fine with less context
+            tasks["sentiment"] = (self.sentiment_agent.arun, short_text)
+
+        if "cognitive" in active_agents:
+            tasks["cognitive"] = (self.cognitive_agent.arun, cleaned_text)
+
+        async def run_agent(task_type, agent_call, agent_input):
+            try:
+                record(task_type, await agent_call(agent_input))
+            except Exception as e:
+                print(f"⚠ Agent {task_type} failed: {e}")
+
+        async def run_chart():
+            try:
+                data = await self.data_extractor.arun(cleaned_text, keyword or "Metrics")
+                emit("stage", {"name": "chart_data", "status": "done"})
+                if data and data.get("values"):
+                    # Save chart to static/reports so it is accessible via URL if needed
+                    chart_file = await asyncio.to_thread(generate_chart, data)
+                    results["chart_path"] = os.path.abspath(chart_file)
+            except Exception as e:
+                print(f"⚠ Agent chart_data failed: {e}")
+
+        pending = []
+        if "chart" in active_agents and len(cleaned_text) > 200:
+            # Started first so chart extraction overlaps the fused call
+            pending.append(asyncio.create_task(run_chart()))
+
+        if FUSED_ANALYSIS and len(tasks) > 1:
+            # One prefill of the document instead of one per agent
+            fused = await self.fused_agent.arun(cleaned_text, list(tasks))
+            for task_type, res in fused.items():
+                record(task_type, res)
+                tasks.pop(task_type)
+            if tasks:
+                print(f"⚠ Fused analysis incomplete, falling back for: {sorted(tasks)}")
+
+        pending.extend(run_agent(task_type, *task) for task_type, task in tasks.items())
+        await asyncio.gather(*pending)
 
         # 4. Generate Final Report Content
-        specialized_report = self._generate_specialized_report(
-            report_type, cleaned_text, results["risks"], results["sentiment"], results["cognitive"]
-        )
+        emit("stage", {"name": "report", "status": "started"})
+        callbacks = [StreamingCallback(lambda token: emit("token", token))] if on_event else None
+        run_config = {"callbacks": callbacks} if callbacks else None
+
+        specialized_report = None
+        chain = self._specialized_chain(report_type)
+        if chain is not None:
+            specialized_report = await chain.ainvoke({
+                "text": cleaned_text,
+                "risks": results["risks"],
+                "sentiment": results["sentiment"],
+                "cognitive": results["cognitive"]
+            }, config=run_config)
 
         if specialized_report:
             report_text = self._clean_llm_output(specialized_report)
         else:
             try:
-                raw_report = self.format_agent.run(
+                raw_report = await self.format_agent.run_async(
                     summary=results["summary"],
                     keywords=results["keywords"],
                     trends=results["trends"],
                     decisions=results["decisions"],
-                    report_type=report_type
+                    report_type=report_type,
+                    callbacks=callbacks
                 )
                 report_text = self._clean_llm_output(raw_report)
-            except:
+            except Exception:
                 report_text = results["summary"]
 
         results["report"] = report_text 
@@ -319,7 +384,8 @@ class AgenticReportPipeline:
         # Call generator
         # FIX: Removed 'folder_path' argument to resolve TypeError. 
         # The render_html_report function definition likely does not accept this argument.
-        saved_file_path = render_html_report(
+        saved_file_path = await asyncio.to_thread(
+            render_html_report,
             results, 
             clean_name, 
             str(user_id)
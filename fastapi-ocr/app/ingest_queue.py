@@ -0,0 +1,325 @@
+# app/ingest_queue.py
+"""
+Durable ingest job queue backed by MongoDB.
+
+Documents waiting to be chunked and embedded are persisted as jobs before
+any work starts, so a crash or restart never loses them. A fixed pool of
+worker threads claims jobs atomically, which bounds CPU use no matter how
+bursty uploads are. Failed jobs are retried with exponential backoff, and
+submissions are rejected once the backlog is full instead of piling up.
+A worker renews its job's lease while the handler runs, so only jobs whose
+worker died are reclaimed, once the lease expires. Even then re-running an
+ingest only re-applies the same chunk ids.
+
+The backlog bound holds across processes: admission increments a counter
+document in Mongo and rolls back if that overshoots max_pending.
+
+Document texts are kept in GridFS under the job id, not in the job itself,
+so OCR texts beyond the 16 MB BSON limit can be queued; texts over
+INGEST_QUEUE_MAX_TEXT_BYTES are rejected up front.
+"""
+import os
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Optional
+
+import gridfs
+from dotenv import load_dotenv
+from pymongo import ASCENDING, ReturnDocument
+
+from .mongo_registry import get_db
+
+load_dotenv()
+
+INGEST_QUEUE_COLLECTION = os.getenv("INGEST_QUEUE_COLLECTION", "ingest_jobs")
+INGEST_QUEUE_WORKERS = int(os.getenv("INGEST_QUEUE_WORKERS", 2))
+INGEST_QUEUE_MAX_PENDING = int(os.getenv("INGEST_QUEUE_MAX_PENDING", 500))
+INGEST_QUEUE_MAX_ATTEMPTS = int(os.getenv("INGEST_QUEUE_MAX_ATTEMPTS", 3))
+INGEST_QUEUE_RETRY_SECONDS = float(os.getenv("INGEST_QUEUE_RETRY_SECONDS", 10))
+INGEST_QUEUE_LEASE_SECONDS = float(os.getenv("INGEST_QUEUE_LEASE_SECONDS", 900))
+INGEST_QUEUE_POLL_SECONDS = float(os.getenv("INGEST_QUEUE_POLL_SECONDS", 2))
+INGEST_QUEUE_MAX_TEXT_BYTES = int(os.getenv("INGEST_QUEUE_MAX_TEXT_BYTES", 200 * 1024 * 1024))  # UTF-8 size
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Counter document holding the number of queued plus running jobs
+_PENDING_COUNTER = "pending"
+
+
+class QueueFullError(Exception):
+    """Raised when the backlog already holds INGEST_QUEUE_MAX_PENDING jobs."""
+
+
+class TextTooLargeError(Exception):
+    """Raised when a document text exceeds INGEST_QUEUE_MAX_TEXT_BYTES."""
+
+
+class IngestQueue:
+    """Mongo-backed job queue with a bounded pool of worker threads."""
+
+    def __init__(
+        self,
+        handler: Callable[[str, dict], object],
+        collection=None,
+        workers: int = INGEST_QUEUE_WORKERS,
+        max_pending: int = INGEST_QUEUE_MAX_PENDING,
+        max_attempts: int = INGEST_QUEUE_MAX_ATTEMPTS,
+        retry_seconds: float = INGEST_QUEUE_RETRY_SECONDS,
+        lease_seconds: float = INGEST_QUEUE_LEASE_SECONDS,
+        max_text_bytes: int = INGEST_QUEUE_MAX_TEXT_BYTES,
+    ):
+        """
+        Args:
+            handler: Called as handler(text, metadata) for every job
+            collection: Jobs collection (default INGEST_QUEUE_COLLECTION)
+            workers: Jobs processed concurrently
+            max_pending: Queued plus running jobs accepted before rejecting
+            max_attempts: Attempts before a job is marked failed
+            retry_seconds: Backoff before the first retry (doubles each time)
+            lease_seconds: A running job whose lease is not renewed within
+                this time (its worker died) is reclaimed
+            max_text_bytes: Largest document text (UTF-8 bytes) accepted
+        """
+        self.handler = handler
+        self.collection = collection if collection is not None else get_db()[INGEST_QUEUE_COLLECTION]
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.lease_seconds = lease_seconds
+        self.max_text_bytes = max_text_bytes
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self.counters = self.collection.database[f"{self.collection.name}_counters"]
+        self.texts = gridfs.GridFS(self.collection.database, collection=f"{self.collection.name}_texts")
+
+        self.collection.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        self.collection.create_index([("status", ASCENDING), ("lease_until", ASCENDING)])
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def pending(self) -> int:
+        """Jobs queued or running."""
+        return self.collection.count_documents({"status": {"$in": [QUEUED, RUNNING]}})
+
+    def _admit(self, delta: int) -> int:
+        counter = self.counters.find_one_and_update(
+            {"_id": _PENDING_COUNTER},
+            {"$inc": {"n": delta}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["n"]
+
+    def _resync(self):
+        # Repairs drift from a process that died between a job finishing and
+        # its decrement; runs at start-up
+        self.counters.update_one({"_id": _PENDING_COUNTER}, {"$set": {"n": self.pending()}}, upsert=True)
+
+    def submit(self, text: str, metadata: dict) -> str:
+        """
+        Persist a document for embedding.
+
+        Args:
+            text: Document text
+            metadata: Chunk metadata (user_id, source, ...)
+
+        Returns:
+            Job id
+
+        Raises:
+            TextTooLargeError: If the text exceeds max_text_bytes
+            QueueFullError: If the backlog is full
+        """
+        data = text.encode("utf-8")
+        if len(data) > self.max_text_bytes:
+            raise TextTooLargeError(
+                f"Document text is {len(data)} bytes; the limit is {self.max_text_bytes} bytes"
+            )
+
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        # Atomic across processes: concurrent submits cannot overshoot the bound
+        if self._admit(1) > self.max_pending:
+            self._admit(-1)
+            raise QueueFullError(f"Ingest queue is full ({self.max_pending} pending jobs)")
+        try:
+            self.texts.put(data, _id=job_id, filename=metadata.get("source"))
+            self.collection.insert_one({
+                "_id": job_id,
+                "status": QUEUED,
+                "text_id": job_id,
+                "metadata": metadata,
+                "attempts": 0,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+                "next_attempt_at": now,
+                "lease_until": None,
+                "lease_token": None,
+            })
+        except Exception:
+            self._admit(-1)
+            self._delete_text(job_id)
+            raise
+        self._wake.set()
+        return job_id
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """
+        Public view of a job (without its text).
+
+        Args:
+            job_id: Id returned by submit
+
+        Returns:
+            Job status dictionary, or None for an unknown id
+        """
+        job = self.collection.find_one({"_id": job_id}, {"text": 0, "text_id": 0})
+        if job is None:
+            return None
+        job["job_id"] = job.pop("_id")
+        job.pop("lease_until", None)
+        job.pop("lease_token", None)
+        return job
+
+    def stats(self) -> dict:
+        """Job counts by status, for /metrics."""
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for row in self.collection.aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["n"]
+        counts["workers"] = self.workers
+        counts["max_pending"] = self.max_pending
+        return counts
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def _load_text(self, job: dict) -> str:
+        if job.get("text_id") is None:
+            # Queued before texts moved to GridFS
+            return job.get("text", "")
+        return self.texts.get(job["text_id"]).read().decode("utf-8")
+
+    def _delete_text(self, text_id):
+        try:
+            self.texts.delete(text_id)
+        except Exception as e:
+            print(f"⚠ Ingest queue: could not delete text {text_id}: {e}")
+
+    def _claim(self) -> Optional[dict]:
+        now = time.time()
+        return self.collection.find_one_and_update(
+            {"$or": [
+                {"status": QUEUED, "next_attempt_at": {"$lte": now}},
+                # Worker died (crash, restart) while holding the job
+                {"status": RUNNING, "lease_until": {"$lt": now}},
+            ]},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "lease_until": now + self.lease_seconds,
+                    "lease_token": uuid.uuid4().hex,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _finish(self, job: dict, error: Optional[str]):
+        now = time.time()
+        if error is None:
+            # The text is no longer needed once the chunks are stored
+            update = {"$set": {"status": DONE, "error": None, "updated_at": now}, "$unset": {"text": "", "text_id": ""}}
+        elif job["attempts"] < self.max_attempts:
+            backoff = self.retry_seconds * 2 ** (job["attempts"] - 1)
+            update = {"$set": {"status": QUEUED, "error": error, "next_attempt_at": now + backoff, "updated_at": now}}
+        else:
+            update = {"$set": {"status": FAILED, "error": error, "updated_at": now}}
+
+        # Only the current lease holder records a result (and decrements once)
+        result = self.collection.update_one({"_id": job["_id"], "lease_token": job["lease_token"]}, update)
+        if result.modified_count and update["$set"]["status"] in (DONE, FAILED):
+            self._admit(-1)
+        if result.modified_count and error is None and job.get("text_id") is not None:
+            self._delete_text(job["text_id"])
+
+    def _renew(self, job: dict, done: threading.Event):
+        # Heartbeat: keep the lease ahead of the clock while the handler runs
+        interval = max(1.0, self.lease_seconds / 3)
+        while not done.wait(interval):
+            try:
+                self.collection.update_one(
+                    {"_id": job["_id"], "lease_token": job["lease_token"]},
+                    {"$set": {"lease_until": time.time() + self.lease_seconds}},
+                )
+            except Exception as e:
+                print(f"⚠ Ingest queue: could not renew lease for {job['_id']}: {e}")
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"⚠ Ingest queue: claim failed: {e}")
+                job = None
+
+            if job is None:
+                self._wake.wait(INGEST_QUEUE_POLL_SECONDS)
+                self._wake.clear()
+                continue
+
+            if job["attempts"] > self.max_attempts:
+                # Reclaimed after its last attempt died with the worker
+                self._finish(job, job.get("error") or "Worker lost while processing the job")
+                continue
+
+            source = job.get("metadata", {}).get("source", "unknown")
+            done = threading.Event()
+            renewer = threading.Thread(target=self._renew, args=(job, done), daemon=True)
+            renewer.start()
+            try:
+                self.handler(self._load_text(job), job.get("metadata", {}))
+                error = None
+            except Exception as e:
+                traceback.print_exc()
+                error = f"{type(e).__name__}: {e}"
+                print(f"⚠ Ingest queue: {source} attempt {job['attempts']} failed: {error}")
+            finally:
+                done.set()
+
+            try:
+                self._finish(job, error)
+            except Exception as e:
+                # The lease expires and the job is picked up again
+                print(f"⚠ Ingest queue: could not record result for {job['_id']}: {e}")
+
+    def start(self):
+        """Start the worker threads (idempotent)."""
+        if self._threads:
+            return
+        self._stop.clear()
+        self._resync()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"✔ Ingest queue: {self.workers} workers, {self.pending()} jobs pending")
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop claiming new jobs. A job still running when the process exits
+        keeps its lease and is retried after it expires.
+        """
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
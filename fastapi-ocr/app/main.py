@@ -1,4 +1,5 @@
 import os
+import asyncio
 import subprocess
 import sys
 import traceback
@@ -6,10 +7,10 @@ import re
 import json
 import time
 import threading
-from typing import Optional
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from typing import List, Optional
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import requests
@@ -30,9 +31,29 @@ try:
     from src import vector_store
     from src import rag_chain
     from src import utils
+    from src.bulk_ingest import BulkIngestor
+    from src.embeddings import embedding_metrics
+    from src.answer_cache import get_answer_cache
     from .ocr_utils import extract_text_from_file, collection as mongo_ocr_col
     from .agent_orchestrator import AgenticReportPipeline
-    from .rag_engine import chat_with_video
+    from src.llm_scheduler import BATCH, INTERACTIVE, llm_request
+    from src.single_flight import single_flight_stats
+    from .tools.llm_loader import llm_cache_stats, llm_scheduler_stats
+    from .mongo_registry import warm_up as warm_up_mongo, pool_metrics, close_all as close_mongo_clients
+    from .ingest_queue import QueueFullError, TextTooLargeError
+    from .rag_engine import (
+        chat_with_video,
+        StreamingCallback,
+        vector_index_stats,
+        keyword_index_stats,
+        ingest_filter_stats,
+        close_vector_index,
+        store_embeddings_async,
+        ingest_job_status,
+        ingest_queue_stats,
+        start_ingest_queue,
+        stop_ingest_queue,
+    )
 except ImportError as e:
     print(f"❌ Startup Import Error: {e}")
 
@@ -84,6 +105,15 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     start_ollama_server()
+    await run_in_threadpool(warm_up_mongo)
+    # Jobs left queued (or running) by a previous process resume here
+    await run_in_threadpool(start_ingest_queue)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_ingest_queue()
+    close_vector_index()
+    close_mongo_clients()
 
 # ============================================================
 # STREAM UTILITIES (ORIGINAL + EXTENDED)
@@ -95,6 +125,66 @@ def stream(event: str, data):
 def stream_related(data):
     stream("related", data)
 
+def discard_event(event: str, data):
+    pass
+
+_STREAM_END = object()
+_stream_tasks = set()
+
+def wants_stream(requested: bool, request: Request) -> bool:
+    return requested or "text/event-stream" in request.headers.get("accept", "")
+
+def sse_response(worker, *args) -> StreamingResponse:
+    """
+    Run an async worker and stream its events to the client as
+    Server-Sent Events.
+
+    The worker is awaited as worker(*args, emit) and reports progress with
+    emit(event, data), from the event loop or from any thread it uses. Its
+    return value is sent as the final "done" event, or an "error" event if
+    it raises. Events emitted after the client disconnects are dropped.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    closed = threading.Event()
+
+    def emit(event, data):
+        if not closed.is_set():
+            loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    async def run():
+        try:
+            emit("done", await worker(*args, emit))
+        except HTTPException as e:
+            emit("error", {"status": e.status_code, "detail": e.detail})
+        except Exception as e:
+            traceback.print_exc()
+            emit("error", {"status": 500, "detail": str(e)})
+        finally:
+            emit(_STREAM_END, None)
+
+    async def body():
+        # Keep a reference so the task outlives a disconnected client
+        task = asyncio.create_task(run())
+        _stream_tasks.add(task)
+        task.add_done_callback(_stream_tasks.discard)
+        try:
+            while True:
+                event, data = await events.get()
+                if event is _STREAM_END:
+                    break
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # The worker is left to finish: other requests may be coalesced
+            # onto its LLM calls, and its results still warm the caches
+            closed.set()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # ============================================================
 # MODELS (ORIGINAL)
 # ============================================================
@@ -102,6 +192,7 @@ class ChatRequest(BaseModel):
     user_id: str
     query: str
     link: Optional[str] = None
+    stream: bool = False
 
 class ChatResponse(BaseModel):
     answer: str
@@ -110,52 +201,59 @@ class IngestRequest(BaseModel):
     user_id: str
     url: str
 
+class BulkIngestRequest(BaseModel):
+    user_id: str
+    urls: List[str] = []
+    playlist: Optional[str] = None  # Raw playlist export / pasted URL list
+
+class DocumentIngestRequest(BaseModel):
+    user_id: str
+    text: str
+    source: Optional[str] = None
+    metadata: dict = {}
+
 class ReportRequest(BaseModel):
     user_id: str
     report_type: str
     keyword: Optional[str] = None
     new_file_text: Optional[str] = None
+    stream: bool = False
 
 # ============================================================
 # WORKERS
 # ============================================================
 
-def generate_related_content(req: ReportRequest):
-    time.sleep(2)
-    stream_related([
+def generate_related_content(req: ReportRequest, emit=discard_event):
+    emit("related", [
         f"Key compliance point for {req.report_type}",
         f"Risk factors related to {req.keyword or 'context'}",
         "Suggested next actions"
     ])
 
-def report_worker(req: ReportRequest) -> dict:
-    stream("status", "started")
-    stream("text", "Initializing report pipeline...")
-
-    # 🔥 PARALLEL RELATED CONTENT
-    threading.Thread(
-        target=generate_related_content,
-        args=(req,),
-        daemon=True
-    ).start()
+async def report_worker(req: ReportRequest, emit=discard_event) -> dict:
+    emit("status", "started")
+    generate_related_content(req, emit)
 
-    pipeline = AgenticReportPipeline()
+    # Construction loads models and connects to Mongo; keep it off the loop
+    pipeline = await run_in_threadpool(AgenticReportPipeline)
 
-    for step in range(1, 6):
-        time.sleep(1)
-        stream("text", f"Processing step {step}/5")
-
-    result = pipeline.run(
-        user_id=req.user_id,
-        report_type=req.report_type,
-        keyword=req.keyword,
-        new_file_text=req.new_file_text
-    )
+    with llm_request(BATCH, req.user_id):
+        result = await pipeline.arun(
+            user_id=req.user_id,
+            report_type=req.report_type,
+            keyword=req.keyword,
+            new_file_text=req.new_file_text,
+            on_event=None if emit is discard_event else emit
+        )
 
-    stream("status", "completed")
+    emit("status", "completed")
     return result
 
-def chat_worker(payload: ChatRequest) -> dict:
+def chat_context(payload: ChatRequest):
+    """
+    Blocking part of a chat turn: resolve and load the vector store and
+    consult the answer cache. Returns (manager, cache entry, cached answer).
+    """
     if not payload.query:
         raise HTTPException(status_code=400, detail="Query is required")
 
@@ -177,7 +275,7 @@ def chat_worker(payload: ChatRequest) -> dict:
     context_id = active_context_id or payload.user_id
     print(f"💬 Chat | Context: {context_id}")
 
-    manager = vector_store.VectorStoreManager(context_id)
+    manager = vector_store.VectorStoreManager(context_id, user_id=payload.user_id)
 
     if payload.link and active_context_id:
         fetcher = transcript_fetcher.TranscriptFetcher()
@@ -194,32 +292,67 @@ def chat_worker(payload: ChatRequest) -> dict:
                 detail="No active context found. Provide a link first."
             )
 
-    retriever = manager.get_retriever()
-    rag = rag_chain.RAGChain(retriever)
-    raw_answer = rag.query(payload.query)
+    # Near-identical questions about an unchanged context reuse the answer
+    answer_cache = get_answer_cache()
+    if not answer_cache:
+        return manager, None, None
+    version = answer_cache.version(manager.video_id)
+    query_vector = manager.embeddings.embed_query(payload.query)
+    cached = answer_cache.lookup(manager.video_id, query_vector, question=payload.query)
+    return manager, (answer_cache, query_vector, version), cached
+
+async def chat_worker(payload: ChatRequest, emit=discard_event) -> dict:
+    # Interactive: served ahead of report generation by the LLM scheduler
+    with llm_request(INTERACTIVE, payload.user_id):
+        manager, cache_entry, cached = await run_in_threadpool(chat_context, payload)
+        if cached is not None:
+            return {"answer": cached}
+
+        retriever = manager.get_retriever()
+        rag = rag_chain.RAGChain(retriever)
+        callbacks = None
+        if emit is not discard_event:
+            callbacks = [StreamingCallback(lambda token: emit("token", token))]
+        raw_answer = await rag.aquery(payload.query, callbacks=callbacks)
+        answer = clean_ai_response(raw_answer)
+
+        if cache_entry and not raw_answer.startswith("Error generating response"):
+            answer_cache, query_vector, version = cache_entry
+            answer_cache.store(
+                manager.video_id, query_vector, answer, version=version, question=payload.query
+            )
+
+        return {"answer": answer}
 
-    return {"answer": clean_ai_response(raw_answer)}
+def ingest_worker(video_id: str, user_id: str = None):
+    fetcher = transcript_fetcher.TranscriptFetcher()
+    transcript_text = fetcher.fetch_transcript(video_id)
+
+    manager = vector_store.VectorStoreManager(video_id, user_id=user_id)
+    manager.create_vector_store(transcript_text)
 
 # ============================================================
 # ENDPOINTS (ORIGINAL)
 # ============================================================
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(payload: ChatRequest):
+async def chat_endpoint(payload: ChatRequest, request: Request):
+    if wants_stream(payload.stream, request):
+        return sse_response(chat_worker, payload)
     try:
-        return await run_in_threadpool(chat_worker, payload)
+        return await chat_worker(payload)
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/agentic-report")
-async def agentic_report(req: ReportRequest):
+async def agentic_report(req: ReportRequest, request: Request):
+    if wants_stream(req.stream, request):
+        return sse_response(report_worker, req)
     try:
-        result = await run_in_threadpool(report_worker, req)
+        result = await report_worker(req)
         return JSONResponse(content=result)
     except Exception as e:
         traceback.print_exc()
-        stream("status", "failed")
-        stream("error", str(e))
         return JSONResponse({"success": False, "error": str(e)}, status_code=500)
 
 @app.post("/ingest")
@@ -229,16 +362,61 @@ async def ingest_link(req: IngestRequest):
         if not video_id:
             raise HTTPException(status_code=400, detail="Invalid YouTube URL")
 
-        fetcher = transcript_fetcher.TranscriptFetcher()
-        transcript_text = fetcher.fetch_transcript(video_id)
-
-        manager = vector_store.VectorStoreManager(video_id)
-        manager.create_vector_store(transcript_text)
+        await run_in_threadpool(ingest_worker, video_id, req.user_id)
 
         return {"success": True, "video_id": video_id}
     except Exception as e:
         return JSONResponse({"success": False, "error": str(e)}, status_code=500)
 
+@app.post("/ingest/bulk")
+async def ingest_bulk(req: BulkIngestRequest):
+    """
+    Ingests many videos concurrently and streams one NDJSON status line per
+    item as it completes, followed by a final "done" summary line.
+    """
+    video_ids = utils.extract_video_ids("\n".join(req.urls + [req.playlist or ""]))
+    if not video_ids:
+        raise HTTPException(status_code=400, detail="No valid YouTube URLs found")
+    if len(video_ids) > config.BULK_INGEST_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many videos ({len(video_ids)}). Limit is {config.BULK_INGEST_MAX_ITEMS}."
+        )
+
+    print(f"📥 Bulk Ingest | User: {req.user_id} | Videos: {len(video_ids)}")
+    ingestor = await run_in_threadpool(BulkIngestor)
+
+    async def event_lines():
+        async for event in ingestor.ingest(video_ids, user_id=req.user_id):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
+@app.post("/ingest/document", status_code=202)
+async def ingest_document(req: DocumentIngestRequest):
+    """
+    Queues a document for embedding and returns its job id at once.
+    Poll /ingest/jobs/{job_id} for progress; 429 means the queue is full,
+    413 that the text is over INGEST_QUEUE_MAX_TEXT_BYTES.
+    """
+    metadata = {**req.metadata, "user_id": req.user_id}
+    if req.source:
+        metadata["source"] = req.source
+    try:
+        job_id = await store_embeddings_async(req.text, metadata)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    except TextTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"success": True, "job_id": job_id, "status": "queued"}
+
+@app.get("/ingest/jobs/{job_id}")
+async def ingest_job(job_id: str):
+    job = await run_in_threadpool(ingest_job_status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job
+
 @app.post("/ocr")
 async def ocr_endpoint(file: UploadFile = File(...)):
     filename = file.filename
@@ -249,6 +427,21 @@ async def ocr_endpoint(file: UploadFile = File(...)):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    return {
+        "embeddings": embedding_metrics(),
+        "vector_index": vector_index_stats(),
+        "keyword_index": keyword_index_stats(),
+        "ingest_filter": ingest_filter_stats(),
+        "answer_cache": get_answer_cache().stats() if get_answer_cache() else None,
+        "llm_cache": llm_cache_stats(),
+        "llm_scheduler": llm_scheduler_stats(),
+        "single_flight": single_flight_stats(),
+        "mongo_pool": pool_metrics(),
+        "ingest_queue": await run_in_threadpool(ingest_queue_stats),
+    }
+
 # ============================================================
 # CLI STREAM MODE (UNCHANGED)
 # ============================================================
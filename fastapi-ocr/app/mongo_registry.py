@@ -0,0 +1,169 @@
+# app/mongo_registry.py
+"""
+Process-wide MongoDB client registry.
+
+Every module gets its client from here instead of constructing its own, so
+the process keeps one warm connection pool per cluster and requests never
+pay for TCP/TLS setup. Pool sizes and timeouts come from the environment,
+and a pool listener exposes connection metrics for /metrics.
+"""
+import os
+import threading
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, monitoring
+
+load_dotenv()
+
+MONGO_URL = os.getenv("MONGO_URL")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 5))  # Kept open and warm
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 60000))
+
+
+# =========================================================
+# POOL METRICS
+# =========================================================
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Counts connection pool events across every registered client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {
+            "created": 0,
+            "closed": 0,
+            "checked_out": 0,
+            "checked_in": 0,
+            "checkout_failed": 0,
+            "pool_cleared": 0,
+        }
+        self.checkout_wait_ms_total = 0.0
+
+    def _bump(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._bump("pool_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._bump("created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._bump("closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._bump("checkout_failed")
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.counts["checked_out"] += 1
+            # duration is only reported by pymongo >= 4.7
+            duration = getattr(event, "duration", None)
+            if duration is not None:
+                self.checkout_wait_ms_total += duration * 1000
+
+    def connection_checked_in(self, event):
+        self._bump("checked_in")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            checkouts = counts["checked_out"]
+            wait_total = self.checkout_wait_ms_total
+        counts["open"] = counts["created"] - counts["closed"]
+        counts["in_use"] = counts["checked_out"] - counts["checked_in"]
+        counts["avg_checkout_wait_ms"] = round(wait_total / checkouts, 3) if checkouts else 0.0
+        return counts
+
+
+_metrics = PoolMetrics()
+_clients = {}
+_lock = threading.Lock()
+
+
+# =========================================================
+# REGISTRY
+# =========================================================
+def get_client(url: str = None) -> MongoClient:
+    """
+    Shared MongoClient for a connection string, created on first use.
+
+    Args:
+        url: Connection string (default MONGO_URL)
+
+    Returns:
+        MongoClient shared by the whole process
+    """
+    url = url or MONGO_URL
+    client = _clients.get(url)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(url)
+        if client is None:
+            client = MongoClient(
+                url,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                event_listeners=[_metrics],
+            )
+            _clients[url] = client
+    return client
+
+
+def get_db(name: str = None):
+    """Database handle on the shared client (default MONGO_DB_NAME)."""
+    return get_client()[name or MONGO_DB_NAME]
+
+
+def warm_up():
+    """Open the pool before the first request (called on startup)."""
+    try:
+        get_client().admin.command("ping")
+        print(f"✔ MongoDB pool ready (min {MONGO_MIN_POOL_SIZE}, max {MONGO_MAX_POOL_SIZE})")
+    except Exception as e:
+        print(f"⚠ MongoDB warm-up failed: {e}")
+
+
+def pool_metrics() -> dict:
+    """Connection pool counters for /metrics."""
+    metrics = _metrics.snapshot()
+    metrics["clients"] = len(_clients)
+    metrics["max_pool_size"] = MONGO_MAX_POOL_SIZE
+    return metrics
+
+
+def close_all():
+    """Close every registered client (called on shutdown)."""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
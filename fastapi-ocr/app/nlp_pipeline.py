@@ -1,16 +1,17 @@
 # app/nlp_pipeline.py
 import os
 import re
-from pymongo import MongoClient
 from dotenv import load_dotenv
 
+from .mongo_registry import get_client
+
 load_dotenv()
 
 MONGO_URL = os.getenv("MONGO_URL")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 OCR_COLLECTION = os.getenv("OCR_COLLECTION", "ocrrecords")
 
-client = MongoClient(MONGO_URL)
+client = get_client(MONGO_URL)
 db = client[MONGO_DB_NAME]
 collection = db[OCR_COLLECTION]
 
@@ -10,7 +10,6 @@ import base64
 from datetime import datetime
 from PIL import Image
 from docx import Document
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from fpdf import FPDF
 from bs4 import BeautifulSoup
@@ -27,6 +26,8 @@ from youtube_transcript_api import (
     NoTranscriptFound,
 )
 
+from .mongo_registry import get_client
+
 # ----------------------------
 # Environment and MongoDB Setup
 # ----------------------------
@@ -39,7 +40,7 @@ OCR_COLLECTION = os.getenv("OCR_COLLECTION", "ocrrecords")
 if not MONGO_URL or not MONGO_DB_NAME:
     raise ValueError("MONGO_URL or MONGO_DB_NAME is not set in .env file.")
 
-mongo_client = MongoClient(MONGO_URL)
+mongo_client = get_client(MONGO_URL)
 db = mongo_client[MONGO_DB_NAME]
 collection = db[OCR_COLLECTION]
 
@@ -2,12 +2,11 @@
 
 import os
 import asyncio
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from pymongo import MongoClient
 from dotenv import load_dotenv
 
 # ---------------- EXISTING IMPORTS ----------------
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_mongodb import MongoDBAtlasVectorSearch
 
@@ -30,11 +29,38 @@ except ImportError:
         def render_html_report(data, report_type, user_id):
             return f"PDF generator missing. Content: {data.get('title')}"
 
+# ---------------- SHARED MONGO CLIENT ----------------
+from .mongo_registry import get_client
+from .ingest_queue import IngestQueue
+
+# ---------------- SHARED EMBEDDING SERVICE ----------------
+from src.embeddings import get_embedding_model
+from src.answer_cache import get_answer_cache, invalidate_context
+from src.utils import ChunkIdGenerator
+from src.streaming_chunker import iter_batches, iter_text_chunks, prefetch
+from src.dedup import ChunkFilter, NearDuplicateIndex
+
+# ---------------- LOCAL VECTOR BACKEND ----------------
+from src.local_index import EMBEDDING_KEY, LocalVectorIndex, LocalVectorStore
+
+# ---------------- KEYWORD (BM25) INDEX ----------------
+from langchain_core.documents import Document
+from src.bm25_index import BM25Index
+
+# ---------------- FUSION + DIVERSITY RE-RANKING ----------------
+from src.ranking import rank_hits
+
+# ---------------- TOKEN-BUDGETED CONTEXT ----------------
+from src.context_packer import count_tokens, pack_context
+# ---------------- LLM ADMISSION CONTROL ----------------
+from src.llm_scheduler import BATCH, INTERACTIVE, ScheduledLLM, get_scheduler, scheduled_as
+# ---------------- DUPLICATE REQUEST COALESCING ----------------
+from src.single_flight import single_flight
+
 # ---------------- OPENAI IMPORTS (OPTIONAL) ----------------
 try:
-    from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+    from langchain_openai import ChatOpenAI
 except ImportError:
-    OpenAIEmbeddings = None
     ChatOpenAI = None
 
 load_dotenv()
@@ -47,6 +73,37 @@ DB_NAME = os.getenv("MONGO_DB_NAME")
 COLLECTION_NAME = "vector_store"
 INDEX_NAME = "universal_index"
 
+# Vector backend: "atlas" (MongoDB Atlas Vector Search) or "local" (in-process index)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "atlas").lower()
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "./local_index")
+LOCAL_INDEX_APPROXIMATE = os.getenv("LOCAL_INDEX_APPROXIMATE", "false").lower() == "true"
+LOCAL_INDEX_EF_SEARCH = int(os.getenv("LOCAL_INDEX_EF_SEARCH", 64))
+# Compact storage: "int8" scans one-byte codes and re-scores a shortlist at full precision
+LOCAL_INDEX_QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "none").lower()
+LOCAL_INDEX_PCA_DIMS = int(os.getenv("LOCAL_INDEX_PCA_DIMS", 0)) or None  # 0 keeps all dimensions
+LOCAL_INDEX_RESCORE_FACTOR = int(os.getenv("LOCAL_INDEX_RESCORE_FACTOR", 4))
+
+# Hybrid retrieval: BM25 keyword hits fused with vector hits by reciprocal rank
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "./bm25_index/bm25.sqlite3")
+
+# Streaming ingest: chunks embedded/written per batch, and batches chunked ahead
+STORE_BATCH_SIZE = int(os.getenv("STORE_BATCH_SIZE", 64))
+STORE_PREFETCH_BATCHES = int(os.getenv("STORE_PREFETCH_BATCHES", 2))
+
+# Ingest filter: skip boilerplate and near-duplicates of the user's existing chunks
+INGEST_DEDUP_ENABLED = os.getenv("INGEST_DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", "./dedup_index/minhash.sqlite3")
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", 0.8))  # Estimated Jaccard over word bigrams
+DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", 8))
+
+# Fusion and MMR settings (RRF_K, MMR_*) live in config.py, shared with the
+# retrieval benchmark so it measures the same pipeline
+from config import MMR_ENABLED, MMR_FETCH_MULTIPLIER
+
+# Concurrent vector searches issued by one batched multi-query retrieval
+RETRIEVAL_SEARCH_WORKERS = int(os.getenv("RETRIEVAL_SEARCH_WORKERS", 8))
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 HUGGINGFACE_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN")
@@ -64,25 +121,101 @@ CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))
 RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", 4))
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.4))
 LLM_MAX_NEW_TOKENS = int(os.getenv("LLM_MAX_NEW_TOKENS", 512))
-
-client = MongoClient(MONGO_URL)
-db = client[DB_NAME]
-vector_collection = db[COLLECTION_NAME]
+# Concurrent generations sent to the HuggingFace endpoint (LLM scheduler)
+HF_LLM_MAX_IN_FLIGHT = int(os.getenv("HF_LLM_MAX_IN_FLIGHT", 4))
+
+client = get_client(MONGO_URL)
+db = client[DB_NAME] if DB_NAME else None
+vector_collection = db[COLLECTION_NAME] if db is not None else None
+
+_local_index = None
+_local_index_lock = threading.Lock()
+_bm25_index = None
+_chunk_filter = None
+_ingest_queue = None
+_search_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_SEARCH_WORKERS, thread_name_prefix="vector-search"
+)
 
 # =========================================================
-# EMBEDDINGS & VECTOR STORE (UNCHANGED)
+# EMBEDDINGS & VECTOR STORE
 # =========================================================
 def _get_embedding_model():
-    if OPENAI_API_KEY and OpenAIEmbeddings:
-        return OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-    return HuggingFaceEmbeddings(model_name=HUGGINGFACE_EMBEDDING_MODEL)
+    """Process-wide embedding model, loaded lazily on first use."""
+    if OPENAI_API_KEY and ChatOpenAI:
+        return get_embedding_model(provider="openai")
+    return get_embedding_model(HUGGINGFACE_EMBEDDING_MODEL, normalize=False)
+
+def _get_local_index():
+    """Process-wide local index, opened from LOCAL_INDEX_PATH on first use."""
+    global _local_index
+    if _local_index is None:
+        with _local_index_lock:
+            if _local_index is None:
+                _local_index = LocalVectorIndex(
+                    path=LOCAL_INDEX_PATH,
+                    filter_fields=("user_id", "source"),
+                    approximate=LOCAL_INDEX_APPROXIMATE,
+                    ef_search=LOCAL_INDEX_EF_SEARCH,
+                    quantization=LOCAL_INDEX_QUANTIZATION,
+                    pca_dims=LOCAL_INDEX_PCA_DIMS,
+                    rescore_factor=LOCAL_INDEX_RESCORE_FACTOR,
+                )
+                print(f"✔ RAG: Local vector index ready ({_local_index.stats()['live']} chunks)")
+    return _local_index
+
+def _get_bm25_index():
+    """Process-wide BM25 index, opened from BM25_INDEX_PATH on first use."""
+    global _bm25_index
+    if _bm25_index is None:
+        with _local_index_lock:
+            if _bm25_index is None:
+                _bm25_index = BM25Index(BM25_INDEX_PATH)
+    return _bm25_index
+
+def _get_chunk_filter():
+    """Process-wide ingest filter, opened from DEDUP_INDEX_PATH on first use."""
+    global _chunk_filter
+    if _chunk_filter is None:
+        with _local_index_lock:
+            if _chunk_filter is None:
+                _chunk_filter = ChunkFilter(
+                    NearDuplicateIndex(DEDUP_INDEX_PATH, threshold=DEDUP_SIMILARITY),
+                    min_words=DEDUP_MIN_WORDS,
+                )
+    return _chunk_filter
+
+def ingest_filter_stats():
+    """Boilerplate / near-duplicate counts since start-up (None when disabled)."""
+    if not INGEST_DEDUP_ENABLED:
+        return None
+    return _get_chunk_filter().stats()
+
+def keyword_index_stats():
+    """Size figures for the BM25 index (None when hybrid retrieval is off)."""
+    if not HYBRID_RETRIEVAL:
+        return None
+    return _get_bm25_index().stats()
+
+def vector_index_stats():
+    """Size figures for the local backend (None when Atlas is in use)."""
+    if VECTOR_BACKEND != "local":
+        return None
+    return _get_local_index().stats()
 
-embedding_model = _get_embedding_model()
+def close_vector_index():
+    """Flush the local index and snapshot its graph (called on shutdown)."""
+    if _local_index is not None:
+        _local_index.flush()
+        _local_index.save_graph()
 
 def get_vector_store():
+    if VECTOR_BACKEND == "local":
+        return LocalVectorStore(_get_local_index(), _get_embedding_model())
+
     return MongoDBAtlasVectorSearch(
         collection=vector_collection,
-        embedding=embedding_model,
+        embedding=_get_embedding_model(),
         index_name=INDEX_NAME,
         relevance_score_fn="cosine",
     )
@@ -108,7 +241,10 @@ def _initialize_llm(callbacks=None):
         streaming=bool(callbacks)
     )
 
-    return ChatHuggingFace(llm=endpoint, callbacks=callbacks)
+    return ScheduledLLM(
+        ChatHuggingFace(llm=endpoint, callbacks=callbacks),
+        get_scheduler("huggingface", HF_LLM_MAX_IN_FLIGHT),
+    )
 
 # =========================================================
 # INTERNAL RETRIEVAL (UNCHANGED)
@@ -124,6 +260,9 @@ def _fetch_docs(query, user_id, source=None, k=RETRIEVAL_K, strict_source=True):
 # 🔥 NEW: STREAMING CALLBACK
 # =========================================================
 class StreamingCallback(BaseCallbackHandler):
+    # Called on the event loop for async runs instead of via a thread per token
+    run_inline = True
+
     def __init__(self, on_token):
         self.on_token = on_token
 
@@ -134,6 +273,7 @@ class StreamingCallback(BaseCallbackHandler):
 # =========================================================
 # 🔥 NEW: LONG-FORM GENERATION (USED BY main.py)
 # =========================================================
+@scheduled_as(BATCH)
 def generate_long_form_answer(
     query: str,
     user_id: str,
@@ -154,7 +294,7 @@ def generate_long_form_answer(
     if not docs:
         return "No relevant information found."
 
-    context = "\n\n".join(d.page_content for d in docs)
+    context = pack_context(docs)
 
     callbacks = []
     if stream_callback:
@@ -185,6 +325,48 @@ Report:
 # =========================================================
 # 4. STORAGE
 # =========================================================
+def _stored_chunk_ids(metadata, ids=None):
+    """
+    Stored chunk ids for a document, mapped to the raw key each backend uses.
+    With both user_id and source known, every stored chunk of that document is
+    returned so vanished chunks can be deleted; otherwise only ids in `ids`.
+    """
+    scope = {f: metadata[f] for f in ("user_id", "source") if metadata.get(f) is not None}
+    whole_document = len(scope) == 2
+
+    if VECTOR_BACKEND == "local":
+        wanted = set(ids or ())
+        return {
+            chunk_id: chunk_id
+            for chunk_id in _get_local_index().get_ids(scope)
+            if whole_document or chunk_id in wanted
+        }
+
+    query = scope if whole_document else {"_id": {"$in": list(ids or ())}}
+    return {str(d["_id"]): d["_id"] for d in vector_collection.find(query, {"_id": 1})}
+
+def _delete_chunks(raw_ids):
+    if VECTOR_BACKEND == "local":
+        _get_local_index().delete(raw_ids)
+    else:
+        vector_collection.delete_many({"_id": {"$in": raw_ids}})
+
+def _chunk_batches(text_content, metadata, splitter):
+    """Lazily yield (ids, docs) batches; ids continue across batches."""
+    source_id = f"{metadata.get('user_id')}:{metadata.get('source')}"
+    next_ids = ChunkIdGenerator(source_id)
+
+    for batch in iter_batches(iter_text_chunks(text_content, splitter), STORE_BATCH_SIZE):
+        docs = [
+            Document(
+                page_content=chunk,
+                # token_count is stored so the context packer never re-counts it
+                metadata={**metadata, "start_index": start, "token_count": count_tokens(chunk)},
+            )
+            for chunk, start in batch
+        ]
+        yield next_ids([d.page_content for d in docs]), docs
+
 def store_embeddings(text_content, metadata):
     if not text_content or len(text_content.strip()) < 10:
         return None
@@ -195,51 +377,300 @@ def store_embeddings(text_content, metadata):
         separators=["\n\n", "\n", ".", " ", ""]
     )
 
-    docs = splitter.create_documents([text_content], metadatas=[metadata])
+    # Deterministic ids make re-saving a document an incremental diff:
+    # unchanged chunks stay, vanished ones go, only new ones are embedded.
+    whole_document = metadata.get("user_id") is not None and metadata.get("source") is not None
+    stored = _stored_chunk_ids(metadata) if whole_document else {}
+
     store = get_vector_store()
-    store.add_documents(docs)
-    print(f"✔ RAG: Stored {len(docs)} chunks for source: {metadata.get('source', 'unknown')}")
+    keyword_index = _get_bm25_index() if HYBRID_RETRIEVAL else None
+    chunk_filter = _get_chunk_filter() if INGEST_DEDUP_ENABLED else None
+    wanted = set()
+    added = 0
+    total = 0
+    skipped = {"near_duplicate": 0, "boilerplate": 0}
+
+    def previous_version(chunk_id):
+        # Chunks of this document's last version may be about to be deleted
+        return chunk_id in stored and chunk_id not in wanted
+
+    def write(pairs):
+        store.add_documents([d for _, d in pairs], ids=[chunk_id for chunk_id, _ in pairs])
+        if keyword_index:
+            keyword_index.add(
+                [chunk_id for chunk_id, _ in pairs],
+                [d.page_content for _, d in pairs],
+                [d.metadata for _, d in pairs],
+            )
+
+    # Chunks are produced lazily and embedded/written batch by batch, with
+    # chunking at most STORE_PREFETCH_BATCHES ahead, so memory stays flat and
+    # early batches are searchable before the rest of the document is done.
+    for ids, docs in prefetch(_chunk_batches(text_content, metadata, splitter), STORE_PREFETCH_BATCHES):
+        if not whole_document:
+            stored = _stored_chunk_ids(metadata, ids)
+
+        fresh = [(chunk_id, d) for chunk_id, d in zip(ids, docs) if chunk_id not in stored]
+        wanted.update(ids)
+        total += len(docs)
+
+        if chunk_filter:
+            kept = []
+            for chunk_id, d in fresh:
+                reason = chunk_filter.check(
+                    metadata.get("user_id"), chunk_id, d.page_content,
+                    skip=previous_version, metadata=d.metadata,
+                )
+                if reason:
+                    skipped[reason] += 1
+                else:
+                    kept.append((chunk_id, d))
+            fresh = kept
+
+        if fresh:
+            write(fresh)
+            added += len(fresh)
+
+    stale = {chunk_id: raw for chunk_id, raw in stored.items() if chunk_id not in wanted} if whole_document else {}
+    readmitted = []
+    if chunk_filter and whole_document:
+        chunk_filter.index.forget_duplicates(metadata.get("user_id"), metadata.get("source"), wanted)
+    if stale:
+        _delete_chunks(list(stale.values()))
+        if keyword_index:
+            keyword_index.delete(stale.keys())
+        if chunk_filter:
+            # Chunks skipped as duplicates of the deleted ones come back
+            readmitted = [
+                (chunk_id, Document(page_content=text, metadata=chunk_metadata))
+                for chunk_id, text, chunk_metadata in chunk_filter.release(stale.keys())
+            ]
+            if readmitted:
+                write(readmitted)
+
+    if added or stale:
+        # Answers built from this user's previous content are now stale
+        invalidate_context(metadata.get("user_id"))
+
+    print(
+        f"✔ RAG: {metadata.get('source', 'unknown')}: +{added} -{len(stale)} "
+        f"={total - added - sum(skipped.values())} chunks, skipped "
+        f"{skipped['near_duplicate']} near-duplicate / {skipped['boilerplate']} boilerplate, "
+        f"re-admitted {len(readmitted)}"
+    )
     return True
 
+def _get_ingest_queue():
+    """Process-wide durable ingest queue (workers run store_embeddings)."""
+    global _ingest_queue
+    if _ingest_queue is None:
+        with _local_index_lock:
+            if _ingest_queue is None:
+                _ingest_queue = IngestQueue(store_embeddings)
+    return _ingest_queue
+
+def start_ingest_queue():
+    """Start the ingest workers (called on startup); pending jobs resume."""
+    _get_ingest_queue().start()
+
+def stop_ingest_queue():
+    """Stop claiming ingest jobs (called on shutdown)."""
+    if _ingest_queue is not None:
+        _ingest_queue.stop()
+
+def ingest_job_status(job_id):
+    """Status of one ingest job, or None if the id is unknown."""
+    return _get_ingest_queue().status(job_id)
+
+def ingest_queue_stats():
+    """Ingest job counts by status."""
+    return _get_ingest_queue().stats()
+
 async def store_embeddings_async(text_content, metadata):
+    """
+    Queue a document for embedding and return its job id.
+
+    The job is persisted before this returns and is processed by the
+    bounded worker pool; poll ingest_job_status for the outcome.
+    Raises QueueFullError when the backlog is full and TextTooLargeError
+    when the text is over INGEST_QUEUE_MAX_TEXT_BYTES.
+    """
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, store_embeddings, text_content, metadata)
+    return await loop.run_in_executor(None, _get_ingest_queue().submit, text_content, metadata)
 
 # =========================================================
 # 5. RETRIEVAL LOGIC (OPTIMIZED)
 # =========================================================
 
-def _fetch_docs(query, user_id, source=None, k=RETRIEVAL_K, strict_source=True):
-    """Internal helper to get raw documents."""
+def _chunk_key(doc):
+    return doc.metadata.get("_id") or getattr(doc, "id", None) or doc.page_content
+
+def _embed_queries(queries):
+    """All query vectors from one forward pass (cached queries are skipped)."""
+    model = _get_embedding_model()
+    if hasattr(model, "embed_queries"):
+        return model.embed_queries(queries)
+    # Without the query cache, skip the document cache like embed_query does
+    base = getattr(model, "base", None)
+    if hasattr(base, "embed_queries"):
+        return base.embed_queries(queries)
+    return model.embed_documents(queries)
+
+def _search_vectors(store, query_vectors, k, filter_query, include_embeddings=False):
+    """
+    Run one vector search per query vector, together. With
+    include_embeddings each hit carries its stored vector in metadata.
+    """
+    if isinstance(store, LocalVectorStore):
+        return store.similarity_search_by_vectors(
+            query_vectors, k=k, pre_filter=filter_query, include_embeddings=include_embeddings
+        )
+
+    def search(vector):
+        if include_embeddings:
+            return store.similarity_search_by_vector(
+                vector, k=k, pre_filter=filter_query, include_embeddings=True
+            )
+        return store.similarity_search_by_vector(vector, k=k, pre_filter=filter_query)
+
+    if len(query_vectors) == 1:
+        return [search(query_vectors[0])]
+    return list(_search_executor.map(search, query_vectors))
+
+def _hit_lists(vector_results, keyword_results):
+    """
+    Chunk-key rankings (vector and BM25, one per query) and the documents
+    behind the keys, ready for rank_hits.
+    """
+    by_key = {}
+    vector_rankings = []
+    for docs in vector_results:
+        keys = [str(_chunk_key(doc)) for doc in docs]
+        for key, doc in zip(keys, docs):
+            by_key.setdefault(key, doc)
+        vector_rankings.append(keys)
+
+    keyword_rankings = []
+    for hits in keyword_results:
+        for chunk_id, _, text, metadata in hits:
+            by_key.setdefault(chunk_id, Document(page_content=text, metadata={**metadata, "_id": chunk_id}))
+        keyword_rankings.append([hit[0] for hit in hits])
+    return by_key, vector_rankings, keyword_rankings
+
+def _stored_vectors(by_key, embedding_key):
+    """vectors_for() for rank_hits: vector hits carry their stored vectors."""
+    def vectors_for(keys):
+        vectors = [by_key[key].metadata.get(embedding_key) for key in keys]
+        # Only BM25-only hits need embedding (served from the embedding cache when warm)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = _get_embedding_model().embed_documents([by_key[keys[i]].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return vectors
+    return vectors_for
+
+@single_flight("retrieval")
+def _fetch_docs_batch(queries, user_id, source=None, k=RETRIEVAL_K, strict_source=True):
+    """
+    Retrieve for several queries at once: one embedding pass, searches
+    issued together, results merged and de-duplicated by chunk id, then
+    re-ranked for diversity. Returns up to k documents per query.
+    """
     store = get_vector_store()
     filter_query = {"user_id": {"$eq": user_id}}
     
     if strict_source and source:
         filter_query["source"] = {"$eq": source}
 
-    return store.similarity_search(query, k=k, pre_filter=filter_query)
+    # Embed through the shared model so repeated queries hit the query cache
+    query_vectors = _embed_queries(queries)
+    fetch_k = k * MMR_FETCH_MULTIPLIER if MMR_ENABLED else k
+    # MMR re-uses the stored vectors instead of re-embedding the candidates
+    vector_results = _search_vectors(store, query_vectors, fetch_k, filter_query, include_embeddings=MMR_ENABLED)
+
+    keyword_results = []
+    if HYBRID_RETRIEVAL:
+        # Exact identifiers (FIR numbers, sections, plates) are caught by BM25
+        keyword_index = _get_bm25_index()
+        keyword_results = [
+            keyword_index.search(q, user_id, k=fetch_k, source=source if strict_source else None)
+            for q in queries
+        ]
+
+    by_key, vector_rankings, keyword_rankings = _hit_lists(vector_results, keyword_results)
+    embedding_key = getattr(store, "_embedding_key", EMBEDDING_KEY)
+    ranked = rank_hits(
+        vector_rankings,
+        keyword_rankings,
+        {key: doc.page_content for key, doc in by_key.items()},
+        k * len(queries),
+        query_vectors=query_vectors,
+        vectors_for=_stored_vectors(by_key, embedding_key) if MMR_ENABLED else None,
+        queries=queries,
+    )
 
-def generate_multi_queries(original_question, llm):
-    instruction = (
+    docs = [by_key[key] for key in ranked]
+    for doc in docs:
+        # Stored vectors were only needed for ranking
+        doc.metadata.pop(embedding_key, None)
+    return docs
+
+def _fetch_docs(query, user_id, source=None, k=RETRIEVAL_K, strict_source=True):
+    """Internal helper to get raw documents."""
+    return _fetch_docs_batch([query], user_id, source=source, k=k, strict_source=strict_source)
+
+def _multi_query_instruction(original_question):
+    return (
         "Generate 3 alternative search queries for: \n"
         f"{original_question}\n"
         "Return one per line."
     )
-    try:
-        raw = llm.invoke(instruction)
+
+def _parse_multi_queries(raw, original_question):
+    queries = []
+    if raw is not None:
         text = getattr(raw, "content", str(raw))
         lines = [ln.strip("-• ").strip() for ln in text.splitlines()]
         queries = [q for q in lines if q]
-    except Exception:
-        queries = []
 
     queries.append(original_question)
     return list(dict.fromkeys(queries))
 
+def generate_multi_queries(original_question, llm):
+    try:
+        raw = llm.invoke(_multi_query_instruction(original_question))
+    except Exception:
+        raw = None
+    return _parse_multi_queries(raw, original_question)
+
+async def agenerate_multi_queries(original_question, llm):
+    try:
+        raw = await llm.ainvoke(_multi_query_instruction(original_question))
+    except Exception:
+        raw = None
+    return _parse_multi_queries(raw, original_question)
+
 # =========================================================
 # 6. CHAT & REPORT FUNCTIONS
 # =========================================================
 
+def _chat_prompt(answer_language, answer_tone, answer_style):
+    prompt_text = f"""
+            You are a helpful assistant. Answer ONLY based on the context.
+            Language: {answer_language}. Tone: {answer_tone}. Style: {answer_style}.
+
+            Context:
+            {{context}}
+
+            Question: {{question}}
+
+            Answer:
+            """
+
+    return PromptTemplate(template=prompt_text, input_variables=["context", "question"])
+
+@scheduled_as(INTERACTIVE)
 def chat_with_video(
     question: str,
     user_id: str,
@@ -250,89 +681,43 @@ def chat_with_video(
     use_multi_query: bool = False,
     k: int = RETRIEVAL_K,
 ):
+    # The relaxed fallback searches all of the user's content, so answers
+    # are cached per user and invalidated whenever that user stores content
+    answer_cache = get_answer_cache()
+    if answer_cache:
+        variant = f"{video_url}|{answer_language}|{answer_tone}|{answer_style}|{use_multi_query}|{k}"
+        version = answer_cache.version(user_id)
+        query_vector = _get_embedding_model().embed_query(question)
+        cached = answer_cache.lookup(user_id, query_vector, variant, question=question)
+        if cached is not None:
+            return cached
+
     llm = _initialize_llm()
 
-    final_docs = []
     queries = [question]
     
     if use_multi_query:
         queries = generate_multi_queries(question, llm)
 
-    seen_contents = set()
-
-    def fetch_strict(q):
-        return _fetch_docs(q, user_id, source=video_url, k=k, strict_source=True)
-
-    def fetch_relaxed(q):
-        return _fetch_docs(q, user_id, source=None, k=k, strict_source=False)
-
-    with ThreadPoolExecutor() as executor:
-        strict_results = list(executor.map(fetch_strict, queries))
-
-    for docs in strict_results:
-        for doc in docs:
-            if doc.page_content not in seen_contents:
-                seen_contents.add(doc.page_content)
-                final_docs.append(doc)
+    final_docs = _fetch_docs_batch(queries, user_id, source=video_url, k=k, strict_source=True)
 
     if not final_docs and video_url:
-        print("⚠️ No strict matches. Parallel relaxed search...")
-        with ThreadPoolExecutor() as executor:
-            relaxed_results = list(executor.map(fetch_relaxed, queries))
-            
-        for docs in relaxed_results:
-            for doc in docs:
-                if doc.page_content not in seen_contents:
-                    seen_contents.add(doc.page_content)
-                    final_docs.append(doc)
+        print("⚠️ No strict matches. Batched relaxed search...")
+        final_docs = _fetch_docs_batch(queries, user_id, source=None, k=k, strict_source=False)
 
     if not final_docs:
         return "I don't have enough information to answer that."
 
-    context = "\n\n".join(d.page_content for d in final_docs)
-
-    prompt_text = f"""
-            You are a helpful assistant. Answer ONLY based on the context.
-            Language: {answer_language}. Tone: {answer_tone}. Style: {answer_style}.
-
-            Context:
-            {{context}}
-
-            Question: {{question}}
-
-            Answer:
-            """
-
-    prompt = PromptTemplate(template=prompt_text, input_variables=["context", "question"])
-    chain = prompt | llm | StrOutputParser()
-
-    return chain.invoke({"context": context, "question": question})
-
-
-def generate_rag_report(topic: str, user_id: str, report_format: str = "detailed", k: int = 4):
-    llm = _initialize_llm()
-    queries = generate_multi_queries(topic, llm)
-    
-    final_docs = []
-    seen_contents = set()
+    context = pack_context(final_docs)
+    chain = _chat_prompt(answer_language, answer_tone, answer_style) | llm | StrOutputParser()
 
-    def fetch_global(q):
-        return _fetch_docs(q, user_id, source=None, k=k, strict_source=False)
+    answer = chain.invoke({"context": context, "question": question})
+    if answer_cache:
+        answer_cache.store(user_id, query_vector, answer, variant, version=version, question=question)
+    return answer
 
-    with ThreadPoolExecutor() as executor:
-        results = list(executor.map(fetch_global, queries))
-
-    for docs in results:
-        for doc in docs:
-            if doc.page_content not in seen_contents:
-                seen_contents.add(doc.page_content)
-                final_docs.append(doc)
-
-    if not final_docs:
-        return "Insufficient data found in your knowledge base."
-
-    context = "\n\n".join(d.page_content for d in final_docs)
 
+def _report_prompt(report_format):
     prompt_text = f"""
     You are an expert AI Analyst. 
     Create a {report_format} report on the topic: "{{topic}}".
@@ -350,21 +735,93 @@ def generate_rag_report(topic: str, user_id: str, report_format: str = "detailed
     Format the output in clean Markdown.
     """
 
-    prompt = PromptTemplate(template=prompt_text, input_variables=["context", "topic"])
-    chain = prompt | llm | StrOutputParser()
+    return PromptTemplate(template=prompt_text, input_variables=["context", "topic"])
+
+@scheduled_as(BATCH)
+def generate_rag_report(topic: str, user_id: str, report_format: str = "detailed", k: int = 4):
+    llm = _initialize_llm()
+    queries = generate_multi_queries(topic, llm)
+    
+    final_docs = _fetch_docs_batch(queries, user_id, source=None, k=k, strict_source=False)
+
+    if not final_docs:
+        return "Insufficient data found in your knowledge base."
+
+    context = pack_context(final_docs)
+    chain = _report_prompt(report_format) | llm | StrOutputParser()
 
     return chain.invoke({"context": context, "topic": topic})
 
 # =========================================================
 # 7. ASYNC ORCHESTRATION
+# Native coroutines: the LLM is awaited through its async client, so a
+# waiting request holds no thread. Embedding and vector search are CPU or
+# blocking driver work and run in worker threads.
 # =========================================================
-async def chat_with_video_async(*args, **kwargs):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, chat_with_video, *args, **kwargs)
+@scheduled_as(INTERACTIVE)
+async def chat_with_video_async(
+    question: str,
+    user_id: str,
+    video_url: str,
+    answer_language: str = "en",
+    answer_tone: str = "neutral",
+    answer_style: str = "auto",
+    use_multi_query: bool = False,
+    k: int = RETRIEVAL_K,
+):
+    answer_cache = get_answer_cache()
+    if answer_cache:
+        variant = f"{video_url}|{answer_language}|{answer_tone}|{answer_style}|{use_multi_query}|{k}"
+        version = answer_cache.version(user_id)
+        query_vector = await asyncio.to_thread(_get_embedding_model().embed_query, question)
+        cached = answer_cache.lookup(user_id, query_vector, variant, question=question)
+        if cached is not None:
+            return cached
 
-async def generate_rag_report_async(*args, **kwargs):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, generate_rag_report, *args, **kwargs)
+    llm = _initialize_llm()
+
+    queries = [question]
+    
+    if use_multi_query:
+        queries = await agenerate_multi_queries(question, llm)
+
+    final_docs = await asyncio.to_thread(
+        _fetch_docs_batch, queries, user_id, source=video_url, k=k, strict_source=True
+    )
+
+    if not final_docs and video_url:
+        print("⚠️ No strict matches. Batched relaxed search...")
+        final_docs = await asyncio.to_thread(
+            _fetch_docs_batch, queries, user_id, source=None, k=k, strict_source=False
+        )
+
+    if not final_docs:
+        return "I don't have enough information to answer that."
+
+    context = pack_context(final_docs)
+    chain = _chat_prompt(answer_language, answer_tone, answer_style) | llm | StrOutputParser()
+
+    answer = await chain.ainvoke({"context": context, "question": question})
+    if answer_cache:
+        answer_cache.store(user_id, query_vector, answer, variant, version=version, question=question)
+    return answer
+
+@scheduled_as(BATCH)
+async def generate_rag_report_async(topic: str, user_id: str, report_format: str = "detailed", k: int = 4):
+    llm = _initialize_llm()
+    queries = await agenerate_multi_queries(topic, llm)
+
+    final_docs = await asyncio.to_thread(
+        _fetch_docs_batch, queries, user_id, source=None, k=k, strict_source=False
+    )
+
+    if not final_docs:
+        return "Insufficient data found in your knowledge base."
+
+    context = pack_context(final_docs)
+    chain = _report_prompt(report_format) | llm | StrOutputParser()
+
+    return await chain.ainvoke({"context": context, "topic": topic})
 
 # =========================================================
 # 8. LAW-ENFORCEMENT CASE REPORT GENERATION (ADDED)
@@ -455,32 +912,7 @@ CASE_REPORT_PROMPTS = {
     """
 }
 
-def generate_case_report(
-    report_type: str,
-    user_id: str,
-    k: int = 4
-):
-    """
-    Generates court-safe, law-enforcement reports using the RAG engine.
-    """
-    llm = _initialize_llm()
-
-    # Reuse existing retrieval function
-    # Search broadly using the report type name to gather relevant case files
-    search_term = report_type.replace("_", " ")
-    docs = _fetch_docs(
-        query=search_term,
-        user_id=user_id,
-        source=None,
-        k=k,
-        strict_source=False
-    )
-
-    if not docs:
-        return "No sufficient data found in the knowledge base to generate this report."
-
-    context = "\n\n".join(d.page_content for d in docs)
-
+def _case_report_prompt(report_type):
     # Select Prompt based on report type
     # Normalize report_type string
     normalized_type = report_type.lower().replace(" ", "_")
@@ -492,17 +924,12 @@ def generate_case_report(
             selected_prompt = CASE_REPORT_PROMPTS[key]
             break
 
-    prompt = PromptTemplate(
+    return PromptTemplate(
         template=selected_prompt,
         input_variables=["context"]
     )
 
-    print(f"👮‍♂️ Generating Law Enforcement Report: {report_type}")
-    
-    # Generate Content
-    chain = prompt | llm | StrOutputParser()
-    report_text = chain.invoke({"context": context})
-
+def _save_case_report(report_type, user_id, report_text):
     # Prepare data for PDF generation
     # FIX: Ensure data structure matches what render_html_report likely expects (from agent_orchestrator usage)
     clean_report_type = report_type.strip()
@@ -534,9 +961,69 @@ def generate_case_report(
     
     return {"success": False, "report_text": report_text, "error": "File generation failed"}
 
+@single_flight("case_report")
+@scheduled_as(BATCH)
+def generate_case_report(
+    report_type: str,
+    user_id: str,
+    k: int = 4
+):
+    """
+    Generates court-safe, law-enforcement reports using the RAG engine.
+    """
+    llm = _initialize_llm()
+
+    # Reuse existing retrieval function
+    # Search broadly using the report type name to gather relevant case files
+    search_term = report_type.replace("_", " ")
+    docs = _fetch_docs(
+        query=search_term,
+        user_id=user_id,
+        source=None,
+        k=k,
+        strict_source=False
+    )
+
+    if not docs:
+        return "No sufficient data found in the knowledge base to generate this report."
+
+    context = pack_context(docs)
+
+    print(f"👮‍♂️ Generating Law Enforcement Report: {report_type}")
+    
+    # Generate Content
+    chain = _case_report_prompt(report_type) | llm | StrOutputParser()
+    report_text = chain.invoke({"context": context})
+
+    return _save_case_report(report_type, user_id, report_text)
+
+@single_flight("case_report")
+@scheduled_as(BATCH)
 async def generate_case_report_async(report_type: str, user_id: str, k: int = 4):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, generate_case_report, report_type, user_id, k)
+    """Async variant of generate_case_report."""
+    llm = _initialize_llm()
+
+    search_term = report_type.replace("_", " ")
+    docs = await asyncio.to_thread(
+        _fetch_docs,
+        query=search_term,
+        user_id=user_id,
+        source=None,
+        k=k,
+        strict_source=False
+    )
+
+    if not docs:
+        return "No sufficient data found in the knowledge base to generate this report."
+
+    context = pack_context(docs)
+
+    print(f"👮‍♂️ Generating Law Enforcement Report: {report_type}")
+
+    chain = _case_report_prompt(report_type) | llm | StrOutputParser()
+    report_text = await chain.ainvoke({"context": context})
+
+    return await asyncio.to_thread(_save_case_report, report_type, user_id, report_text)
 
 # # app/rag_engine.py
 
@@ -6,8 +6,8 @@ class DataExtractionAgent:
     def __init__(self):
         self.llm = load_llm()
 
-    def run(self, text: str, focus: str = "General") -> dict:
-        prompt = f"""
+    def _prompt(self, text: str, focus: str) -> str:
+        return f"""
         You are a Data Analyst.
         Extract numerical data from the text below relevant to: "{focus}".
         
@@ -22,14 +22,24 @@ class DataExtractionAgent:
         Text:
         {text[:5000]}
         """
+
+    def _parse(self, response) -> dict:
+        # Clean response (remove markdown ```json ... ```)
+        content = response.content if hasattr(response, 'content') else str(response)
+        cleaned = re.sub(r"```json|```", "", content).strip()
         
+        return json.loads(cleaned)
+
+    def run(self, text: str, focus: str = "General") -> dict:
+        try:
+            return self._parse(self.llm.invoke(self._prompt(text, focus)))
+        except Exception as e:
+            print(f"Data Extractor Error: {e}")
+            return {"values": []}
+
+    async def arun(self, text: str, focus: str = "General") -> dict:
         try:
-            response = self.llm.invoke(prompt)
-            # Clean response (remove markdown ```json ... ```)
-            content = response.content if hasattr(response, 'content') else str(response)
-            cleaned = re.sub(r"```json|```", "", content).strip()
-            
-            return json.loads(cleaned)
+            return self._parse(await self.llm.ainvoke(self._prompt(text, focus)))
         except Exception as e:
             print(f"Data Extractor Error: {e}")
             return {"values": []}
\ No newline at end of file
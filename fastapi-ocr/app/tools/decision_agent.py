@@ -6,7 +6,7 @@ class DecisionAgent:
     def __init__(self):
         self.llm = load_llm()
 
-    def run(self, text: str) -> str:
+    def _chain(self):
         template = """
         Based on the document text below, recommend 3 actionable next steps or decisions.
         Format as a bulleted list.
@@ -18,9 +18,16 @@ class DecisionAgent:
         """
         
         prompt = PromptTemplate.from_template(template)
-        chain = prompt | self.llm | StrOutputParser()
-        
+        return prompt | self.llm | StrOutputParser()
+
+    def run(self, text: str) -> str:
         try:
-            return chain.invoke({"text": text})
+            return self._chain().invoke({"text": text})
         except:
+            return "No specific decisions generated."
+
+    async def arun(self, text: str) -> str:
+        try:
+            return await self._chain().ainvoke({"text": text})
+        except Exception:
             return "No specific decisions generated."
\ No newline at end of file
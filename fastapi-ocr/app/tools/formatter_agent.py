@@ -2,6 +2,7 @@ import os
 import uuid
 import asyncio
 import base64
+import contextvars
 import datetime
 import logging
 import re
@@ -373,7 +374,7 @@ List 3 actionable steps using specific priority labels exactly as written below:
 Write in a professional, objective tone.
 """
 
-    async def run_async(self, summary: str, keywords: list, trends: list, decisions: str, report_type: str):
+    async def run_async(self, summary: str, keywords: list, trends: list, decisions: str, report_type: str, callbacks=None):
         logger.info(f"🚀 Processing Report: {report_type}")
         
         # Safe String Conversion
@@ -409,6 +410,8 @@ Write in a professional, objective tone.
         prompt = PromptTemplate.from_template(template_str)
         chain = prompt | self.llm | StrOutputParser()
 
+        # Per-request callbacks receive the report tokens as they stream
+        run_config = {"callbacks": callbacks} if callbacks else None
         try:
             llm_text = await chain.ainvoke({
                 "summary": summary,
@@ -417,7 +420,7 @@ Write in a professional, objective tone.
                 "decisions": decisions,
                 "nlp_stats": nlp_stats,
                 "rag_context": rag_context
-            })
+            }, config=run_config)
         except AttributeError:
             llm_text = chain.invoke({
                 "summary": summary,
@@ -426,7 +429,7 @@ Write in a professional, objective tone.
                 "decisions": decisions,
                 "nlp_stats": nlp_stats,
                 "rag_context": rag_context
-            })
+            }, config=run_config)
 
         # 4. Render Final PDF
         logger.info("📑 Rendering Final PDF...")
@@ -459,7 +462,8 @@ Write in a professional, objective tone.
             # We must run the async chain in a separate thread to avoid blocking the main loop
             # and to allow 'asyncio.run' to create a NEW loop for this task.
             with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(asyncio.run, self.run_async(*args, **kwargs))
+                # Copied context keeps the caller's LLM scheduler priority and user
+                future = executor.submit(contextvars.copy_context().run, asyncio.run, self.run_async(*args, **kwargs))
                 return future.result()
 
 # import os
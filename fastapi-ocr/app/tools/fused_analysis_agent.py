@@ -0,0 +1,216 @@
+# app/tools/fused_analysis_agent.py
+import html
+import json
+import re
+
+from textblob import TextBlob
+from langchain_core.output_parsers import StrOutputParser
+
+from .llm_loader import load_llm
+
+
+# ---------------------------------------------------------
+# FIELD PARSERS
+# Each turns the model's JSON value into the shape the matching
+# single-purpose agent returns, or raises ValueError.
+# ---------------------------------------------------------
+def _text(value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError("expected a non-empty string")
+    return value.strip()
+
+
+def _items(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        raise ValueError("expected a list of strings")
+    items = [str(v).strip() for v in value if str(v).strip()]
+    if not items:
+        raise ValueError("empty list")
+    return items
+
+
+def _decisions(value):
+    return "\n".join(f"- {item}" for item in _items(value))
+
+
+def _risks(value):
+    if not isinstance(value, dict):
+        raise ValueError("expected an object")
+    level = str(value.get("level", "")).strip().capitalize()
+    if level not in ("High", "Medium", "Low"):
+        raise ValueError(f"invalid risk level {value.get('level')!r}")
+    field = lambda key: html.escape(str(value.get(key) or "None detected"))
+    return (
+        "<div class='risk-report'>\n"
+        "    <h3>⚠ Risk Assessment</h3>\n"
+        f"    <p><strong>Overall Risk Level:</strong> <span class='risk-level'>{level}</span></p>\n"
+        "    <ul>\n"
+        f"        <li><strong>Financial:</strong> {field('financial')}</li>\n"
+        f"        <li><strong>Legal:</strong> {field('legal')}</li>\n"
+        f"        <li><strong>Operational:</strong> {field('operational')}</li>\n"
+        "    </ul>\n"
+        f"    <p><strong>Critical Warning:</strong> {field('critical_warning')}</p>\n"
+        "</div>"
+    )
+
+
+def _cognitive(value):
+    if not isinstance(value, dict):
+        raise ValueError("expected an object")
+    complexity = int(value.get("complexity"))
+    if not 1 <= complexity <= 10:
+        raise ValueError(f"complexity {complexity} out of range")
+    field = lambda key: html.escape(_text(value.get(key)))
+    return (
+        "<div class='cognitive-report'>\n"
+        "    <h3>🧠 Cognitive Analysis</h3>\n"
+        "    <ul>\n"
+        f"        <li><strong>Primary Intent:</strong> {field('intent')}</li>\n"
+        f"        <li><strong>Detected Tone:</strong> {field('tone')}</li>\n"
+        f"        <li><strong>Complexity:</strong> {complexity}/10 ({field('complexity_description')})</li>\n"
+        f"        <li><strong>Bias/Manipulation Check:</strong> {field('bias')}</li>\n"
+        "    </ul>\n"
+        "</div>"
+    )
+
+
+# Pipeline field -> (JSON key, schema line shown to the model, parser)
+FIELD_SPECS = {
+    "identity": (
+        "document_type", '"document_type": string, the document type (e.g. FIR, Statement, Invoice)', _text,
+    ),
+    "summary": ("summary", '"summary": string, a 3-4 sentence summary', _text),
+    "keywords": (
+        "keywords", '"keywords": array of the top 5 distinct keywords, entities or topics', _items,
+    ),
+    "decisions": ("decisions", '"decisions": array of 3 actionable next steps or decisions', _decisions),
+    "trends": (
+        "trends", '"trends": array of 3 distinct trends or patterns (e.g. "Increasing costs")', _items,
+    ),
+    "risks": (
+        "risks",
+        '"risks": object with "level" ("High", "Medium" or "Low"), "financial", "legal", '
+        '"operational" and "critical_warning" (strings; "None detected" if nothing applies)',
+        _risks,
+    ),
+    "sentiment": (
+        "sentiment_explanation",
+        '"sentiment_explanation": string, briefly why the document has sentiment {score} ({label})',
+        _text,
+    ),
+    "cognitive": (
+        "cognitive",
+        '"cognitive": object with "intent", "tone", "complexity" (integer 1-10), '
+        '"complexity_description" and "bias" (hidden bias or manipulation check), all concise',
+        _cognitive,
+    ),
+}
+
+
+def _extract_json(raw: str):
+    """First JSON object in the model output (code fences and chatter tolerated)."""
+    raw = re.sub(r"```(?:json)?", "", raw or "")
+    start, end = raw.find("{"), raw.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(raw[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _sentiment_score(text: str):
+    polarity = TextBlob(text).sentiment.polarity
+    label = "Neutral"
+    if polarity > 0.1: label = "Positive"
+    elif polarity < -0.1: label = "Negative"
+    return polarity, label
+
+
+class FusedAnalysisAgent:
+    """
+    Produces several analysis fields from a single LLM call.
+
+    The document is sent once with a JSON schema covering every requested
+    field, so its prompt is prefilled once instead of once per agent. Each
+    field is validated on its own; the ones that are missing or malformed
+    are left out of the result for the caller to compute individually.
+    """
+
+    def __init__(self):
+        self.llm = load_llm()
+
+    def _prompt(self, text, fields, score, label):
+        schema = "\n".join(
+            "- " + FIELD_SPECS[f][1].format(score=round(score, 2), label=label) for f in fields
+        )
+        return (
+            "You are an expert analyst. Analyze the document below and return ONLY a JSON object "
+            "with exactly these keys:\n"
+            f"{schema}\n\n"
+            "Do not add commentary before or after the JSON.\n\n"
+            f"DOCUMENT:\n{text}\n\nJSON:"
+        )
+
+    def _fields(self, text, fields):
+        fields = [f for f in fields if f in FIELD_SPECS]
+        score, label = _sentiment_score(text[:4000]) if text and "sentiment" in fields else (0.0, "Neutral")
+        return fields, score, label
+
+    def run(self, text: str, fields) -> dict:
+        """
+        Analyze a document for several fields at once.
+
+        Args:
+            text: Cleaned document text
+            fields: Pipeline result keys wanted (see FIELD_SPECS)
+
+        Returns:
+            Dict of the fields that parsed and validated, in the same shape
+            as the individual agents' results
+        """
+        fields, score, label = self._fields(text, fields)
+        if not text or not fields:
+            return {}
+
+        try:
+            raw = (self.llm | StrOutputParser()).invoke(self._prompt(text, fields, score, label))
+        except Exception as e:
+            print(f"⚠ Fused analysis failed: {e}")
+            return {}
+        return self._parse(raw, fields, score, label)
+
+    async def arun(self, text: str, fields) -> dict:
+        """Async variant of run()."""
+        fields, score, label = self._fields(text, fields)
+        if not text or not fields:
+            return {}
+
+        try:
+            raw = await (self.llm | StrOutputParser()).ainvoke(self._prompt(text, fields, score, label))
+        except Exception as e:
+            print(f"⚠ Fused analysis failed: {e}")
+            return {}
+        return self._parse(raw, fields, score, label)
+
+    def _parse(self, raw, fields, score, label) -> dict:
+        data = _extract_json(raw)
+        if data is None:
+            print("⚠ Fused analysis returned no parsable JSON")
+            return {}
+
+        results = {}
+        for field in fields:
+            key, _, parse = FIELD_SPECS[field]
+            try:
+                value = parse(data.get(key))
+            except (TypeError, ValueError) as e:
+                print(f"⚠ Fused field '{field}' invalid: {e}")
+                continue
+            if field == "sentiment":
+                value = {"score": round(score, 2), "label": label, "analysis": value}
+            results[field] = value
+        return results
@@ -6,9 +6,7 @@ class KeywordAgent:
     def __init__(self):
         self.llm = load_llm()
 
-    def run(self, text: str) -> list:
-        if not text: return []
-
+    def _chain(self):
         template = """
         Identify the top 5 distinct keywords, entities, or topics in this text.
         Return ONLY a comma-separated list (e.g. "Finance, Audit, Q3 Report").
@@ -20,11 +18,23 @@ class KeywordAgent:
         """
         
         prompt = PromptTemplate.from_template(template)
-        chain = prompt | self.llm | StrOutputParser()
-        
+        return prompt | self.llm | StrOutputParser()
+
+    def run(self, text: str) -> list:
+        if not text: return []
+
         try:
-            result = chain.invoke({"text": text})
+            result = self._chain().invoke({"text": text})
             # Robust splitting
             return [k.strip() for k in result.split(',') if k.strip()]
         except:
+            return []
+
+    async def arun(self, text: str) -> list:
+        if not text: return []
+
+        try:
+            result = await self._chain().ainvoke({"text": text})
+            return [k.strip() for k in result.split(',') if k.strip()]
+        except Exception:
             return []
\ No newline at end of file
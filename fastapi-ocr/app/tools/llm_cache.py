@@ -0,0 +1,190 @@
+# app/tools/llm_cache.py
+"""
+Persistent LLM response cache.
+
+Plugged into the shared ChatOllama through LangChain's cache hook, so every
+agent benefits without changes. Keys are hash(model parameters, rendered
+prompt). An identical prompt against an unchanged document, such as a
+re-requested report, returns the stored generation instead of running
+inference. Entries live in SQLite with a TTL and least-recently-used
+eviction once the size bound is reached.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+
+def prompt_key(prompt: str, llm_string: str) -> str:
+    """
+    Cache key for a rendered prompt under a model configuration.
+
+    Args:
+        prompt: Serialised prompt (chat messages included)
+        llm_string: LangChain's serialisation of the model and its parameters
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _dump_generations(generations: Sequence[Generation]) -> str:
+    items = []
+    for generation in generations:
+        if isinstance(generation, ChatGeneration):
+            items.append({"message": message_to_dict(generation.message)})
+        else:
+            items.append({"text": generation.text})
+    return json.dumps(items)
+
+
+def _load_generations(payload: str) -> list:
+    generations = []
+    for item in json.loads(payload):
+        if "message" in item:
+            generations.append(ChatGeneration(message=messages_from_dict([item["message"]])[0]))
+        else:
+            generations.append(Generation(text=item["text"]))
+    return generations
+
+
+class PersistentLLMCache(BaseCache):
+    """SQLite-backed LangChain cache with TTL and LRU eviction."""
+
+    def __init__(self, path: str, max_entries: int = 5000, ttl_seconds: float = 7 * 24 * 3600):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: SQLite file holding the responses
+            max_entries: Maximum responses kept before LRU eviction
+            ttl_seconds: Age after which a response is ignored and removed
+                (0 keeps responses until evicted)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+        self._expired = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " generations TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = prompt_key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                self._expired += 1
+                row = None
+
+            if row is None:
+                self._misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._hits += 1
+
+        try:
+            return _load_generations(row[0])
+        except Exception as e:
+            # Written by an incompatible LangChain version; treat as a miss
+            print(f"⚠ LLM cache entry unreadable, ignoring: {e}")
+            return None
+
+    def contains(self, prompt: str, llm_string: str) -> bool:
+        """Whether a live response is stored, without counting a hit or touching LRU order."""
+        key = prompt_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT created FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None and not (self.ttl_seconds and time.time() - row[0] > self.ttl_seconds)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = prompt_key(prompt, llm_string)
+        payload = _dump_generations(return_val)
+        now = time.time()
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute(
+                "INSERT OR IGNORE INTO responses (key, generations, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            if self._conn.total_changes == before:
+                self._conn.execute(
+                    "UPDATE responses SET generations = ?, created = ?, last_used = ? WHERE key = ?",
+                    (payload, now, now, key)
+                )
+            else:
+                self._count += 1
+
+            if self._count > self.max_entries:
+                # Evict down to 90% so eviction is not paid on every insert
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                    (excess,)
+                )
+                self._count -= excess
+                self._evicted += excess
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._count = 0
+
+    def stats(self) -> dict:
+        """
+        Snapshot of cache metrics.
+
+        Returns:
+            Dictionary with hit/miss counts and sizes
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "entries": self._count,
+                "evicted": self._evicted,
+                "expired": self._expired,
+            }
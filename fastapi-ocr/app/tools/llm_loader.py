@@ -1,14 +1,30 @@
 # app/tools/llm_loader.py
+import os
 import subprocess
+import threading
 import time
 import requests
 from langchain_ollama import ChatOllama 
-from langchain_core.callbacks import CallbackManager, StreamingStdOutCallbackHandler
+
+from src.llm_scheduler import ScheduledLLM, get_scheduler, scheduler_stats
+
+from .llm_cache import PersistentLLMCache
 
 OLLAMA_MODEL = "llama3"
 
+# Generations sent to Ollama at once; match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_MAX_IN_FLIGHT = int(os.getenv("OLLAMA_MAX_IN_FLIGHT", os.getenv("OLLAMA_NUM_PARALLEL", 1)))
+
+# Identical prompts (same model, parameters and rendered text) skip inference
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache/responses.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
 # SINGLETON VARIABLE
 _cached_llm = None
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
 
 def is_ollama_running():
     try:
@@ -28,6 +44,28 @@ def check_and_pull_model(model_name):
     except Exception as e:
         print(f"⚠ Model check warning: {e}")
 
+def get_llm_cache():
+    """Shared response cache (None when LLM_CACHE_ENABLED is off)."""
+    global _llm_cache
+    if _llm_cache is None and LLM_CACHE_ENABLED:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = PersistentLLMCache(
+                    LLM_CACHE_PATH,
+                    max_entries=LLM_CACHE_MAX_ENTRIES,
+                    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                )
+    return _llm_cache
+
+def llm_cache_stats():
+    """Response cache counters for /metrics (None when disabled)."""
+    cache = get_llm_cache()
+    return cache.stats() if cache else None
+
+def llm_scheduler_stats():
+    """Queue and in-flight metrics of every LLM backend, for /metrics."""
+    return scheduler_stats()
+
 def load_llm():
     global _cached_llm
     
@@ -48,11 +86,17 @@ def load_llm():
 
     # 4. Initialize & Cache
     try:
-        _cached_llm = ChatOllama(
-            base_url="http://localhost:11434",
-            model=OLLAMA_MODEL,
-            temperature=0.3,
-            callbacks=CallbackManager([StreamingStdOutCallbackHandler()])
+        _cached_llm = ScheduledLLM(
+            ChatOllama(
+                base_url="http://localhost:11434",
+                model=OLLAMA_MODEL,
+                temperature=0.3,
+                # No default callbacks: tokens go to the request that asked for
+                # them (callbacks passed per call), not to the server console
+                cache=get_llm_cache()
+            ),
+            # Interactive calls jump the queue; users take turns within a class
+            get_scheduler("ollama", OLLAMA_MAX_IN_FLIGHT),
         )
         print("✔ AI Engine Ready.")
         return _cached_llm
@@ -6,47 +6,55 @@ class RiskAnalysisAgent:
     def __init__(self):
         self.llm = load_llm()
 
+    def _chain(self):
+        # specialized prompt for risk detection
+        prompt = PromptTemplate(
+            template="""
+            You are a Senior Risk & Compliance Auditor. 
+            Analyze the following document context and identify potential risks.
+
+            Input Context:
+            {context}
+
+            Instructions:
+            1. Identify **Financial Risks** (hidden costs, penalties, ambiguous pricing).
+            2. Identify **Legal & Compliance Risks** (missing clauses, vague terms, GDPR/regulator violations).
+            3. Identify **Operational/Security Risks** (data leaks, unsafe practices).
+            4. Assign a **Risk Level** (High/Medium/Low) for the overall document.
+
+            Format the output strictly as HTML with the following structure:
+            <div class='risk-report'>
+                <h3>⚠ Risk Assessment</h3>
+                <p><strong>Overall Risk Level:</strong> <span class='risk-level'>[Insert Level]</span></p>
+                <ul>
+                    <li><strong>Financial:</strong> [Key financial risk or "None detected"]</li>
+                    <li><strong>Legal:</strong> [Key legal risk or "None detected"]</li>
+                    <li><strong>Operational:</strong> [Key operational risk or "None detected"]</li>
+                </ul>
+                <p><strong>Critical Warning:</strong> [Most urgent warning if any]</p>
+            </div>
+
+            Keep the analysis concise and professional.
+            """,
+            input_variables=["context"]
+        )
+
+        return prompt | self.llm | StrOutputParser()
+
     def run(self, context_input: str):
         """
         Analyzes the text for potential risks, liabilities, and compliance issues.
         """
         try:
-            # specialized prompt for risk detection
-            prompt = PromptTemplate(
-                template="""
-                You are a Senior Risk & Compliance Auditor. 
-                Analyze the following document context and identify potential risks.
-
-                Input Context:
-                {context}
-
-                Instructions:
-                1. Identify **Financial Risks** (hidden costs, penalties, ambiguous pricing).
-                2. Identify **Legal & Compliance Risks** (missing clauses, vague terms, GDPR/regulator violations).
-                3. Identify **Operational/Security Risks** (data leaks, unsafe practices).
-                4. Assign a **Risk Level** (High/Medium/Low) for the overall document.
-
-                Format the output strictly as HTML with the following structure:
-                <div class='risk-report'>
-                    <h3>⚠ Risk Assessment</h3>
-                    <p><strong>Overall Risk Level:</strong> <span class='risk-level'>[Insert Level]</span></p>
-                    <ul>
-                        <li><strong>Financial:</strong> [Key financial risk or "None detected"]</li>
-                        <li><strong>Legal:</strong> [Key legal risk or "None detected"]</li>
-                        <li><strong>Operational:</strong> [Key operational risk or "None detected"]</li>
-                    </ul>
-                    <p><strong>Critical Warning:</strong> [Most urgent warning if any]</p>
-                </div>
-
-                Keep the analysis concise and professional.
-                """,
-                input_variables=["context"]
-            )
-
-            chain = prompt | self.llm | StrOutputParser()
-            result = chain.invoke({"context": context_input})
-            return result
+            return self._chain().invoke({"context": context_input})
+        except Exception as e:
+            print(f"❌ Risk Agent Error: {e}")
+            return "<p>Error generating risk analysis.</p>"
 
+    async def arun(self, context_input: str):
+        """Async variant of run()."""
+        try:
+            return await self._chain().ainvoke({"context": context_input})
         except Exception as e:
             print(f"❌ Risk Agent Error: {e}")
-            return "<p>Error generating risk analysis.</p>"
\ No newline at end of file
+            return "<p>Error generating risk analysis.</p>"
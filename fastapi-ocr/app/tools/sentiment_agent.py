@@ -8,7 +8,7 @@ class SentimentAgent:
     def __init__(self):
         self.llm = load_llm()
 
-    def run(self, text: str):
+    def _score(self, text: str):
         # 1. NLP Exact Score
         blob = TextBlob(text)
         polarity = blob.sentiment.polarity # -1.0 to 1.0
@@ -16,7 +16,9 @@ class SentimentAgent:
         label = "Neutral"
         if polarity > 0.1: label = "Positive"
         elif polarity < -0.1: label = "Negative"
+        return polarity, label
 
+    def _chain(self):
         # 2. LLM Context
         prompt = PromptTemplate.from_template("""
         The document has a sentiment score of {score} ({label}). 
@@ -24,8 +26,21 @@ class SentimentAgent:
         {text}
         """)
         
-        chain = prompt | self.llm | StrOutputParser()
-        analysis = chain.invoke({"text": text[:1500], "score": polarity, "label": label})
+        return prompt | self.llm | StrOutputParser()
+
+    def run(self, text: str):
+        polarity, label = self._score(text)
+        analysis = self._chain().invoke({"text": text[:1500], "score": polarity, "label": label})
+
+        return {
+            "score": round(polarity, 2),
+            "label": label,
+            "analysis": analysis
+        }
+
+    async def arun(self, text: str):
+        polarity, label = self._score(text)
+        analysis = await self._chain().ainvoke({"text": text[:1500], "score": polarity, "label": label})
 
         return {
             "score": round(polarity, 2),
@@ -6,9 +6,7 @@ class SummarizerAgent:
     def __init__(self):
         self.llm = load_llm()
 
-    def run(self, text: str) -> str:
-        if not text: return "No text provided for summary."
-
+    def _chain(self):
         # Template defines the strict output format
         template = """
         You are an expert analyst. Summarize the following text efficiently.
@@ -22,9 +20,20 @@ class SummarizerAgent:
         prompt = PromptTemplate.from_template(template)
         
         # PIPE SYNTAX: Prompt -> LLM -> String Cleaner
-        chain = prompt | self.llm | StrOutputParser()
-        
+        return prompt | self.llm | StrOutputParser()
+
+    def run(self, text: str) -> str:
+        if not text: return "No text provided for summary."
+
+        try:
+            return self._chain().invoke({"text": text})
+        except Exception as e:
+            return f"Summary Error: {str(e)}"
+
+    async def arun(self, text: str) -> str:
+        if not text: return "No text provided for summary."
+
         try:
-            return chain.invoke({"text": text})
+            return await self._chain().ainvoke({"text": text})
         except Exception as e:
             return f"Summary Error: {str(e)}"
\ No newline at end of file
@@ -6,10 +6,7 @@ class TrendAgent:
     def __init__(self):
         self.llm = load_llm()
 
-    def run(self, text: str) -> list:
-        if not text or len(text) < 50: 
-            return []
-
+    def _chain(self):
         template = """
         Analyze the text below and identify 3 distinct trends or patterns (e.g., "Increasing costs", "Frequent delays").
         Return ONLY a comma-separated list.
@@ -21,11 +18,25 @@ class TrendAgent:
         """
         
         prompt = PromptTemplate.from_template(template)
-        chain = prompt | self.llm | StrOutputParser()
-        
+        return prompt | self.llm | StrOutputParser()
+
+    def run(self, text: str) -> list:
+        if not text or len(text) < 50: 
+            return []
+
         try:
-            result = chain.invoke({"text": text})
+            result = self._chain().invoke({"text": text})
             # Clean string and convert to list
             return [t.strip() for t in result.split(',') if t.strip()]
         except:
+            return []
+
+    async def arun(self, text: str) -> list:
+        if not text or len(text) < 50:
+            return []
+
+        try:
+            result = await self._chain().ainvoke({"text": text})
+            return [t.strip() for t in result.split(',') if t.strip()]
+        except Exception:
             return []
\ No newline at end of file
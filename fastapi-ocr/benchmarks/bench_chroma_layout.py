@@ -0,0 +1,120 @@
+# benchmarks/bench_chroma_layout.py
+"""
+Per-query latency of the per-video Chroma layout versus the consolidated
+layout as the number of videos grows.
+
+For every collection count the benchmark builds both layouts in a temporary
+directory from the same random unit vectors, then times what a /chat request
+does: open the video's collection and run one top-k query (with a video_id
+filter in the consolidated layout). No embedding model is needed.
+
+    python benchmarks/bench_chroma_layout.py --counts 10 100 500 --chunks 40
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+
+def _client(path):
+    return chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _build(path, videos, vectors, consolidated):
+    client = _client(path)
+    started = time.perf_counter()
+
+    if consolidated:
+        collection = client.get_or_create_collection("youtube_transcripts", embedding_function=None)
+    for video_id, video_vectors in zip(videos, vectors):
+        if not consolidated:
+            collection = client.get_or_create_collection(
+                f"youtube_transcripts_{video_id}", embedding_function=None
+            )
+        collection.add(
+            ids=[f"{video_id}:{i}" for i in range(len(video_vectors))],
+            embeddings=video_vectors.tolist(),
+            documents=[f"chunk {i} of {video_id}" for i in range(len(video_vectors))],
+            metadatas=[{"video_id": video_id, "chunk_index": i} for i in range(len(video_vectors))],
+        )
+    return time.perf_counter() - started
+
+
+def _measure(path, videos, queries, k, consolidated):
+    # A fresh client mirrors a process that has not touched these collections yet
+    client = _client(path)
+    latencies = []
+
+    started = time.perf_counter()
+    client.list_collections()
+    list_seconds = time.perf_counter() - started
+
+    for query in queries:
+        video_id = videos[np.random.randint(len(videos))]
+        started = time.perf_counter()
+        if consolidated:
+            collection = client.get_collection("youtube_transcripts")
+            collection.query(query_embeddings=[query.tolist()], n_results=k, where={"video_id": video_id})
+        else:
+            collection = client.get_collection(f"youtube_transcripts_{video_id}")
+            collection.query(query_embeddings=[query.tolist()], n_results=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p99_ms": round(_percentile(latencies, 0.99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "list_collections_ms": round(list_seconds * 1000, 2),
+    }
+
+
+def run(counts, chunks, dim, queries, k):
+    rng = np.random.default_rng(7)
+    report = []
+
+    for count in counts:
+        videos = [f"vid{i:08d}" for i in range(count)]
+        vectors = rng.standard_normal((count, chunks, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=-1, keepdims=True)
+        query_vectors = rng.standard_normal((queries, dim)).astype(np.float32)
+
+        row = {"collections": count, "chunks_per_video": chunks}
+        for mode in ("per_video", "consolidated"):
+            path = tempfile.mkdtemp(prefix=f"chroma_{mode}_")
+            try:
+                build_seconds = _build(path, videos, vectors, mode == "consolidated")
+                row[mode] = _measure(path, videos, query_vectors, k, mode == "consolidated")
+                row[mode]["build_s"] = round(build_seconds, 2)
+            finally:
+                shutil.rmtree(path, ignore_errors=True)
+
+        print(json.dumps(row))
+        report.append(row)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--chunks", type=int, default=40, help="Chunks per video")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per layout")
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = run(args.counts, args.chunks, args.dim, args.queries, args.k)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
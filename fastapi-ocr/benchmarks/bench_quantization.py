@@ -0,0 +1,134 @@
+# benchmarks/bench_quantization.py
+"""
+Recall and resident memory of the local index with int8 / PCA codes versus
+full-precision search.
+
+Builds a LocalVectorIndex per configuration in a temporary directory from
+the same vectors, then compares each configuration's top-k against exact
+float32 search (recall@k) and reports query latency and resident bytes.
+Vectors are synthetic and clustered like sentence embeddings unless real
+ones are passed with --vectors (a .npy matrix, e.g. dumped from the store).
+
+    python benchmarks/bench_quantization.py --chunks 50000 --pca 192 128
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.local_index import LocalVectorIndex
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _synthetic(rng, count, dim, topics=200, latent=64):
+    # Embeddings of real text sit near a low-dimensional, clustered manifold
+    basis = rng.standard_normal((latent, dim)).astype(np.float32)
+    centres = rng.standard_normal((topics, latent)).astype(np.float32) * 2.0
+    assignment = rng.integers(0, topics, size=count)
+    points = centres[assignment] + rng.standard_normal((count, latent)).astype(np.float32)
+    vectors = points @ basis + 0.3 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _queries(rng, vectors, count):
+    # Perturbed copies of stored chunks, like a question paraphrasing a passage
+    picks = vectors[rng.integers(0, len(vectors), size=count)]
+    queries = picks + 0.05 * rng.standard_normal(picks.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def _measure(vectors, queries, truth, k, batch, **options):
+    path = tempfile.mkdtemp(prefix="quant_bench_")
+    try:
+        started = time.perf_counter()
+        index = LocalVectorIndex(
+            path=path, filter_fields=("user_id",), quantize_min_train=min(len(vectors), 8192), **options
+        )
+        for start in range(0, len(vectors), batch):
+            part = vectors[start:start + batch]
+            ids = [f"c{i}" for i in range(start, start + len(part))]
+            index.add(ids, part, [""] * len(part), [{"user_id": "u"}] * len(part))
+        build_seconds = time.perf_counter() - started
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            found = index.search(query, k=k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += len({chunk_id for chunk_id, *_ in found} & expected)
+
+        stats = index.stats()
+        return {
+            "recall_at_k": round(hits / (len(queries) * k), 4),
+            "p50_ms": round(_percentile(latencies, 0.50), 2),
+            "p99_ms": round(_percentile(latencies, 0.99), 2),
+            "build_s": round(build_seconds, 2),
+            "resident_bytes": stats["resident_bytes"],
+            "code_dims": stats["code_dims"],
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def run(chunks, dim, queries, k, pca_dims, rescore_factors, vectors_file=None, batch=2048):
+    rng = np.random.default_rng(7)
+    if vectors_file:
+        vectors = np.load(vectors_file).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = _synthetic(rng, chunks, dim)
+    query_vectors = _queries(rng, vectors, queries)
+
+    # Ground truth: exact float32 top-k
+    scores = query_vectors @ vectors.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    truth = [{f"c{i}" for i in row} for row in top]
+
+    configs = [("float32", {"quantization": "none"})]
+    for factor in rescore_factors:
+        configs.append((f"int8_r{factor}", {"quantization": "int8", "rescore_factor": factor}))
+        for dims in pca_dims:
+            configs.append((
+                f"int8_pca{dims}_r{factor}",
+                {"quantization": "int8", "pca_dims": dims, "rescore_factor": factor},
+            ))
+
+    report = {"chunks": len(vectors), "dim": vectors.shape[1], "k": k, "configs": {}}
+    baseline = None
+    for name, options in configs:
+        row = _measure(vectors, query_vectors, truth, k, batch, **options)
+        if baseline is None:
+            baseline = row["resident_bytes"]
+        row["memory_ratio"] = round(baseline / max(row["resident_bytes"], 1), 2)
+        report["configs"][name] = row
+        print(json.dumps({"config": name, **row}))
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic vectors to index")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--pca", type=int, nargs="*", default=[192], help="PCA dimensions to try")
+    parser.add_argument("--rescore", type=int, nargs="+", default=[4], help="Re-score factors to try")
+    parser.add_argument("--vectors", help="Use real embeddings from this .npy file")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = run(args.chunks, args.dim, args.queries, args.k, args.pca, args.rescore, args.vectors)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
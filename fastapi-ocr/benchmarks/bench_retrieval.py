@@ -0,0 +1,369 @@
+# benchmarks/bench_retrieval.py
+"""
+Offline retrieval quality and speed across chunk sizes, embedding models and
+vector backends.
+
+A labelled corpus is chunked the way store_embeddings does it, embedded, and
+indexed in every requested backend. Each question is then answered the way
+_fetch_docs does: vector search filtered to the asking user, optionally with
+BM25 hits, ranked by src.ranking.rank_hits (fusion and MMR) with the
+production settings from config.py (RRF_K, MMR_*). MMR follows MMR_ENABLED
+unless --mmr says otherwise. A hit is any retrieved chunk of the question's
+document that contains its evidence string.
+
+Reported per configuration: recall@k and MRR (over the top max(k) results),
+p50/p99 search latency, query embedding time, index build time and index
+size. The corpus is synthetic (case-file style facts in filler text) unless
+an anonymised one is given with --corpus, as JSON lines of
+{"source", "user_id", "text", "questions": [{"question", "evidence"}]}.
+
+Backends: local (exact), local-hnsw, local-int8 and chroma (needs chromadb).
+Atlas needs a live cluster and is not covered. The "hashing" model is a
+dependency-free lexical embedder for smoke runs; any other name is loaded
+with HuggingFaceEmbeddings.
+
+    python benchmarks/bench_retrieval.py --chunk-sizes 300 500 800 \\
+        --models sentence-transformers/all-MiniLM-L6-v2 --backends local local-int8 --hybrid off on
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.bm25_index import BM25Index, tokenize
+from src.local_index import LocalVectorIndex
+from src.ranking import rank_hits
+
+FIRST_NAMES = ["Aarav", "Kavya", "Rohan", "Meera", "Imran", "Sneha", "Vikram", "Anjali", "Farhan", "Priya"]
+LAST_NAMES = ["Shah", "Patel", "Iyer", "Khan", "Reddy", "Mehta", "Nair", "Joshi", "Gupta", "Desai"]
+ORGS = ["Sai Traders", "Om Logistics", "Shree Exports", "Nova Infra", "Apex Metals", "Zen Pharma"]
+CITIES = ["Surat", "Pune", "Indore", "Nagpur", "Vadodara", "Nashik", "Rajkot", "Bhopal"]
+PLACES = ["the railway station", "a petrol pump", "the bus depot", "a hotel lobby", "the market yard"]
+FILLER = (
+    "The statement was recorded in the presence of two witnesses. Documents were verified against "
+    "the originals. Further enquiry is pending with the concerned department. The complainant was "
+    "advised to produce additional records. Copies were forwarded to the investigating officer. "
+    "No discrepancy was noted during the preliminary review. The report was filed within the time "
+    "limit prescribed. Call detail records were requested from the service provider."
+).split(". ")
+
+
+# =========================================================
+# CORPUS
+# =========================================================
+def _fact(rng):
+    person = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    other = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    city, place = rng.choice(CITIES), rng.choice(PLACES)
+    date = f"{rng.randint(1, 28)} {rng.choice(['March', 'June', 'August', 'November'])} 20{rng.randint(18, 24)}"
+    kind = rng.randrange(4)
+
+    if kind == 0:
+        invoice = f"INV-{rng.randint(10000, 99999)}"
+        return (
+            f"Invoice {invoice} was issued to {rng.choice(ORGS)} on {date} for {rng.randint(5, 900) * 1000} rupees.",
+            f"Which company received invoice {invoice} and for what amount?",
+            f"Invoice {invoice}",
+        )
+    if kind == 1:
+        phone = f"9{rng.randint(100000000, 999999999)}"
+        return (
+            f"Mobile number {phone} is registered to {person} of {city}.",
+            f"Who is the registered owner of mobile {phone}?",
+            phone,
+        )
+    if kind == 2:
+        return (
+            f"{person} met {other} at {place} in {city} on {date}.",
+            f"Where and when did {person} meet {other}?",
+            f"{person} met {other}",
+        )
+    plate = f"{rng.choice(['MH', 'GJ', 'MP'])}{rng.randint(10, 49)}{rng.choice('ABCDEFGH')}{rng.choice('JKLMNP')}{rng.randint(1000, 9999)}"
+    return (
+        f"Vehicle {plate} was seen near {place} in {city} at {rng.randint(1, 12)}:{rng.randint(10, 59)} pm.",
+        f"When was vehicle {plate} spotted and where?",
+        f"Vehicle {plate}",
+    )
+
+
+def synthetic_corpus(documents=60, facts_per_document=8, users=4, seed=7):
+    """Case-file style documents with one labelled question per fact."""
+    rng = random.Random(seed)
+    corpus = []
+    for d in range(documents):
+        sentences, questions = [], []
+        for _ in range(facts_per_document):
+            fact, question, evidence = _fact(rng)
+            sentences.extend(rng.sample(FILLER, 3))
+            sentences.append(fact)
+            questions.append({"question": question, "evidence": evidence})
+        corpus.append({
+            "source": f"case_{d:04d}.pdf",
+            "user_id": f"user{d % users}",
+            "text": " ".join(s.rstrip(".") + "." for s in sentences),
+            "questions": questions,
+        })
+    return corpus
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def chunk_corpus(corpus, chunk_size, overlap):
+    """Split like store_embeddings; label each question with its gold chunk ids."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=overlap, separators=["\n\n", "\n", ".", " ", ""]
+    )
+    chunks, questions = [], []
+    for doc in corpus:
+        first = len(chunks)
+        for text in splitter.split_text(doc["text"]):
+            chunks.append({
+                "id": f"c{len(chunks)}",
+                "text": text,
+                "metadata": {"user_id": doc["user_id"], "source": doc["source"]},
+            })
+        for q in doc["questions"]:
+            gold = {c["id"] for c in chunks[first:] if q["evidence"] in c["text"]}
+            if gold:  # Evidence split across two chunks cannot be retrieved whole
+                questions.append({"question": q["question"], "user_id": doc["user_id"], "gold": gold})
+    return chunks, questions
+
+
+# =========================================================
+# EMBEDDERS
+# =========================================================
+class HashingEmbeddings:
+    """Signed feature hashing over BM25 terms: a lexical, dependency-free embedder."""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for term in tokenize(text):
+            digest = int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dim] += 1.0 if (digest >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def load_embedder(name):
+    if name == "hashing":
+        return HashingEmbeddings()
+    try:
+        from langchain_huggingface import HuggingFaceEmbeddings
+    except ImportError:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=name, encode_kwargs={"normalize_embeddings": True})
+
+
+# =========================================================
+# BACKENDS
+# =========================================================
+class LocalBackend:
+    def __init__(self, path, **options):
+        self.index = LocalVectorIndex(path=path, filter_fields=("user_id", "source"), **options)
+
+    def build(self, chunks, vectors):
+        self.index.add(
+            [c["id"] for c in chunks], vectors, [c["text"] for c in chunks], [c["metadata"] for c in chunks]
+        )
+        self.index.save_graph()
+
+    def search(self, vector, user_id, k):
+        return [hit[0] for hit in self.index.search(vector, k=k, filters={"user_id": user_id})]
+
+    def resident_bytes(self):
+        return self.index.stats()["resident_bytes"]
+
+
+class ChromaBackend:
+    def __init__(self, path):
+        import chromadb
+        from chromadb.config import Settings
+
+        client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        self.collection = client.create_collection(
+            "bench", embedding_function=None, metadata={"hnsw:space": "cosine"}
+        )
+
+    def build(self, chunks, vectors):
+        for start in range(0, len(chunks), 1000):
+            part = chunks[start:start + 1000]
+            self.collection.add(
+                ids=[c["id"] for c in part],
+                embeddings=[list(v) for v in vectors[start:start + 1000]],
+                documents=[c["text"] for c in part],
+                metadatas=[c["metadata"] for c in part],
+            )
+
+    def search(self, vector, user_id, k):
+        result = self.collection.query(query_embeddings=[list(vector)], n_results=k, where={"user_id": user_id})
+        return result["ids"][0]
+
+    def resident_bytes(self):
+        return None
+
+
+BACKENDS = {
+    "local": lambda path: LocalBackend(path),
+    "local-hnsw": lambda path: LocalBackend(path, approximate=True),
+    "local-int8": lambda path: LocalBackend(path, quantization="int8", quantize_min_train=256),
+    "chroma": lambda path: ChromaBackend(path),
+}
+
+
+# =========================================================
+# MEASUREMENT
+# =========================================================
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _directory_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    )
+
+
+def evaluate(backend, keyword_index, questions, query_vectors, chunk_vectors, texts, ks, hybrid, mmr):
+    k_max = max(ks)
+    fetch_k = k_max * config.MMR_FETCH_MULTIPLIER if mmr else k_max
+    vectors_for = (lambda keys: [chunk_vectors[key] for key in keys]) if mmr else None
+    recalls = {k: 0 for k in ks}
+    reciprocal_ranks = 0.0
+    latencies = []
+
+    for q, vector in zip(questions, query_vectors):
+        started = time.perf_counter()
+        vector_rankings = [backend.search(vector, q["user_id"], fetch_k)]
+        keyword_rankings = []
+        if hybrid:
+            keyword_hits = keyword_index.search(q["question"], q["user_id"], k=fetch_k)
+            keyword_rankings.append([hit[0] for hit in keyword_hits])
+        ranked = rank_hits(
+            vector_rankings, keyword_rankings, texts, k_max,
+            query_vectors=[vector], vectors_for=vectors_for, queries=[q["question"]],
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        first_hit = next((rank for rank, cid in enumerate(ranked, 1) if cid in q["gold"]), None)
+        if first_hit:
+            reciprocal_ranks += 1.0 / first_hit
+            for k in ks:
+                recalls[k] += first_hit <= k
+
+    n = max(len(questions), 1)
+    return {
+        **{f"recall@{k}": round(recalls[k] / n, 4) for k in ks},
+        "mrr": round(reciprocal_ranks / n, 4),
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p99_ms": round(_percentile(latencies, 0.99), 2),
+    }
+
+
+def run(corpus, chunk_sizes, overlap_ratio, models, backends, hybrid_modes, mmr_modes, ks):
+    report = []
+    for model_name in models:
+        embedder = load_embedder(model_name)
+        for chunk_size in chunk_sizes:
+            chunks, questions = chunk_corpus(corpus, chunk_size, int(chunk_size * overlap_ratio))
+
+            started = time.perf_counter()
+            vectors = np.asarray(embedder.embed_documents([c["text"] for c in chunks]), dtype=np.float32)
+            embed_seconds = time.perf_counter() - started
+            chunk_vectors = {c["id"]: v for c, v in zip(chunks, vectors)}
+            texts = {c["id"]: c["text"] for c in chunks}
+
+            started = time.perf_counter()
+            query_vectors = [embedder.embed_query(q["question"]) for q in questions]
+            query_embed_ms = (time.perf_counter() - started) * 1000 / max(len(questions), 1)
+
+            workdir = tempfile.mkdtemp(prefix="retrieval_bench_")
+            try:
+                keyword_index = None
+                keyword_seconds = 0.0
+                if "on" in hybrid_modes:
+                    started = time.perf_counter()
+                    keyword_index = BM25Index(os.path.join(workdir, "bm25.sqlite3"))
+                    keyword_index.add(
+                        [c["id"] for c in chunks], [c["text"] for c in chunks], [c["metadata"] for c in chunks]
+                    )
+                    keyword_seconds = time.perf_counter() - started
+
+                for backend_name in backends:
+                    path = os.path.join(workdir, backend_name)
+                    started = time.perf_counter()
+                    backend = BACKENDS[backend_name](path)
+                    backend.build(chunks, vectors)
+                    build_seconds = time.perf_counter() - started
+
+                    for hybrid, mmr in [(h, m) for h in hybrid_modes for m in mmr_modes]:
+                        row = {
+                            "model": model_name,
+                            "chunk_size": chunk_size,
+                            "backend": backend_name,
+                            "hybrid": hybrid == "on",
+                            "mmr": mmr == "on",
+                            "chunks": len(chunks),
+                            "questions": len(questions),
+                            **evaluate(
+                                backend, keyword_index, questions, query_vectors, chunk_vectors, texts,
+                                ks, hybrid == "on", mmr == "on",
+                            ),
+                            "query_embed_ms": round(query_embed_ms, 2),
+                            "embed_s": round(embed_seconds, 2),
+                            "build_s": round(build_seconds + (keyword_seconds if hybrid == "on" else 0), 2),
+                            "index_disk_bytes": _directory_bytes(path),
+                            "index_resident_bytes": backend.resident_bytes(),
+                        }
+                        print(json.dumps(row))
+                        report.append(row)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Labelled JSONL corpus (default: synthetic)")
+    parser.add_argument("--documents", type=int, default=60, help="Synthetic documents")
+    parser.add_argument("--facts", type=int, default=8, help="Labelled facts per synthetic document")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[500])
+    parser.add_argument("--overlap-ratio", type=float, default=0.2, help="Chunk overlap as a share of chunk size")
+    parser.add_argument("--models", nargs="+", default=["sentence-transformers/all-MiniLM-L6-v2"])
+    parser.add_argument("--backends", nargs="+", default=["local"], choices=sorted(BACKENDS))
+    parser.add_argument("--hybrid", nargs="+", default=["off", "on"], choices=["off", "on"])
+    parser.add_argument("--mmr", nargs="+", default=["on" if config.MMR_ENABLED else "off"], choices=["off", "on"],
+                        help="MMR re-ranking (default: MMR_ENABLED, as retrieval does)")
+    parser.add_argument("-k", type=int, nargs="+", default=[1, 4, 10])
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.documents, args.facts)
+    results = run(
+        corpus, args.chunk_sizes, args.overlap_ratio, args.models, args.backends, args.hybrid, args.mmr, args.k
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -12,12 +12,38 @@ HUGGINGFACE_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN", "")
 HUGGINGFACE_LLM_MODEL = "meta-llama/Llama-3.1-8B-Instruct"
 HUGGINGFACE_EMBEDDING_MODEL = "intfloat/e5-small-v2"
 
+# Embedding Micro-Batching (coalesces concurrent embed calls into one forward pass)
+EMBED_MICRO_BATCH = os.getenv("EMBED_MICRO_BATCH", "true").lower() == "true"
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", 64))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", 5))
+
+# Embedding Cache (content-addressed, shared across users and collections)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000))
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", 20000))
+# Query vectors: in-memory LRU, optionally persisted to its own SQLite file
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 10000))
+QUERY_CACHE_PERSIST = os.getenv("QUERY_CACHE_PERSIST", "false").lower() == "true"
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "./embedding_cache/queries.sqlite3")
+
+# Answer Cache Configuration (semantic reuse of /chat answers)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))  # Cosine similarity
+ANSWER_CACHE_MAX_PER_CONTEXT = int(os.getenv("ANSWER_CACHE_MAX_PER_CONTEXT", 256))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 86400))  # Also bounds staleness across worker processes
+
 # OpenAI Configuration (optional)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
 # ChromaDB Configuration
 CHROMA_PERSIST_DIRECTORY = "./chroma_db"
 CHROMA_COLLECTION_NAME = "youtube_transcripts"
+# "per_video": one collection per video (legacy layout)
+# "consolidated": shared collection(s) filtered by video_id metadata
+CHROMA_STORAGE_MODE = os.getenv("CHROMA_STORAGE_MODE", "per_video")
+CHROMA_SHARD_COUNT = int(os.getenv("CHROMA_SHARD_COUNT", 1))
 
 # Text Splitting Configuration
 CHUNK_SIZE = 500
@@ -27,6 +53,24 @@ CHUNK_OVERLAP = 100
 RETRIEVAL_K = 4  # Number of documents to retrieve
 LLM_TEMPERATURE = 0.2
 LLM_MAX_NEW_TOKENS = 512
+# LLM scheduler: concurrent generations sent to the HuggingFace endpoint
+HF_LLM_MAX_IN_FLIGHT = int(os.getenv("HF_LLM_MAX_IN_FLIGHT", 4))
+# Retrieval ranking, shared by app/rag_engine.py and benchmarks/bench_retrieval.py
+RRF_K = int(os.getenv("RRF_K", 60))  # Reciprocal rank fusion damping (vector + BM25)
+# MMR re-ranking: pick a diverse top-k from a pool MMR_FETCH_MULTIPLIER times larger
+MMR_ENABLED = os.getenv("MMR_ENABLED", "true").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", 0.7))
+MMR_FETCH_MULTIPLIER = int(os.getenv("MMR_FETCH_MULTIPLIER", 3))
+MMR_DUPLICATE_THRESHOLD = float(os.getenv("MMR_DUPLICATE_THRESHOLD", 0.92))  # Only between chunks with the same identifiers
+# Prompt context budget (tokens), filled with retrieved chunks in relevance order
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", 3000))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")  # tiktoken encoding
+
+# Bulk Ingest Configuration
+BULK_INGEST_MAX_ITEMS = int(os.getenv("BULK_INGEST_MAX_ITEMS", 500))
+BULK_INGEST_CONCURRENCY = int(os.getenv("BULK_INGEST_CONCURRENCY", 8))  # Parallel transcript fetches
+BULK_INGEST_RATE_LIMIT = float(os.getenv("BULK_INGEST_RATE_LIMIT", 5))  # Fetches started per second
+BULK_INGEST_EMBED_BATCH = int(os.getenv("BULK_INGEST_EMBED_BATCH", 256))  # Chunks per embedding pass
 
 # Streamlit Configuration
 PAGE_TITLE = "YouTube Video Chatbot"
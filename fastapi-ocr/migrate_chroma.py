@@ -0,0 +1,112 @@
+# migrate_chroma.py
+"""
+Migrates the legacy one-collection-per-video Chroma layout
+(youtube_transcripts_<video_id>) into the consolidated layout used when
+CHROMA_STORAGE_MODE=consolidated.
+
+Stored embeddings are copied as-is, so no model is loaded and nothing is
+re-embedded. Chunks get the same deterministic IDs ingest assigns, so
+the first re-ingest after migrating only touches chunks that changed. Run with --dry-run first to see what would move.
+
+    python migrate_chroma.py --dry-run
+    python migrate_chroma.py --shards 4 --delete-source
+"""
+import argparse
+import re
+import time
+
+import config
+from src.embeddings import get_chroma_client
+from src.utils import make_chunk_ids
+from src.vector_store import shard_collection_name
+
+PAGE_SIZE = 1000
+
+
+def _collection_names(client):
+    # chromadb < 0.6 returns Collection objects, newer versions return names
+    return [getattr(c, "name", c) for c in client.list_collections()]
+
+
+def _legacy_collections(client):
+    prefix = f"{config.CHROMA_COLLECTION_NAME}_"
+
+    legacy = []
+    for name in _collection_names(client):
+        suffix = name[len(prefix):]
+        # Skip consolidated shards from this or any earlier shard count
+        if name.startswith(prefix) and not re.fullmatch(r"shard\d+", suffix):
+            legacy.append((name, suffix))
+    return legacy
+
+
+def migrate(shard_count: int, delete_source: bool, dry_run: bool):
+    client = get_chroma_client()
+    legacy = _legacy_collections(client)
+    print(f"--- Found {len(legacy)} per-video collections in {config.CHROMA_PERSIST_DIRECTORY} ---")
+
+    moved_chunks = 0
+    started = time.time()
+
+    for name, video_id in legacy:
+        source = client.get_collection(name=name)
+        target_name = shard_collection_name(video_id, shard_count)
+        count = source.count()
+        print(f"  {name} -> {target_name} ({count} chunks)")
+
+        if dry_run or count == 0:
+            continue
+
+        target = client.get_or_create_collection(name=target_name, embedding_function=None)
+        # Re-running the migration must not duplicate a video's chunks
+        target.delete(where={"video_id": video_id})
+
+        records = []
+        for offset in range(0, count, PAGE_SIZE):
+            page = source.get(
+                limit=PAGE_SIZE,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"],
+            )
+            records.extend(zip(page["embeddings"], page["documents"], page["metadatas"]))
+
+        # Same IDs as ingest (make_chunk_ids, in document order), so the next
+        # re-ingest of this video finds every migrated chunk unchanged
+        records.sort(key=lambda r: (r[2] or {}).get("chunk_index", 0))
+        ids = make_chunk_ids(video_id, [document or "" for _, document, _ in records])
+
+        for start in range(0, len(records), PAGE_SIZE):
+            page = records[start:start + PAGE_SIZE]
+            target.add(
+                ids=ids[start:start + PAGE_SIZE],
+                embeddings=[embedding for embedding, _, _ in page],
+                documents=[document for _, document, _ in page],
+                metadatas=[
+                    dict(metadata or {}, video_id=video_id, chunk_id=chunk_id)
+                    for (_, _, metadata), chunk_id in zip(page, ids[start:start + PAGE_SIZE])
+                ],
+            )
+            moved_chunks += len(page)
+
+        if delete_source:
+            client.delete_collection(name=name)
+
+    mode = "Dry run" if dry_run else "Migrated"
+    print(f"✔ {mode}: {len(legacy)} collections, {moved_chunks} chunks in {time.time() - started:.1f}s")
+    if not dry_run:
+        print("Set CHROMA_STORAGE_MODE=consolidated"
+              + (f" and CHROMA_SHARD_COUNT={shard_count}" if shard_count > 1 else "")
+              + " to serve from the new layout.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, default=config.CHROMA_SHARD_COUNT,
+                        help="Number of consolidated collections to spread videos over")
+    parser.add_argument("--delete-source", action="store_true",
+                        help="Drop each per-video collection after copying it")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="List what would be migrated without writing anything")
+    args = parser.parse_args()
+
+    migrate(args.shards, args.delete_source, args.dry_run)
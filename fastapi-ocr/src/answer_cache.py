@@ -0,0 +1,273 @@
+"""
+Answer Cache Module
+
+Semantic cache of generated answers. Answers are grouped by context (a
+video, or a user's uploaded documents) and matched by cosine similarity of
+the question embedding, so near-identical questions reuse an earlier answer
+instead of running retrieval and a full LLM generation. Every context has an
+ingestion version counter; storing new content bumps it and drops that
+context's cached answers.
+
+Embeddings blur identifiers, so "status of FIR 123" and "status of FIR 124"
+can score above the threshold. An answer is only reused when both questions
+also carry exactly the same identifier tokens (anything containing a digit).
+
+The cache and its version counters live in the process. Content stored by
+another process (another uvicorn worker, or an ingest-queue worker running
+elsewhere) does not invalidate this process's answers; they expire after
+the TTL instead. Keep ANSWER_CACHE_TTL_SECONDS short when running more than
+one worker, or disable the cache.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from src.bm25_index import identifier_tokens
+
+# Add parent directory to path for config import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+class _ContextEntries:
+    """Cached answers for one context, as a matrix of unit question vectors."""
+
+    def __init__(self, version: int):
+        self.version = version
+        self.vectors = None
+        self.answers = []
+        self.variants = []
+        self.identifiers = []
+        self.created = []
+
+    def drop(self, keep: np.ndarray):
+        self.vectors = self.vectors[keep] if keep.any() else None
+        self.answers = [a for a, k in zip(self.answers, keep) if k]
+        self.variants = [v for v, k in zip(self.variants, keep) if k]
+        self.identifiers = [i for i, k in zip(self.identifiers, keep) if k]
+        self.created = [c for c, k in zip(self.created, keep) if k]
+
+
+class AnswerCache:
+    """Per-context semantic answer cache with ingest-aware invalidation."""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries_per_context: int = 256,
+        max_contexts: int = 10_000,
+        ttl_seconds: float = 86_400,
+    ):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a cached answer to be reused
+            max_entries_per_context: Answers kept per context (oldest dropped first)
+            max_contexts: Contexts kept before the least recently used is dropped
+            ttl_seconds: Maximum age of a cached answer
+        """
+        self.threshold = threshold
+        self.max_entries_per_context = max_entries_per_context
+        self.max_contexts = max_contexts
+        self.ttl_seconds = ttl_seconds
+
+        self._contexts = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def version(self, context_id: str) -> int:
+        """
+        Current ingestion version of a context.
+
+        Read this before retrieval and pass it to store(), so an answer
+        built from content that changed mid-request is not cached.
+
+        Args:
+            context_id: Video ID, user ID or other context key
+
+        Returns:
+            Version counter
+        """
+        with self._lock:
+            return self._versions.get(context_id, 0)
+
+    def bump(self, context_id: str):
+        """
+        Record that new content was stored for a context.
+
+        Args:
+            context_id: Video ID, user ID or other context key
+        """
+        with self._lock:
+            self._versions[context_id] = self._versions.get(context_id, 0) + 1
+            if self._contexts.pop(context_id, None) is not None:
+                self._invalidations += 1
+
+    def lookup(
+        self,
+        context_id: str,
+        query_vector: List[float],
+        variant: str = "",
+        question: str = "",
+    ) -> Optional[str]:
+        """
+        Find a cached answer to a sufficiently similar question.
+
+        Args:
+            context_id: Video ID, user ID or other context key
+            query_vector: Embedding of the question
+            variant: Answer settings that must match exactly (language, tone...)
+            question: Question text; its identifier tokens must match exactly
+
+        Returns:
+            Cached answer, or None on a miss
+        """
+        query = self._unit(query_vector)
+        identifiers = identifier_tokens(question)
+        now = time.time()
+
+        with self._lock:
+            entries = self._contexts.get(context_id)
+            if entries is None or entries.vectors is None:
+                self._misses += 1
+                return None
+            self._contexts.move_to_end(context_id)
+
+            fresh = np.array([now - c <= self.ttl_seconds for c in entries.created])
+            if not fresh.all():
+                entries.drop(fresh)
+                if entries.vectors is None:
+                    self._misses += 1
+                    return None
+
+            scores = entries.vectors @ query
+            for index in np.argsort(-scores):
+                if scores[index] < self.threshold:
+                    break
+                if entries.variants[index] == variant and entries.identifiers[index] == identifiers:
+                    self._hits += 1
+                    return entries.answers[index]
+
+            self._misses += 1
+            return None
+
+    def store(
+        self,
+        context_id: str,
+        query_vector: List[float],
+        answer: str,
+        variant: str = "",
+        version: Optional[int] = None,
+        question: str = "",
+    ):
+        """
+        Cache an answer.
+
+        Args:
+            context_id: Video ID, user ID or other context key
+            query_vector: Embedding of the question
+            answer: Generated answer
+            variant: Answer settings that must match on lookup
+            version: Version read before retrieval; the answer is discarded
+                if the context has been re-ingested since
+            question: Question text (its identifiers must match on lookup)
+        """
+        vector = self._unit(query_vector)[None, :]
+        identifiers = identifier_tokens(question)
+
+        with self._lock:
+            current = self._versions.get(context_id, 0)
+            if version is not None and version != current:
+                return
+
+            entries = self._contexts.get(context_id)
+            if entries is None or entries.version != current:
+                entries = _ContextEntries(current)
+                self._contexts[context_id] = entries
+            self._contexts.move_to_end(context_id)
+
+            entries.vectors = vector if entries.vectors is None else np.vstack([entries.vectors, vector])
+            entries.answers.append(answer)
+            entries.variants.append(variant)
+            entries.identifiers.append(identifiers)
+            entries.created.append(time.time())
+
+            overflow = len(entries.answers) - self.max_entries_per_context
+            if overflow > 0:
+                keep = np.ones(len(entries.answers), dtype=bool)
+                keep[:overflow] = False
+                entries.drop(keep)
+
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of cache metrics.
+
+        Returns:
+            Dictionary with hit/miss counts and sizes
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "contexts": len(self._contexts),
+                "answers": sum(len(e.answers) for e in self._contexts.values()),
+                "invalidations": self._invalidations,
+            }
+
+
+_shared_cache: Optional[AnswerCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """
+    Get the process-wide answer cache, or None when it is disabled.
+
+    Returns:
+        Shared AnswerCache instance or None
+    """
+    global _shared_cache
+
+    if not config.ANSWER_CACHE_ENABLED:
+        return None
+    if _shared_cache is not None:
+        return _shared_cache
+
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = AnswerCache(
+                threshold=config.ANSWER_CACHE_THRESHOLD,
+                max_entries_per_context=config.ANSWER_CACHE_MAX_PER_CONTEXT,
+                ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+            )
+    return _shared_cache
+
+
+def invalidate_context(context_id: str):
+    """
+    Drop cached answers for a context after new content was stored.
+
+    Args:
+        context_id: Video ID, user ID or other context key
+    """
+    cache = get_answer_cache()
+    if cache is not None and context_id:
+        cache.bump(context_id)
@@ -0,0 +1,308 @@
+"""
+BM25 Index Module
+
+Per-user inverted index with BM25 scoring, persisted in SQLite and updated
+incrementally as chunks are stored or deleted. It complements vector search
+for exact identifiers (FIR numbers, IPC sections, vehicle plates, phone
+numbers) that embeddings tend to blur, and reciprocal_rank_fusion merges the
+two ranked lists.
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were what when where which who why with how does did do about "
+    "tell me please give show list".split()
+)
+
+# Alphanumeric runs joined by -, /, . or : ("FIR-123/2023", "MH12AB1234", "302")
+_COMPOUND = re.compile(r"[a-z0-9]+(?:[-/.:][a-z0-9]+)*")
+# Digit groups separated by spaces or dashes ("+91 98765 43210")
+_NUMBER = re.compile(r"\+?\d[\d\s-]{6,}\d")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into BM25 terms while keeping identifiers searchable.
+
+    A compound token such as "FIR-123/2023" yields its joined form
+    ("fir1232023") as well as its parts ("fir", "123", "2023"), so both the
+    exact identifier and a partial mention match. Spaced phone numbers also
+    yield their bare digits.
+
+    Args:
+        text: Raw text
+
+    Returns:
+        List of terms (with repeats, for term frequencies)
+    """
+    text = (text or "").lower()
+    terms = []
+
+    for match in _COMPOUND.finditer(text):
+        token = match.group(0)
+        parts = re.split(r"[-/.:]", token)
+        if len(parts) > 1:
+            terms.append("".join(parts))
+        terms.extend(p for p in parts if p not in STOPWORDS and (len(p) > 1 or p.isdigit()))
+
+    for match in _NUMBER.finditer(text):
+        digits = re.sub(r"\D", "", match.group(0))
+        if len(digits) >= 8:
+            terms.append(digits)
+
+    return terms
+
+
+def identifier_tokens(text: str) -> frozenset:
+    """
+    Identifier terms of a text: FIR/case numbers, sections, plates, phone
+    numbers... (every term containing a digit).
+
+    Args:
+        text: Raw text
+
+    Returns:
+        Set of terms as produced by tokenize
+    """
+    # Same terms as tokenize, but only digit-bearing compounds are split
+    text = (text or "").lower()
+    identifiers = set()
+    for token in _COMPOUND.findall(text):
+        if token.isalpha():
+            continue
+        parts = re.split(r"[-/.:]", token)
+        if len(parts) > 1:
+            identifiers.add("".join(parts))
+        identifiers.update(parts)
+    for match in _NUMBER.finditer(text):
+        digits = re.sub(r"\D", "", match.group(0))
+        if len(digits) >= 8:
+            identifiers.add(digits)
+    return frozenset(t for t in identifiers if not t.isalpha())
+
+
+class BM25Index:
+    """SQLite-backed inverted index scored with Okapi BM25, partitioned by user."""
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        """
+        Open (or create) the index.
+
+        Args:
+            path: SQLite file holding postings and chunk texts
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalisation
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.Lock()
+        self._user_stats = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " chunk_id TEXT PRIMARY KEY,"
+            " user_id TEXT,"
+            " source TEXT,"
+            " length INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " user_id TEXT,"
+            " term TEXT NOT NULL,"
+            " chunk_id TEXT NOT NULL,"
+            " tf INTEGER NOT NULL,"
+            " PRIMARY KEY (user_id, term, chunk_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id);"
+            "CREATE INDEX IF NOT EXISTS idx_chunks_user ON chunks(user_id);"
+        )
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def _delete_locked(self, chunk_ids: List[str]):
+        for start in range(0, len(chunk_ids), 500):
+            part = chunk_ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", part)
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", part)
+
+    def add(self, chunk_ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Index chunks, replacing any existing entries with the same ids.
+
+        Args:
+            chunk_ids: Stable chunk ids (shared with the vector store)
+            texts: Chunk texts
+            metadatas: Chunk metadata; user_id and source are indexed
+        """
+        if not chunk_ids:
+            return
+
+        chunk_rows = []
+        posting_rows = []
+        for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas):
+            user_id = metadata.get("user_id")
+            counts = Counter(tokenize(text))
+            chunk_rows.append((
+                chunk_id, user_id, metadata.get("source"), sum(counts.values()),
+                text, json.dumps(metadata, default=str)
+            ))
+            posting_rows.extend((user_id, term, chunk_id, tf) for term, tf in counts.items())
+
+        with self._lock:
+            self._delete_locked(list(chunk_ids))
+            self._conn.executemany(
+                "INSERT INTO chunks (chunk_id, user_id, source, length, text, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?)", chunk_rows
+            )
+            self._conn.executemany(
+                "INSERT INTO postings (user_id, term, chunk_id, tf) VALUES (?, ?, ?, ?)", posting_rows
+            )
+            self._conn.commit()
+            for row in chunk_rows:
+                self._user_stats.pop(row[1], None)
+
+    def delete(self, chunk_ids: Iterable[str]):
+        """
+        Remove chunks from the index.
+
+        Args:
+            chunk_ids: Chunk ids to remove (unknown ids are ignored)
+        """
+        chunk_ids = [str(chunk_id) for chunk_id in chunk_ids]
+        if not chunk_ids:
+            return
+
+        with self._lock:
+            self._delete_locked(chunk_ids)
+            self._conn.commit()
+            # Deleted chunks may belong to any user, so recompute lazily
+            self._user_stats.clear()
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def _stats_locked(self, user_id) -> Tuple[int, float]:
+        stats = self._user_stats.get(user_id)
+        if stats is None:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE user_id IS ?", (user_id,)
+            ).fetchone()
+            stats = (count, total / count if count else 0.0)
+            self._user_stats[user_id] = stats
+        return stats
+
+    def search(
+        self,
+        query: str,
+        user_id: str,
+        k: int = 4,
+        source: Optional[str] = None,
+    ) -> List[Tuple[str, float, str, Dict[str, Any]]]:
+        """
+        Rank a user's chunks against a query with BM25.
+
+        Args:
+            query: Query text
+            user_id: Owner whose chunks are searched
+            k: Number of results
+            source: Optional source restriction
+
+        Returns:
+            (chunk_id, score, text, metadata) tuples, best first
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        scores = Counter()
+        with self._lock:
+            count, avg_length = self._stats_locked(user_id)
+            if not count:
+                return []
+
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length, c.source FROM postings p"
+                    " JOIN chunks c ON c.chunk_id = p.chunk_id"
+                    " WHERE p.user_id IS ? AND p.term = ?", (user_id, term)
+                ).fetchall()
+                if not rows:
+                    continue
+
+                idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+                for chunk_id, tf, length, chunk_source in rows:
+                    if source is not None and chunk_source != source:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * length / (avg_length or 1))
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            top = scores.most_common(k)
+            if not top:
+                return []
+
+            placeholders = ",".join("?" * len(top))
+            rows = self._conn.execute(
+                f"SELECT chunk_id, text, metadata FROM chunks WHERE chunk_id IN ({placeholders})",
+                [chunk_id for chunk_id, _ in top]
+            ).fetchall()
+
+        records = {chunk_id: (text, json.loads(metadata)) for chunk_id, text, metadata in rows}
+        return [
+            (chunk_id, score, records[chunk_id][0], records[chunk_id][1])
+            for chunk_id, score in top if chunk_id in records
+        ]
+
+    def stats(self) -> dict:
+        """
+        Snapshot of index size.
+
+        Returns:
+            Dictionary with chunk and posting counts
+        """
+        with self._lock:
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            postings = self._conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+        return {"chunks": chunks, "postings": postings}
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60, with_scores: bool = False) -> list:
+    """
+    Merge several ranked id lists with reciprocal rank fusion.
+
+    Each list contributes 1 / (k + rank) for every id it contains, so ids
+    ranked well by either retriever rise to the top without having to
+    calibrate BM25 scores against cosine similarities.
+
+    Args:
+        rankings: Ranked id lists, best first
+        k: RRF damping constant
+        with_scores: Return (id, fused score) pairs instead of bare ids
+
+    Returns:
+        Ids (or pairs) ordered by fused score
+    """
+    scores = Counter()
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] += 1.0 / (k + rank + 1)
+    if with_scores:
+        return scores.most_common()
+    return [item for item, _ in scores.most_common()]
@@ -0,0 +1,215 @@
+"""
+Bulk Ingest Module
+
+Onboards many YouTube videos at once: transcripts are fetched concurrently
+under a rate limit, chunks from several videos are embedded together in one
+forward pass, and a status event is produced for every video as soon as it
+finishes.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+# Add parent directory to path for config import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.embeddings import get_chroma_client, get_embedding_model
+from src.transcript_fetcher import TranscriptFetcher
+from src.vector_store import VectorStoreManager
+
+
+class RateLimiter:
+    """Spaces out calls so that at most `rate` start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    async def wait(self):
+        """Sleep until the next slot is free, then claim it."""
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class BulkIngestor:
+    """Ingests a list of videos concurrently and reports per-item status."""
+
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        rate_limit: float = None,
+        embed_batch_size: int = None,
+    ):
+        """
+        Initialize the bulk ingestor.
+
+        Args:
+            max_concurrency: Maximum transcript fetches in flight
+            rate_limit: Maximum transcript fetches started per second
+            embed_batch_size: Target number of chunks per embedding pass
+        """
+        self.max_concurrency = max_concurrency or config.BULK_INGEST_CONCURRENCY
+        self.rate_limiter = RateLimiter(
+            config.BULK_INGEST_RATE_LIMIT if rate_limit is None else rate_limit
+        )
+        self.embed_batch_size = embed_batch_size or config.BULK_INGEST_EMBED_BATCH
+
+        self.embeddings = get_embedding_model(normalize=True)
+        self.client = get_chroma_client()
+
+    @staticmethod
+    def _event(video_id: Optional[str], status: str, **extra) -> Dict:
+        data = {"video_id": video_id, "status": status}
+        data.update(extra)
+        return {"event": "item", "data": data}
+
+    def _fetch_transcript(self, video_id: str) -> Optional[str]:
+        # A fetcher per call keeps the underlying HTTP session thread-local
+        return TranscriptFetcher().fetch_transcript(video_id)
+
+    async def _fetch_one(self, video_id, user_id, semaphore, embed_queue, events):
+        async with semaphore:
+            await self.rate_limiter.wait()
+            await events.put(self._event(video_id, "fetching"))
+            try:
+                transcript = await asyncio.to_thread(self._fetch_transcript, video_id)
+            except Exception as e:
+                await events.put(self._event(video_id, "failed", error=str(e)))
+                return
+
+        if not transcript:
+            await events.put(self._event(video_id, "failed", error="Transcript not found"))
+            return
+
+        manager = VectorStoreManager(
+            video_id, embeddings=self.embeddings, client=self.client, user_id=user_id
+        )
+        documents = manager.split_transcript(transcript)
+        try:
+            # Only chunks that are not stored yet go to the embedding pass
+            plan = await asyncio.to_thread(manager.plan_upsert, documents)
+        except Exception as e:
+            await events.put(self._event(video_id, "failed", error=str(e)))
+            return
+        await events.put(self._event(
+            video_id, "fetched", chunks=len(documents), new_chunks=len(plan["new_ids"])
+        ))
+        await embed_queue.put((manager, plan))
+
+    def _embed_and_store(self, batch) -> List[Dict]:
+        texts = [doc.page_content for _, plan in batch for doc in plan["new_documents"]]
+        vectors = self.embeddings.embed_documents(texts) if texts else []
+
+        results = []
+        offset = 0
+        for manager, plan in batch:
+            count = len(plan["new_documents"])
+            video_vectors = vectors[offset:offset + count]
+            offset += count
+            try:
+                manager.apply_upsert(plan, video_vectors)
+                results.append(self._event(manager.video_id, "indexed", **manager.last_upsert))
+            except Exception as e:
+                results.append(self._event(manager.video_id, "failed", error=str(e)))
+        return results
+
+    async def _flush(self, batch, events):
+        try:
+            results = await asyncio.to_thread(self._embed_and_store, batch)
+        except Exception as e:
+            results = [self._event(m.video_id, "failed", error=str(e)) for m, _ in batch]
+
+        for result in results:
+            await events.put(result)
+
+    async def _embed_worker(self, embed_queue, events):
+        batch = []
+        batch_chunks = 0
+
+        while True:
+            item = await embed_queue.get()
+            if item is None:
+                break
+
+            batch.append(item)
+            batch_chunks += len(item[1]["new_documents"])
+
+            # Flush on a full batch, or as soon as no more fetched work is waiting
+            if batch_chunks >= self.embed_batch_size or embed_queue.empty():
+                await self._flush(batch, events)
+                batch, batch_chunks = [], 0
+
+        if batch:
+            await self._flush(batch, events)
+
+    async def _run(self, video_ids: List[str], user_id: Optional[str], events: asyncio.Queue):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        embed_queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+
+        embed_task = asyncio.create_task(self._embed_worker(embed_queue, events))
+        try:
+            await asyncio.gather(*[
+                self._fetch_one(video_id, user_id, semaphore, embed_queue, events)
+                for video_id in video_ids
+            ])
+        finally:
+            await embed_queue.put(None)
+            await embed_task
+            await events.put(None)
+
+    async def ingest(self, video_ids: List[str], user_id: str = None) -> AsyncIterator[Dict]:
+        """
+        Ingest videos and yield status events as each item progresses.
+
+        Every video produces a "fetching" event, then either "fetched" and
+        "indexed", or "failed". A final "done" event carries the totals.
+
+        Args:
+            video_ids: YouTube video IDs to ingest
+            user_id: Optional owner recorded on every chunk
+
+        Yields:
+            Event dictionaries of the form {"event": ..., "data": ...}
+        """
+        events = asyncio.Queue()
+        started = time.monotonic()
+        runner = asyncio.create_task(self._run(video_ids, user_id, events))
+
+        indexed, failed = [], []
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+
+            status = event["data"]["status"]
+            if status == "indexed":
+                indexed.append(event["data"]["video_id"])
+            elif status == "failed":
+                failed.append(event["data"]["video_id"])
+            yield event
+
+        await runner
+
+        yield {
+            "event": "done",
+            "data": {
+                "total": len(video_ids),
+                "indexed": len(indexed),
+                "failed": len(failed),
+                "failed_ids": failed,
+                "elapsed_seconds": round(time.monotonic() - started, 2),
+            },
+        }
@@ -0,0 +1,164 @@
+"""
+Context Packer Module
+
+Assembles retrieved chunks into a prompt context that fits a token budget.
+Chunks are taken in relevance order until the budget is spent; the chunk
+that does not fit is cut at a sentence (or word) boundary instead of being
+dropped mid-word, so prompt size, and with it prefill time, is predictable.
+"""
+import os
+import re
+import sys
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Add parent directory to path for config import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+# Roughly four characters per token for English BPE vocabularies
+CHARS_PER_TOKEN = 4
+# A trimmed tail shorter than this is not worth including
+MIN_TAIL_TOKENS = 48
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding(config.CONTEXT_TOKENIZER)
+            except Exception as e:
+                # The BPE file is downloaded on first use; offline hosts fall back
+                print(f"⚠ Tokenizer unavailable ({e}); estimating token counts")
+    return _encoding
+
+
+@lru_cache(maxsize=65536)
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Uses tiktoken when available and falls back to a character estimate.
+    Results are memoised, so repeated chunks are counted once.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Token count
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def chunk_tokens(doc: Document) -> int:
+    """
+    Token count of a chunk, read from its metadata when ingest recorded it.
+
+    Args:
+        doc: Chunk document
+
+    Returns:
+        Token count
+    """
+    cached = doc.metadata.get("token_count")
+    if isinstance(cached, int):
+        return cached
+    return count_tokens(doc.page_content)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        head = encoding.decode(tokens[:max_tokens])
+    else:
+        head = text[:max_tokens * CHARS_PER_TOKEN]
+
+    # Prefer ending on a sentence or line break, then on a word
+    sentence_ends = [m.end() for m in re.finditer(r"[.!?](\s|$)|\n", head)]
+    if sentence_ends and sentence_ends[-1] > len(head) // 2:
+        return head[:sentence_ends[-1]].rstrip()
+    space = head.rfind(" ")
+    if space > 0:
+        return head[:space].rstrip()
+    return head
+
+
+def pack_documents(
+    docs: List[Document],
+    max_tokens: Optional[int] = None,
+    separator: str = "\n\n",
+) -> Tuple[List[Document], int]:
+    """
+    Select (and if needed trim) chunks to fit a token budget.
+
+    Args:
+        docs: Chunks in relevance order, most relevant first
+        max_tokens: Context budget (default config.CONTEXT_MAX_TOKENS)
+        separator: String placed between chunks
+
+    Returns:
+        Tuple of (chunks to use, tokens used)
+    """
+    if max_tokens is None:
+        max_tokens = config.CONTEXT_MAX_TOKENS
+
+    separator_tokens = count_tokens(separator)
+    packed = []
+    used = 0
+
+    for doc in docs:
+        cost = chunk_tokens(doc) + (separator_tokens if packed else 0)
+        if used + cost <= max_tokens:
+            packed.append(doc)
+            used += cost
+            continue
+
+        remaining = max_tokens - used - (separator_tokens if packed else 0)
+        if remaining >= MIN_TAIL_TOKENS:
+            tail = _truncate(doc.page_content, remaining)
+            if tail:
+                packed.append(Document(
+                    page_content=tail,
+                    metadata={**doc.metadata, "token_count": count_tokens(tail), "truncated": True}
+                ))
+                used += count_tokens(tail) + (separator_tokens if len(packed) > 1 else 0)
+        break
+
+    return packed, used
+
+
+def pack_context(
+    docs: List[Document],
+    max_tokens: Optional[int] = None,
+    separator: str = "\n\n",
+) -> str:
+    """
+    Join chunks into a prompt context that fits a token budget.
+
+    Args:
+        docs: Chunks in relevance order, most relevant first
+        max_tokens: Context budget (default config.CONTEXT_MAX_TOKENS)
+        separator: String placed between chunks
+
+    Returns:
+        Context string
+    """
+    packed, _ = pack_documents(docs, max_tokens, separator)
+    return separator.join(doc.page_content for doc in packed)
@@ -0,0 +1,437 @@
+"""
+Dedup Module
+
+Ingest-time filtering of chunks that add nothing to the index: near-
+duplicates of chunks the user already has (re-scans, repeated letterheads,
+page footers) and low-information boilerplate (stamps, page numbers, OCR
+noise). Near-duplicates are found with MinHash signatures and a banded LSH
+lookup in SQLite, so each check touches a handful of rows.
+
+A chunk only repeats another when their identifier tokens (FIR/case numbers,
+sections, plates, phone numbers) are exactly the same, so filled-in forms that
+differ in a FIR number are all kept. Short or mostly non-letter chunks are only
+dropped when they also repeat a stored chunk, in any document: a lone
+"FIR 302/2023 IPC 420" line or a page of call records is kept. Other chunks
+are only skipped as near-duplicates within the same document, so a search
+scoped to one source never loses content. A skipped near-duplicate is recorded with its text and a reference
+to its original, and is handed back for re-admission when that original is
+deleted, so editing one document never loses content another still has.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.bm25_index import identifier_tokens
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_PAGE_MARKER = re.compile(
+    r"^\s*(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*/\s*\d+|-\s*\d+\s*-)\s*$", re.IGNORECASE
+)
+
+# 64 hash functions in 16 bands of 4 rows: a pair with Jaccard similarity 0.8
+# becomes a candidate with probability ~0.999, one at 0.3 with ~0.12, and
+# candidates are then verified against the full signature
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift hashing: ((a * x + b) mod 2^64) >> 32 with odd a
+_PERM_A = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+
+
+def minhash(text: str, shingle_size: int = 2) -> np.ndarray:
+    """
+    MinHash signature of a text over word shingles.
+
+    Args:
+        text: Chunk text
+        shingle_size: Words per shingle
+
+    Returns:
+        uint32 array of NUM_PERM minimum hash values
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+
+    values = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+         for s in shingles],
+        dtype=np.uint64,
+    )
+    with np.errstate(over="ignore"):
+        hashed = (_PERM_A[:, None] * values[None, :] + _PERM_B[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def jaccard_estimate(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(a == b))
+
+
+def _band_keys(signature: np.ndarray):
+    rows = signature.reshape(BANDS, ROWS)
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(rows[band].tobytes(), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, "little", signed=True)))
+    return keys
+
+
+def boilerplate_reason(text: str, min_words: int = 8) -> Optional[str]:
+    """
+    Why a chunk may be low-information boilerplate, if it may.
+
+    Only "page_marker" is conclusive; the other reasons mark a chunk as
+    boilerplate only if it also repeats a stored chunk (see ChunkFilter).
+
+    Args:
+        text: Chunk text
+        min_words: Chunks with fewer words (identifiers and numbers count) are suspect
+
+    Returns:
+        Short reason string, or None for a chunk worth keeping
+    """
+    stripped = text.strip()
+    if not stripped or _PAGE_MARKER.match(stripped):
+        return "page_marker"
+
+    words = _WORD.findall(stripped.lower())
+    if len(words) < min_words:
+        return "too_short"
+
+    alnum = sum(ch.isalnum() for ch in stripped)
+    if alnum / len(stripped) < 0.4:
+        return "low_text_ratio"  # OCR noise, tables of stamps, separators
+
+    if len(set(words)) / len(words) < 0.3:
+        return "repetitive"
+    return None
+
+
+# Default for NearDuplicateIndex.find: match chunks of any document
+_ANY_SOURCE = object()
+
+
+class NearDuplicateIndex:
+    """Per-user MinHash index with banded LSH lookup, persisted in SQLite."""
+
+    def __init__(self, path: str, threshold: float = 0.8):
+        """
+        Open (or create) the index.
+
+        Args:
+            path: SQLite file holding the signatures
+            threshold: Estimated Jaccard similarity at or above which a chunk
+                counts as a near-duplicate
+        """
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " chunk_id TEXT PRIMARY KEY,"
+            " user_id TEXT,"
+            " signature BLOB NOT NULL,"
+            " source TEXT,"
+            " identifiers TEXT);"
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " user_id TEXT,"
+            " band INTEGER NOT NULL,"
+            " value INTEGER NOT NULL,"
+            " chunk_id TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_bands_lookup ON bands(user_id, band, value);"
+            "CREATE INDEX IF NOT EXISTS idx_bands_chunk ON bands(chunk_id);"
+            "CREATE TABLE IF NOT EXISTS duplicates ("
+            " chunk_id TEXT PRIMARY KEY,"
+            " user_id TEXT,"
+            " source TEXT,"
+            " original_id TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_duplicates_original ON duplicates(original_id);"
+            "CREATE INDEX IF NOT EXISTS idx_duplicates_document ON duplicates(user_id, source);"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")}
+        for column in ("source", "identifiers"):
+            if column not in columns:
+                # Rows from older indexes have no identifiers and never count as originals
+                self._conn.execute(f"ALTER TABLE signatures ADD COLUMN {column} TEXT")
+        self._conn.commit()
+
+    @staticmethod
+    def _identifier_key(identifiers: Iterable[str]) -> str:
+        return " ".join(sorted(identifiers))
+
+    def find(
+        self,
+        user_id: str,
+        signature: np.ndarray,
+        skip: Optional[Callable[[str], bool]] = None,
+        identifiers: Iterable[str] = (),
+        source: Any = _ANY_SOURCE,
+    ) -> Optional[str]:
+        """
+        Find a stored chunk of the user that is a near-duplicate.
+
+        Args:
+            user_id: Owner whose chunks are compared
+            signature: MinHash of the new chunk
+            skip: Optional predicate for chunk ids that must not count
+            identifiers: Identifier tokens of the new chunk; only chunks with
+                exactly the same set match
+            source: Only match chunks of this document (default: any)
+
+        Returns:
+            The matching chunk id, or None
+        """
+        identifier_key = self._identifier_key(identifiers)
+        with self._lock:
+            candidates = set()
+            for band, value in _band_keys(signature):
+                rows = self._conn.execute(
+                    "SELECT chunk_id FROM bands WHERE user_id IS ? AND band = ? AND value = ?",
+                    (user_id, band, value)
+                ).fetchall()
+                candidates.update(row[0] for row in rows)
+
+            for chunk_id in candidates:
+                if skip and skip(chunk_id):
+                    continue
+                row = self._conn.execute(
+                    "SELECT signature, source, identifiers FROM signatures WHERE chunk_id = ?", (chunk_id,)
+                ).fetchone()
+                if row is None or row[2] != identifier_key:
+                    continue
+                if source is not _ANY_SOURCE and row[1] != source:
+                    continue
+                if jaccard_estimate(np.frombuffer(row[0], dtype=np.uint32), signature) >= self.threshold:
+                    return chunk_id
+        return None
+
+    def add(
+        self,
+        user_id: str,
+        chunk_id: str,
+        signature: np.ndarray,
+        identifiers: Iterable[str] = (),
+        source: Optional[str] = None,
+    ):
+        """
+        Register a stored chunk's signature.
+
+        Args:
+            user_id: Owner of the chunk
+            chunk_id: Stable chunk id
+            signature: MinHash of the chunk
+            identifiers: Identifier tokens of the chunk
+            source: Document the chunk belongs to
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM bands WHERE chunk_id = ?", (chunk_id,))
+            self._conn.execute("DELETE FROM duplicates WHERE chunk_id = ?", (chunk_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO signatures (chunk_id, user_id, signature, source, identifiers)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (chunk_id, user_id, signature.astype(np.uint32).tobytes(), source,
+                 self._identifier_key(identifiers))
+            )
+            self._conn.executemany(
+                "INSERT INTO bands (user_id, band, value, chunk_id) VALUES (?, ?, ?, ?)",
+                [(user_id, band, value, chunk_id) for band, value in _band_keys(signature)]
+            )
+            self._conn.commit()
+
+    def add_duplicate(
+        self,
+        user_id: str,
+        chunk_id: str,
+        original_id: str,
+        text: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Record a chunk that was skipped as a near-duplicate of a stored one.
+
+        Args:
+            user_id: Owner of the chunk
+            chunk_id: Stable id of the skipped chunk
+            original_id: Stored chunk it duplicates
+            text: Chunk text, kept so the chunk can be re-admitted
+            metadata: Chunk metadata (its "source" identifies the document)
+        """
+        metadata = dict(metadata or {})
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO duplicates (chunk_id, user_id, source, original_id, text, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (chunk_id, user_id, metadata.get("source"), original_id, text,
+                 json.dumps(metadata, default=str))
+            )
+            self._conn.commit()
+
+    def forget_duplicates(self, user_id: str, source: str, keep: Iterable[str]):
+        """
+        Drop duplicate records of a document's chunks that it no longer has.
+
+        Args:
+            user_id: Owner of the document
+            source: Document source
+            keep: Chunk ids of the document's current version
+        """
+        keep = set(keep)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM duplicates WHERE user_id IS ? AND source IS ?", (user_id, source)
+            ).fetchall()
+            gone = [(row[0],) for row in rows if row[0] not in keep]
+            if gone:
+                self._conn.executemany("DELETE FROM duplicates WHERE chunk_id = ?", gone)
+                self._conn.commit()
+
+    def delete(self, chunk_ids) -> List[Tuple[str, str, str, Dict[str, Any]]]:
+        """
+        Forget chunks that were removed from the vector store.
+
+        Args:
+            chunk_ids: Chunk ids to remove (unknown ids are ignored)
+
+        Returns:
+            Skipped duplicates whose original was among them, as
+            (user_id, chunk_id, text, metadata); they are no longer recorded
+            and should be checked again (see ChunkFilter.release)
+        """
+        chunk_ids = [str(chunk_id) for chunk_id in chunk_ids]
+        orphans = []
+        with self._lock:
+            for start in range(0, len(chunk_ids), 500):
+                part = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                self._conn.execute(f"DELETE FROM bands WHERE chunk_id IN ({placeholders})", part)
+                self._conn.execute(f"DELETE FROM signatures WHERE chunk_id IN ({placeholders})", part)
+                orphans.extend(self._conn.execute(
+                    f"SELECT user_id, chunk_id, text, metadata FROM duplicates"
+                    f" WHERE original_id IN ({placeholders}) ORDER BY rowid", part
+                ).fetchall())
+                self._conn.execute(f"DELETE FROM duplicates WHERE original_id IN ({placeholders})", part)
+            self._conn.commit()
+        return [(user_id, chunk_id, text, json.loads(metadata)) for user_id, chunk_id, text, metadata in orphans]
+
+
+class ChunkFilter:
+    """Applies boilerplate and near-duplicate checks and keeps running counts."""
+
+    def __init__(self, index: NearDuplicateIndex, min_words: int = 8):
+        """
+        Args:
+            index: Signature index shared across ingests
+            min_words: Chunks with fewer words only count as boilerplate
+                when they repeat a stored chunk
+        """
+        self.index = index
+        self.min_words = min_words
+        self._lock = threading.Lock()
+        self.counts = {"checked": 0, "kept": 0, "near_duplicate": 0, "boilerplate": 0, "readmitted": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def check(
+        self,
+        user_id: str,
+        chunk_id: str,
+        text: str,
+        skip: Optional[Callable[[str], bool]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Decide whether a new chunk should be stored, registering it if so.
+
+        Args:
+            user_id: Owner of the chunk
+            chunk_id: Stable chunk id
+            text: Chunk text
+            skip: Optional predicate for chunk ids that must not count as
+                originals (e.g. the previous version of the same document)
+            metadata: Chunk metadata; its "source" scopes the near-duplicate
+                check, and it is recorded with a skipped near-duplicate so the
+                chunk can be re-admitted later
+
+        Returns:
+            None to keep the chunk, otherwise "near_duplicate" or "boilerplate"
+        """
+        reason = None
+        suspect = boilerplate_reason(text, self.min_words)
+        source = (metadata or {}).get("source")
+
+        if suspect == "page_marker":
+            reason = "boilerplate"
+        else:
+            signature = minhash(text)
+            identifiers = identifier_tokens(text)
+            # A chunk registered by an earlier, interrupted ingest is not its own original
+            original = self.index.find(
+                user_id, signature, lambda c: c == chunk_id or bool(skip and skip(c)),
+                identifiers=identifiers,
+                # Content is only skipped in favour of a copy in the same document
+                source=_ANY_SOURCE if suspect else source,
+            )
+            if original is None:
+                self.index.add(user_id, chunk_id, signature, identifiers, source)
+            elif suspect:
+                # Short or low-text and repeated: letterheads, footers, stamps
+                reason = "boilerplate"
+            else:
+                reason = "near_duplicate"
+                self.index.add_duplicate(user_id, chunk_id, original, text, metadata)
+
+        self._count("checked")
+        self._count(reason or "kept")
+        return reason
+
+    def release(self, chunk_ids) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Forget deleted chunks and re-check the near-duplicates they stood in for.
+
+        Args:
+            chunk_ids: Chunk ids removed from the vector store
+
+        Returns:
+            (chunk_id, text, metadata) of skipped chunks that have no stored
+            original any more; the caller must store them. The others now
+            reference another stored original.
+        """
+        readmit = []
+        for user_id, chunk_id, text, metadata in self.index.delete(chunk_ids):
+            if self.check(user_id, chunk_id, text, metadata=metadata) is None:
+                readmit.append((chunk_id, text, metadata))
+                self._count("readmitted")
+        return readmit
+
+    def stats(self) -> dict:
+        """
+        Running filter counts since start-up.
+
+        Returns:
+            Dictionary of counts
+        """
+        with self._lock:
+            return dict(self.counts)
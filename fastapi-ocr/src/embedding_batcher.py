@@ -0,0 +1,233 @@
+"""
+Micro-Batching Embedding Module
+
+Collects embedding requests from many threads and coroutines for a few
+milliseconds (or until a batch is full), runs them through the model in a
+single forward pass and fans the vectors back out to each caller.
+
+Queries and documents wait in separate lanes. Queries are always taken
+first, and large document requests are split into batch-sized pieces, so
+an interactive query waits at most one forward pass behind ingest work.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+def _gather(requests: List[_Request]) -> Future:
+    """One future resolving to the concatenated vectors of several pieces."""
+    future = Future()
+    remaining = [len(requests)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            vectors = [v for request in requests for v in request.future.result()]
+        except Exception as e:
+            future.set_exception(e)
+            return
+        future.set_result(vectors)
+
+    for request in requests:
+        request.future.add_done_callback(done)
+    return future
+
+
+class MicroBatchEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that coalesces concurrent calls into shared batches.
+
+    Queries and documents can share a batch: the wrapped models
+    (HuggingFace sentence-transformers without query instructions, OpenAI)
+    encode both the same way. Queries are queued in their own lane and
+    drained before any waiting documents.
+    """
+
+    def __init__(self, base: Embeddings, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            base: Embedding model that does the actual forward pass
+            max_batch_size: Flush once this many texts are waiting
+            max_wait_ms: Longest time the first request in a batch waits
+        """
+        self.base = base
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._cond = threading.Condition()
+        self._queries = deque()
+        self._documents = deque()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._max_batch = 0
+        self._forward_seconds = 0.0
+        self._waits = deque(maxlen=1000)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _next(self):
+        # Called under _cond; queries always go ahead of documents
+        if self._queries:
+            return self._queries.popleft()
+        if self._documents:
+            return self._documents.popleft()
+        return None
+
+    def _collect(self) -> List[_Request]:
+        with self._cond:
+            while not (self._queries or self._documents):
+                self._cond.wait()
+
+            batch = []
+            size = 0
+            deadline = time.perf_counter() + self.max_wait
+
+            while size < self.max_batch_size:
+                request = self._next()
+                if request is not None:
+                    batch.append(request)
+                    size += len(request.texts)
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            texts = [text for request in batch for text in request.texts]
+
+            try:
+                vectors = self.base.embed_documents(texts)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            offset = 0
+            for request in batch:
+                count = len(request.texts)
+                request.future.set_result(vectors[offset:offset + count])
+                offset += count
+
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._texts += len(texts)
+                self._max_batch = max(self._max_batch, len(texts))
+                self._forward_seconds += finished - started
+                self._waits.extend(started - request.enqueued_at for request in batch)
+
+    def _submit(self, texts: List[str], query: bool = False) -> Future:
+        texts = list(texts)
+        if not texts:
+            future = Future()
+            future.set_result([])
+            return future
+
+        # Pieces no bigger than a batch, so queries can slot in between them
+        step = self.max_batch_size
+        requests = [_Request(texts[i:i + step]) for i in range(0, len(texts), step)]
+
+        self._ensure_worker()
+        with self._cond:
+            (self._queries if query else self._documents).extend(requests)
+            self._cond.notify()
+
+        if len(requests) == 1:
+            return requests[0].future
+        return _gather(requests)
+
+    # ------------------------------------------------------------------
+    # Embeddings interface
+    # ------------------------------------------------------------------
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._submit(texts).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._submit([text], query=True).result()[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in the query lane."""
+        return self._submit(texts, query=True).result()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.wrap_future(self._submit(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vectors = await asyncio.wrap_future(self._submit([text], query=True))
+        return vectors[0]
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        """
+        Snapshot of batching metrics.
+
+        Returns:
+            Dictionary with batch-size and queue-wait figures
+        """
+        with self._stats_lock:
+            waits = sorted(self._waits)
+            batches = self._batches
+
+            def wait_ms(fraction):
+                if not waits:
+                    return 0.0
+                return round(waits[min(len(waits) - 1, int(len(waits) * fraction))] * 1000, 2)
+
+            return {
+                "batches": batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "avg_batch_size": round(self._texts / batches, 2) if batches else 0.0,
+                "max_batch_size": self._max_batch,
+                "avg_forward_ms": round(self._forward_seconds / batches * 1000, 2) if batches else 0.0,
+                "queue_wait_ms_p50": wait_ms(0.50),
+                "queue_wait_ms_p95": wait_ms(0.95),
+                "queue_depth": len(self._queries) + len(self._documents),
+                "query_queue_depth": len(self._queries),
+            }
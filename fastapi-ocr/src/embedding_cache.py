@@ -0,0 +1,453 @@
+"""
+Embedding Cache Module
+
+Content-addressed cache of chunk embeddings. Keys are hash(model, normalised
+text), so the same chunk is embedded once no matter which user, upload or
+collection it arrives through. Vectors live in a small in-memory LRU in
+front of a disk-backed SQLite store with LRU eviction. Query vectors get a
+separate LRU so repeated questions skip the embedding forward pass.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise chunk text so trivially different copies share a cache key.
+
+    Applies Unicode NFC normalisation and collapses runs of whitespace.
+    Case is preserved because cased embedding models depend on it.
+
+    Args:
+        text: Raw chunk text
+
+    Returns:
+        Normalised text
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def content_key(namespace: str, text: str) -> str:
+    """
+    Cache key for a piece of text under a given model namespace.
+
+    Args:
+        namespace: Identifies the embedding model and its settings
+        text: Chunk text
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = f"{namespace}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-level (memory + SQLite) LRU cache of embedding vectors."""
+
+    def __init__(self, path: str, max_entries: int = 500_000, memory_entries: int = 20_000):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: SQLite file holding the persisted vectors
+            max_entries: Maximum vectors kept on disk before LRU eviction
+            memory_entries: Maximum vectors kept in the in-memory LRU
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up several keys at once.
+
+        Args:
+            keys: Cache keys from content_key
+
+        Returns:
+            Mapping of the keys that were found to their vectors
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                else:
+                    missing.append(key)
+
+            # SQLite limits bound parameters per statement, so query in slices
+            for start in range(0, len(missing), 500):
+                part = missing[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+
+            if missing:
+                now = time.time()
+                touched = [(now, key) for key in missing if key in found]
+                if touched:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", touched
+                    )
+                    self._conn.commit()
+
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """
+        Store vectors, evicting the least recently used entries if full.
+
+        Args:
+            items: Mapping of cache key to vector
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        with self._lock:
+            for key, vector in items.items():
+                array = np.asarray(vector, dtype=np.float32)
+                self._remember(key, array)
+                rows.append((key, array.tobytes(), now))
+
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._count += self._conn.total_changes - before
+
+            if self._count > self.max_entries:
+                # Evict down to 90% so eviction is not paid on every insert
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (excess,)
+                )
+                self._count -= excess
+                self._evicted += excess
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Snapshot of cache metrics.
+
+        Returns:
+            Dictionary with hit/miss counts and sizes
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "entries": self._count,
+                "memory_entries": len(self._memory),
+                "evicted": self._evicted,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that consults an EmbeddingCache before the model.
+
+    Only document embeddings are cached here; query embeddings go straight
+    to the wrapped model.
+    """
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache, namespace: str):
+        """
+        Args:
+            base: Embedding model used for cache misses
+            cache: Shared vector cache
+            namespace: Model identity folded into every cache key
+        """
+        self.base = base
+        self.cache = cache
+        self.namespace = namespace
+
+    def _split(self, texts: List[str]):
+        keys = [content_key(self.namespace, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once, even if it repeats in the call
+        missing = OrderedDict()
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return keys, found, missing
+
+    def _merge(self, keys, found, missing, vectors) -> List[List[float]]:
+        fresh = dict(zip(missing.keys(), vectors))
+        self.cache.put_many(fresh)
+
+        results = []
+        for key in keys:
+            vector = found.get(key)
+            results.append(vector.tolist() if vector is not None else list(fresh[key]))
+        return results
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._split(texts)
+        vectors = self.base.embed_documents(list(missing.values())) if missing else []
+        return self._merge(keys, found, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await asyncio.to_thread(self._split, texts)
+        vectors = await self.base.aembed_documents(list(missing.values())) if missing else []
+        return await asyncio.to_thread(self._merge, keys, found, missing, vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.base.aembed_query(text)
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU of query vectors, optionally backed by an EmbeddingCache
+    on disk so hot queries survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 10_000, persistent: Optional[EmbeddingCache] = None):
+        """
+        Args:
+            max_entries: Maximum query vectors kept in memory
+            persistent: Optional disk cache consulted on memory misses
+        """
+        self.max_entries = max_entries
+        self.persistent = persistent
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up a query vector.
+
+        Args:
+            key: Cache key from content_key
+
+        Returns:
+            The vector, or None on a miss
+        """
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return vector
+
+        if self.persistent is not None:
+            vector = self.persistent.get_many([key]).get(key)
+
+        with self._lock:
+            if vector is not None:
+                self._remember(key, vector)
+                self._hits += 1
+            else:
+                self._misses += 1
+        return vector
+
+    def put(self, key: str, vector: List[float]):
+        """
+        Store a query vector.
+
+        Args:
+            key: Cache key from content_key
+            vector: Query embedding
+        """
+        array = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, array)
+        if self.persistent is not None:
+            self.persistent.put_many({key: array})
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of cache metrics.
+
+        Returns:
+            Dictionary with hit/miss counts and size
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._memory),
+                "persistent": self.persistent is not None,
+            }
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated queries from a QueryEmbeddingCache.
+
+    Document embeddings pass straight through to the wrapped model.
+    """
+
+    def __init__(self, base: Embeddings, cache: QueryEmbeddingCache, namespace: str):
+        """
+        Args:
+            base: Embedding model used for cache misses
+            cache: Query vector cache
+            namespace: Model identity folded into every cache key
+        """
+        self.base = base
+        self.cache = cache
+        self.namespace = f"query:{namespace}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = content_key(self.namespace, text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.cache.put(key, vector)
+            return list(vector)
+        return vector.tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries, serving cached ones and embedding the rest
+        in a single forward pass.
+
+        Args:
+            texts: Query texts
+
+        Returns:
+            One vector per query, in order
+        """
+        keys = [content_key(self.namespace, text) for text in texts]
+        found = {key: self.cache.get(key) for key in dict.fromkeys(keys)}
+
+        missing = OrderedDict()
+        for key, text in zip(keys, texts):
+            if found[key] is None:
+                missing[key] = text
+
+        if missing:
+            # Like embed_query, skip the document cache below this wrapper
+            model = self.base.base if isinstance(self.base, CachedEmbeddings) else self.base
+            embed = getattr(model, "embed_queries", model.embed_documents)
+            vectors = embed(list(missing.values()))
+            for key, vector in zip(missing.keys(), vectors):
+                self.cache.put(key, vector)
+                found[key] = np.asarray(vector, dtype=np.float32)
+
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.base.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = content_key(self.namespace, text)
+        vector = await asyncio.to_thread(self.cache.get, key)
+        if vector is None:
+            vector = await self.base.aembed_query(text)
+            await asyncio.to_thread(self.cache.put, key, vector)
+            return list(vector)
+        return vector.tolist()
+
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_embedding_cache(path: str, max_entries: int, memory_entries: int) -> EmbeddingCache:
+    """
+    Get the process-wide cache, opening it on first use.
+
+    Args:
+        path: SQLite file holding the persisted vectors
+        max_entries: Maximum vectors kept on disk
+        memory_entries: Maximum vectors kept in memory
+
+    Returns:
+        Shared EmbeddingCache instance
+    """
+    global _shared_cache
+
+    if _shared_cache is not None:
+        return _shared_cache
+
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache(path, max_entries, memory_entries)
+    return _shared_cache
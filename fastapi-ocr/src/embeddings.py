@@ -0,0 +1,181 @@
+"""
+Embedding Service Module
+
+Owns the process-wide embedding models and ChromaDB client. Both are
+created lazily on first use and then shared by every vector store, so
+building a VectorStoreManager or a retriever per request costs nothing.
+Models are wrapped in a content-addressed cache, so known chunks are never
+re-embedded, a query vector LRU, so repeated questions are never re-embedded,
+and a micro-batching dispatcher, so concurrent cache misses share forward
+passes.
+"""
+import os
+import sys
+import threading
+
+import chromadb
+from chromadb.config import Settings
+
+try:
+    from langchain_huggingface import HuggingFaceEmbeddings
+except ImportError:
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+try:
+    from langchain_openai import OpenAIEmbeddings
+except ImportError:
+    OpenAIEmbeddings = None
+
+# Add parent directory to path for config import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.embedding_batcher import MicroBatchEmbeddings
+from src.embedding_cache import (
+    CachedEmbeddings,
+    CachedQueryEmbeddings,
+    EmbeddingCache,
+    QueryEmbeddingCache,
+    get_embedding_cache,
+)
+
+
+_models = {}
+_chroma_client = None
+_query_cache = None
+_lock = threading.Lock()
+
+
+def _build_embedding_model(provider: str, model_name: str, normalize: bool):
+    if provider == "openai":
+        if not (config.OPENAI_API_KEY and OpenAIEmbeddings):
+            raise ValueError("OpenAI embeddings requested but OPENAI_API_KEY or langchain_openai is missing")
+        return OpenAIEmbeddings(openai_api_key=config.OPENAI_API_KEY)
+
+    encode_kwargs = {"normalize_embeddings": True} if normalize else {}
+    return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs=encode_kwargs)
+
+
+def _get_query_cache() -> QueryEmbeddingCache:
+    # Called under _lock from get_embedding_model
+    global _query_cache
+    if _query_cache is None:
+        persistent = None
+        if config.QUERY_CACHE_PERSIST:
+            persistent = EmbeddingCache(
+                config.QUERY_CACHE_PATH,
+                max_entries=config.QUERY_CACHE_MAX_ENTRIES * 10,
+                memory_entries=0
+            )
+        _query_cache = QueryEmbeddingCache(config.QUERY_CACHE_MAX_ENTRIES, persistent)
+    return _query_cache
+
+
+def _wrap_embedding_model(model, namespace: str):
+    if config.EMBED_MICRO_BATCH:
+        model = MicroBatchEmbeddings(
+            model,
+            max_batch_size=config.EMBED_MAX_BATCH_SIZE,
+            max_wait_ms=config.EMBED_MAX_WAIT_MS
+        )
+
+    if config.EMBEDDING_CACHE_ENABLED:
+        cache = get_embedding_cache(
+            config.EMBEDDING_CACHE_PATH,
+            config.EMBEDDING_CACHE_MAX_ENTRIES,
+            config.EMBEDDING_CACHE_MEMORY_ENTRIES
+        )
+        model = CachedEmbeddings(model, cache, namespace)
+
+    if config.QUERY_CACHE_ENABLED:
+        model = CachedQueryEmbeddings(model, _get_query_cache(), namespace)
+
+    return model
+
+
+def _namespace(provider: str, model_name: str, normalize: bool) -> str:
+    if provider == "openai":
+        # OpenAIEmbeddings defaults to text-embedding-ada-002 unless overridden
+        return "openai:default"
+    return f"{provider}:{model_name}:{'norm' if normalize else 'raw'}"
+
+
+def get_embedding_model(
+    model_name: str = None,
+    normalize: bool = True,
+    provider: str = "huggingface",
+):
+    """
+    Get the shared embedding model, loading it on first use.
+
+    Each distinct (provider, model, normalize) combination is loaded once
+    per process; later calls return the same instance.
+
+    Args:
+        model_name: Embedding model name (default from config)
+        normalize: Whether to L2-normalise HuggingFace embeddings
+        provider: 'huggingface' or 'openai'
+
+    Returns:
+        LangChain Embeddings instance
+    """
+    if model_name is None:
+        model_name = config.HUGGINGFACE_EMBEDDING_MODEL
+
+    key = (provider, model_name, normalize)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            print(f"⚙ Loading embedding model '{model_name}' ({provider}, one-time setup)...")
+            model = _wrap_embedding_model(
+                _build_embedding_model(provider, model_name, normalize),
+                _namespace(provider, model_name, normalize)
+            )
+            _models[key] = model
+    return model
+
+
+def embedding_metrics() -> dict:
+    """
+    Cache and batching metrics for every loaded embedding model.
+
+    Returns:
+        Dictionary keyed by model namespace with each model's stats
+    """
+    metrics = {}
+    for key, model in list(_models.items()):
+        entry = {}
+        if isinstance(model, CachedQueryEmbeddings):
+            entry["query_cache"] = model.cache.stats()
+            model = model.base
+        if isinstance(model, CachedEmbeddings):
+            entry["cache"] = model.cache.stats()
+            model = model.base
+        if isinstance(model, MicroBatchEmbeddings):
+            entry["batching"] = model.stats()
+        metrics[_namespace(*key)] = entry
+    return metrics
+
+
+def get_chroma_client():
+    """
+    Get the shared persistent ChromaDB client, creating it on first use.
+
+    Returns:
+        chromadb PersistentClient instance
+    """
+    global _chroma_client
+
+    if _chroma_client is not None:
+        return _chroma_client
+
+    with _lock:
+        if _chroma_client is None:
+            _chroma_client = chromadb.PersistentClient(
+                path=config.CHROMA_PERSIST_DIRECTORY,
+                settings=Settings(anonymized_telemetry=False)
+            )
+    return _chroma_client
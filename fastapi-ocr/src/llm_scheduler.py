@@ -0,0 +1,470 @@
+"""
+LLM Scheduler Module
+
+Admission control in front of a model backend. At most `max_in_flight`
+generations run at once. Set it to the backend's real parallelism, e.g.
+OLLAMA_NUM_PARALLEL, and everything else waits in the scheduler instead of
+inside the server. Waiting requests are served by priority class first
+(interactive before batch). Within a class they are served round-robin
+across users, so one user's report fan-out cannot hold back everyone else.
+
+Callers declare the class and user with `llm_request(...)`. The values live
+in context variables and reach every LLM call made underneath, including
+calls in worker threads started with a copied context and in asyncio tasks.
+Threads and coroutines wait in the same queues; a coroutine waits without
+holding a thread.
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.globals import get_llm_cache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import convert_to_messages, messages_to_dict
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.tracers.base import BaseTracer
+
+from src.single_flight import fingerprint, get_single_flight
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)  # Highest first
+
+_priority = contextvars.ContextVar("llm_priority", default=BATCH)
+_user = contextvars.ContextVar("llm_user", default=None)
+
+
+@contextmanager
+def llm_request(priority: str = BATCH, user_id: Optional[str] = None):
+    """
+    Tag the LLM calls made inside the block.
+
+    Args:
+        priority: INTERACTIVE or BATCH
+        user_id: User the calls are made for (fairness key)
+    """
+    priority_token = _priority.set(priority)
+    user_token = _user.set(user_id)
+    try:
+        yield
+    finally:
+        _priority.reset(priority_token)
+        _user.reset(user_token)
+
+
+def scheduled_as(priority: str, user_arg: str = "user_id"):
+    """
+    Decorator running a function inside llm_request(priority, <user_arg>).
+
+    Args:
+        priority: INTERACTIVE or BATCH
+        user_arg: Name of the function argument holding the user id
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                user_id = signature.bind_partial(*args, **kwargs).arguments.get(user_arg)
+                with llm_request(priority, user_id):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            user_id = signature.bind_partial(*args, **kwargs).arguments.get(user_arg)
+            with llm_request(priority, user_id):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def current_request():
+    """(priority, user_id) of the calling context."""
+    return _priority.get(), _user.get()
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class _ThreadWaiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+    def grant(self):
+        self.event.set()
+
+
+class _AsyncWaiter:
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+    def _wake(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+    def grant(self):
+        # release() may run on any thread
+        self.loop.call_soon_threadsafe(self._wake)
+
+
+class LLMScheduler:
+    """Bounded-concurrency gate with priority classes and per-user round-robin."""
+
+    def __init__(self, name: str, max_in_flight: int, latency_window: int = 1000):
+        """
+        Args:
+            name: Backend name (used in metrics)
+            max_in_flight: Generations allowed to run at the same time
+            latency_window: Recent queue waits kept per class for percentiles
+        """
+        self.name = name
+        self.max_in_flight = max(1, int(max_in_flight))
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # priority -> {user: deque of waiters}; users rotate after each grant
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self._waits = {priority: deque(maxlen=latency_window) for priority in PRIORITIES}
+        self._granted = {priority: 0 for priority in PRIORITIES}
+        self._max_wait = {priority: 0.0 for priority in PRIORITIES}
+
+    def _queued(self) -> int:
+        return sum(len(q) for users in self._queues.values() for q in users.values())
+
+    def _next_waiter(self):
+        for priority in PRIORITIES:
+            users = self._queues[priority]
+            if not users:
+                continue
+            user, waiting = next(iter(users.items()))
+            waiter = waiting.popleft()
+            if waiting:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            waiter.granted = True
+            return waiter
+        return None
+
+    def _resolve(self, priority: Optional[str], user_id: Optional[str]):
+        context_priority, context_user = current_request()
+        priority = priority or context_priority
+        if priority not in self._queues:
+            priority = BATCH
+        return priority, user_id or context_user or "anonymous"
+
+    def _admit(self, priority: str, user_id: str, waiter) -> bool:
+        """Take a free slot (True) or queue the waiter (False). Caller holds the lock."""
+        if self._in_flight < self.max_in_flight and not self._queued():
+            self._in_flight += 1
+            self._record(priority, 0.0)
+            return True
+        self._queues[priority].setdefault(user_id, deque()).append(waiter)
+        return False
+
+    def _record(self, priority: str, waited: float):
+        self._granted[priority] += 1
+        self._waits[priority].append(waited)
+        self._max_wait[priority] = max(self._max_wait[priority], waited)
+
+    def acquire(self, priority: Optional[str] = None, user_id: Optional[str] = None) -> float:
+        """
+        Block until a generation slot is free.
+
+        Args:
+            priority: Class to queue in (default: the calling context's)
+            user_id: Fairness key (default: the calling context's)
+
+        Returns:
+            Seconds spent waiting
+        """
+        priority, user_id = self._resolve(priority, user_id)
+        started = time.monotonic()
+        waiter = _ThreadWaiter()
+        with self._lock:
+            if self._admit(priority, user_id, waiter):
+                return 0.0
+
+        # release() hands its slot straight to us, so in_flight is already counted
+        waiter.event.wait()
+        waited = time.monotonic() - started
+        with self._lock:
+            self._record(priority, waited)
+        return waited
+
+    async def acquire_async(self, priority: Optional[str] = None, user_id: Optional[str] = None) -> float:
+        """
+        Wait for a generation slot without blocking the event loop.
+
+        Args:
+            priority: Class to queue in (default: the calling context's)
+            user_id: Fairness key (default: the calling context's)
+
+        Returns:
+            Seconds spent waiting
+        """
+        priority, user_id = self._resolve(priority, user_id)
+        started = time.monotonic()
+        waiter = _AsyncWaiter(asyncio.get_running_loop())
+        with self._lock:
+            if self._admit(priority, user_id, waiter):
+                return 0.0
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    waiting = self._queues[priority].get(user_id)
+                    if waiting is not None and waiter in waiting:
+                        waiting.remove(waiter)
+                        if not waiting:
+                            del self._queues[priority][user_id]
+            if granted:
+                # The slot was handed over as the caller went away
+                self.release()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._record(priority, waited)
+        return waited
+
+    def release(self):
+        """Give the slot to the next waiter, or free it."""
+        with self._lock:
+            waiter = self._next_waiter()
+            if waiter is None:
+                self._in_flight -= 1
+        if waiter is not None:
+            waiter.grant()
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, user_id: Optional[str] = None):
+        """Hold a generation slot for the duration of the block."""
+        self.acquire(priority, user_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, priority: Optional[str] = None, user_id: Optional[str] = None):
+        """Async counterpart of slot()."""
+        await self.acquire_async(priority, user_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """
+        Snapshot of scheduler metrics.
+
+        Returns:
+            Dictionary with in-flight/queued counts and queue waits per class
+        """
+        with self._lock:
+            classes = {}
+            for priority in PRIORITIES:
+                waits = list(self._waits[priority])
+                classes[priority] = {
+                    "queued": sum(len(q) for q in self._queues[priority].values()),
+                    "granted": self._granted[priority],
+                    "wait_p50_ms": round(_percentile(waits, 0.50) * 1000, 1) if waits else 0.0,
+                    "wait_p95_ms": round(_percentile(waits, 0.95) * 1000, 1) if waits else 0.0,
+                    "wait_max_ms": round(self._max_wait[priority] * 1000, 1),
+                }
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "classes": classes,
+            }
+
+
+def _streams_tokens(llm, config: Optional[RunnableConfig]) -> bool:
+    """Whether a handler on the model or the call consumes individual tokens."""
+    handlers = []
+    for callbacks in (getattr(llm, "callbacks", None), (config or {}).get("callbacks")):
+        if callbacks is None:
+            continue
+        handlers.extend(getattr(callbacks, "handlers", callbacks))
+    return any(
+        not isinstance(handler, BaseTracer)
+        and type(handler).on_llm_new_token is not BaseCallbackHandler.on_llm_new_token
+        for handler in handlers
+    )
+
+
+class ScheduledLLM(Runnable):
+    """
+    Runnable wrapper that runs every call to a chat model through a scheduler.
+
+    Composes with prompts and parsers like the wrapped model does
+    (`prompt | llm | parser`). A streamed call keeps its slot until the
+    stream is consumed.
+
+    Identical prompts invoked concurrently are coalesced: only the first
+    takes a slot and runs, the others wait for its message. Calls with a
+    token-streaming callback always run on their own so they get tokens.
+    Calls the model's response cache can answer skip the queue.
+
+    Runnables derived from the model through the wrapper (bind_tools,
+    with_structured_output, ...) are wrapped in turn, so they stay scheduled.
+    """
+
+    def __init__(self, llm, scheduler: LLMScheduler, coalesce: bool = True):
+        self.llm = llm
+        self.scheduler = scheduler
+        self.coalesce = coalesce
+        self._in_flight = get_single_flight("llm")
+
+    def _fingerprint(self, input: Any, kwargs: dict) -> Optional[str]:
+        try:
+            if isinstance(input, PromptValue):
+                messages = input.to_messages()
+            elif isinstance(input, str):
+                messages = convert_to_messages([input])
+            else:
+                messages = convert_to_messages(input)
+            model = self.llm._get_llm_string(**kwargs)
+        except Exception:
+            return None
+        return fingerprint(model, messages_to_dict(messages))
+
+    def _cached(self, input: Any, kwargs: dict) -> bool:
+        """Whether the model's response cache holds this call (keyed as LangChain does)."""
+        llm = self.llm
+        if not isinstance(llm, BaseChatModel) or llm.cache is False:
+            return False
+        cache = llm.cache if isinstance(llm.cache, BaseCache) else get_llm_cache()
+        if cache is None:
+            return False
+        try:
+            messages = [
+                m.model_copy(update={"id": None}) if getattr(m, "id", None) is not None else m
+                for m in llm._convert_input(input).to_messages()
+            ]
+            prompt = dumps(messages)
+            llm_string = llm._get_llm_string(**kwargs)
+        except Exception:
+            return False
+        # Peek without counting a hit when the cache supports it
+        contains = getattr(cache, "contains", None)
+        if contains is not None:
+            return contains(prompt, llm_string)
+        return cache.lookup(prompt, llm_string) is not None
+
+    def _invoke(self, input: Any, config: Optional[RunnableConfig], **kwargs: Any) -> Any:
+        if self._cached(input, kwargs):
+            # Served from the cache: no generation slot needed
+            return self.llm.invoke(input, config, **kwargs)
+        with self.scheduler.slot():
+            return self.llm.invoke(input, config, **kwargs)
+
+    async def _ainvoke(self, input: Any, config: Optional[RunnableConfig], **kwargs: Any) -> Any:
+        if await asyncio.to_thread(self._cached, input, kwargs):
+            return await self.llm.ainvoke(input, config, **kwargs)
+        async with self.scheduler.aslot():
+            return await self.llm.ainvoke(input, config, **kwargs)
+
+    @property
+    def InputType(self):
+        return self.llm.InputType
+
+    @property
+    def OutputType(self):
+        return self.llm.OutputType
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        if self.coalesce and not _streams_tokens(self.llm, config):
+            key = self._fingerprint(input, kwargs)
+            if key is not None:
+                return self._in_flight.do(key, self._invoke, input, config, **kwargs)
+        return self._invoke(input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        with self.scheduler.slot():
+            yield from self.llm.stream(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        # The model's own async client does the I/O; no thread is held while waiting
+        if self.coalesce and not _streams_tokens(self.llm, config):
+            key = self._fingerprint(input, kwargs)
+            if key is not None:
+                return await self._in_flight.do_async(key, self._ainvoke, input, config, **kwargs)
+        return await self._ainvoke(input, config, **kwargs)
+
+    async def astream(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        async with self.scheduler.aslot():
+            async for chunk in self.llm.astream(input, config, **kwargs):
+                yield chunk
+
+    def __getattr__(self, name):
+        # Model attributes (model name, temperature, ...) read through the wrapper
+        if name in ("llm", "scheduler", "coalesce", "_in_flight"):
+            raise AttributeError(name)
+        value = getattr(self.llm, name)
+        if not callable(value) or isinstance(value, type):
+            return value
+
+        @functools.wraps(value)
+        def scheduled(*args, **kwargs):
+            result = value(*args, **kwargs)
+            # A runnable built from the raw model would bypass the scheduler
+            if isinstance(result, Runnable) and not isinstance(result, ScheduledLLM):
+                return ScheduledLLM(result, self.scheduler, coalesce=self.coalesce)
+            return result
+        return scheduled
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(name: str, max_in_flight: int) -> LLMScheduler:
+    """
+    Get the process-wide scheduler for a backend, creating it on first use.
+
+    Args:
+        name: Backend name (e.g. "ollama", "huggingface")
+        max_in_flight: Concurrency limit used when the scheduler is created
+
+    Returns:
+        Shared LLMScheduler instance
+    """
+    with _schedulers_lock:
+        if name not in _schedulers:
+            _schedulers[name] = LLMScheduler(name, max_in_flight)
+        return _schedulers[name]
+
+
+def scheduler_stats() -> dict:
+    """Metrics of every scheduler created so far, keyed by backend."""
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {name: scheduler.stats() for name, scheduler in schedulers.items()}
@@ -0,0 +1,848 @@
+"""
+Local Vector Index Module
+
+In-process vector index used as an alternative to MongoDB Atlas Vector
+Search. Vectors live in a (optionally memory-mapped) float32 matrix, chunk
+records are compact slot-based arrays, and search is either exact (one
+matrix product) or approximate over an HNSW graph. Metadata pre-filters on
+indexed fields such as user_id and source are applied before scoring.
+
+With int8 quantisation the exact scan runs over compact resident codes and
+only a shortlist is re-scored against the full-precision vectors, which stay
+on disk in the memory-mapped matrix.
+"""
+import heapq
+import json
+import math
+import os
+import pickle
+import random
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from src.quantization import ScalarQuantizer
+
+# Vectors sampled to train the quantiser, and rows encoded per block
+QUANTIZER_SAMPLE = 20000
+ENCODE_BLOCK = 16384
+
+
+class LocalVectorIndex:
+    """
+    Slot-based vector index with exact and HNSW-style approximate search.
+
+    Every chunk occupies one slot: row `slot` of the vector matrix plus an
+    entry in a handful of parallel arrays (alive flag, one interned code per
+    filter field) and Python lists for id, text and metadata. Deletes only
+    clear the alive flag; `compact()` reclaims the space.
+
+    When `path` is set the matrix is a memory-mapped file that grows in
+    place, and records are appended to a JSON-lines log, so writes cost
+    O(batch) rather than O(index).
+
+    With `quantization="int8"` every slot also gets a one-byte-per-dimension
+    code (after an optional PCA projection). Exact search scans the codes,
+    keeps `rescore_factor * k` candidates and re-scores those rows of the
+    float matrix, so only the codes have to stay resident. The quantiser is
+    trained once `quantize_min_train` chunks exist; until then search uses
+    the float matrix. Graph search keeps using full-precision rows, since it
+    only touches the few nodes it visits.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        filter_fields: Sequence[str] = ("user_id", "source"),
+        approximate: bool = False,
+        hnsw_m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        exact_filter_ratio: float = 0.05,
+        quantization: str = "none",
+        pca_dims: Optional[int] = None,
+        rescore_factor: int = 4,
+        quantize_min_train: int = 1024,
+    ):
+        """
+        Create or open an index.
+
+        Args:
+            path: Directory for persistence (None keeps everything in memory)
+            filter_fields: Metadata fields that can be used as pre-filters
+            approximate: Maintain an HNSW graph and search it by default
+            hnsw_m: Graph degree (neighbours kept per node per layer)
+            ef_construction: Beam width while inserting
+            ef_search: Beam width while searching
+            exact_filter_ratio: Use exact search when a filter matches less
+                than this fraction of live chunks (graph search degrades on
+                very selective filters)
+            quantization: "none" or "int8" (compact codes for the exact scan)
+            pca_dims: Project to this many principal components before
+                quantising (None keeps every dimension)
+            rescore_factor: Candidates re-scored at full precision per result
+            quantize_min_train: Live chunks needed before the quantiser is
+                trained
+        """
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"Unknown quantization '{quantization}' (expected 'none' or 'int8')")
+
+        self.path = path
+        self.filter_fields = tuple(filter_fields)
+        self.approximate = approximate
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.exact_filter_ratio = exact_filter_ratio
+        self.quantization = quantization
+        self.pca_dims = pca_dims
+        self.rescore_factor = max(1, rescore_factor)
+        self.quantize_min_train = quantize_min_train
+
+        self.dim = None
+        self._capacity = 0
+        self._size = 0
+        self._vectors = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._codes = {field: np.zeros(0, dtype=np.int32) for field in self.filter_fields}
+        self._vocab = {field: {} for field in self.filter_fields}
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._live = 0
+
+        # int8 codes, one row per slot, once the quantiser is trained
+        self._quantizer: Optional[ScalarQuantizer] = None
+        self._qcodes = None
+
+        # HNSW graph: per slot, one neighbour list per layer
+        self._graph: List[List[List[int]]] = []
+        self._entry = None
+        self._max_level = -1
+        self._level_mult = 1.0 / math.log(max(hnsw_m, 2))
+        self._rng = random.Random(42)
+
+        self._lock = threading.RLock()
+        self._log = None
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _write_meta(self):
+        with open(self._file("meta.json"), "w") as f:
+            json.dump({"dim": self.dim, "capacity": self._capacity}, f)
+
+    def _open_matrix(self, capacity: int):
+        vector_file = self._file("vectors.f32")
+        with open(vector_file, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        return np.memmap(vector_file, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _load(self):
+        meta_file = self._file("meta.json")
+        if os.path.exists(meta_file):
+            with open(meta_file) as f:
+                meta = json.load(f)
+            if meta.get("dim"):
+                self.dim = meta["dim"]
+                self._capacity = meta["capacity"]
+                self._vectors = self._open_matrix(self._capacity)
+                self._alive = np.zeros(self._capacity, dtype=bool)
+                self._codes = {
+                    field: np.zeros(self._capacity, dtype=np.int32) for field in self.filter_fields
+                }
+
+        log_file = self._file("records.jsonl")
+        if os.path.exists(log_file):
+            with open(log_file) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record["op"] == "add":
+                        self._append_record(record["id"], record["text"], record["metadata"])
+                    elif record["op"] == "delete":
+                        self._delete_record(record["id"])
+
+        if self.approximate and self._size:
+            self._load_graph()
+
+        if self.quantization != "none":
+            self._load_quantizer()
+
+        self._log = open(log_file, "a")
+
+    def _load_quantizer(self):
+        quantizer_file = self._file("quantizer.npz")
+        if os.path.exists(quantizer_file):
+            with np.load(quantizer_file) as state:
+                self._quantizer = ScalarQuantizer.from_state(state)
+            configured = self.pca_dims if self.pca_dims and self.pca_dims < self.dim else None
+            if self._quantizer.pca_dims != configured:
+                # Settings changed since the codes were written: retrain
+                self._quantizer = None
+
+        if self._quantizer is None:
+            self._maybe_train_quantizer()
+            return
+
+        self._qcodes = np.zeros((self._capacity, self._quantizer.code_dims), dtype=np.int8)
+        codes_file = self._file("codes.i8")
+        expected = self._size * self._quantizer.code_dims
+        if os.path.exists(codes_file) and os.path.getsize(codes_file) >= expected:
+            stored = np.fromfile(codes_file, dtype=np.int8, count=expected)
+            self._qcodes[:self._size] = stored.reshape(self._size, -1)
+        else:
+            # Codes file missing or short (crash between writes): re-encode
+            self._encode_slots(0, self._size, rewrite=True)
+
+    def _write_codes(self, start: int, end: int, rewrite: bool = False):
+        if not self.path:
+            return
+        codes_file = self._file("codes.i8")
+        mode = "r+b" if os.path.exists(codes_file) and not rewrite else "wb"
+        with open(codes_file, mode) as f:
+            f.seek(start * self._quantizer.code_dims)
+            f.write(self._qcodes[start:end].tobytes())
+
+    def _load_graph(self):
+        graph_file = self._file("graph.pkl")
+        built = 0
+        if os.path.exists(graph_file):
+            with open(graph_file, "rb") as f:
+                snapshot = pickle.load(f)
+            built = min(snapshot["size"], self._size)
+            self._graph = [layers for layers in snapshot["graph"][:built]]
+            self._entry = snapshot["entry"] if built else None
+            self._max_level = snapshot["max_level"] if built else -1
+
+        # Slots written after the last snapshot are inserted again
+        for slot in range(built, self._size):
+            self._hnsw_insert(slot)
+
+    def save_graph(self):
+        """Snapshot the HNSW graph so it does not need rebuilding on start."""
+        if not (self.path and self.approximate):
+            return
+        with self._lock:
+            snapshot = {
+                "size": len(self._graph),
+                "graph": self._graph,
+                "entry": self._entry,
+                "max_level": self._max_level,
+            }
+            tmp = self._file("graph.pkl.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._file("graph.pkl"))
+
+    def flush(self):
+        """Flush the vector matrix and record log to disk."""
+        with self._lock:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            if self._log:
+                self._log.flush()
+
+    # ------------------------------------------------------------------
+    # Slot management
+    # ------------------------------------------------------------------
+    def _maybe_train_quantizer(self):
+        if self.quantization == "none" or self._quantizer is not None or self._live < self.quantize_min_train:
+            return
+
+        live = np.flatnonzero(self._alive[:self._size])
+        if len(live) > QUANTIZER_SAMPLE:
+            live = np.sort(np.random.default_rng(0).choice(live, QUANTIZER_SAMPLE, replace=False))
+        self._quantizer = ScalarQuantizer(self.pca_dims).fit(self._vectors[live])
+        self._qcodes = np.zeros((self._capacity, self._quantizer.code_dims), dtype=np.int8)
+        self._encode_slots(0, self._size, rewrite=True)
+
+        if self.path:
+            tmp = self._file("quantizer.npz.tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, **self._quantizer.state())
+            os.replace(tmp, self._file("quantizer.npz"))
+
+    def _encode_slots(self, start: int, end: int, rewrite: bool = False):
+        for block in range(start, end, ENCODE_BLOCK):
+            stop = min(end, block + ENCODE_BLOCK)
+            self._qcodes[block:stop] = self._quantizer.encode(self._vectors[block:stop])
+        self._write_codes(start, end, rewrite)
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self._capacity:
+            return
+
+        capacity = max(needed, self._capacity * 2, 1024)
+        if self.path:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            self._vectors = self._open_matrix(capacity)
+            self._capacity = capacity
+            self._write_meta()
+        else:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            if self._size:
+                vectors[:self._size] = self._vectors[:self._size]
+            self._vectors = vectors
+            self._capacity = capacity
+
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+        for field in self.filter_fields:
+            codes = np.zeros(capacity, dtype=np.int32)
+            codes[:self._size] = self._codes[field][:self._size]
+            self._codes[field] = codes
+        if self._qcodes is not None:
+            qcodes = np.zeros((capacity, self._qcodes.shape[1]), dtype=np.int8)
+            qcodes[:self._size] = self._qcodes[:self._size]
+            self._qcodes = qcodes
+
+    def _code(self, field: str, value, create: bool) -> int:
+        vocab = self._vocab[field]
+        key = "" if value is None else str(value)
+        code = vocab.get(key)
+        if code is None and create:
+            code = len(vocab) + 1
+            vocab[key] = code
+        return code if code is not None else -1
+
+    def _append_record(self, chunk_id: str, text: str, metadata: Dict[str, Any]) -> int:
+        if chunk_id in self._slot_of:
+            self._delete_record(chunk_id)
+
+        slot = self._size
+        self._size += 1
+        self._ids.append(chunk_id)
+        self._texts.append(text)
+        self._metadata.append(metadata)
+        self._slot_of[chunk_id] = slot
+        self._alive[slot] = True
+        self._live += 1
+        for field in self.filter_fields:
+            self._codes[field][slot] = self._code(field, metadata.get(field), create=True)
+        return slot
+
+    def _delete_record(self, chunk_id: str) -> bool:
+        slot = self._slot_of.pop(chunk_id, None)
+        if slot is None:
+            return False
+        self._alive[slot] = False
+        self._live -= 1
+        # Drop the payload; the slot stays as a tombstone until compact()
+        self._texts[slot] = ""
+        self._metadata[slot] = {}
+        return True
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        texts: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+    ):
+        """
+        Insert or replace chunks.
+
+        Args:
+            ids: Chunk ids (an existing id is replaced)
+            vectors: Embeddings, one per chunk
+            texts: Chunk texts
+            metadatas: Chunk metadata dictionaries
+        """
+        if not ids:
+            return
+
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                if self.path:
+                    self._write_meta()
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {matrix.shape[1]} does not match index dimension {self.dim}")
+
+            self._ensure_capacity(self._size + len(ids))
+            first = self._size
+
+            for chunk_id, vector, text, metadata in zip(ids, matrix, texts, metadatas):
+                metadata = dict(metadata or {})
+                slot = self._append_record(chunk_id, text, metadata)
+                self._vectors[slot] = vector
+                if self._log:
+                    self._log.write(json.dumps(
+                        {"op": "add", "id": chunk_id, "text": text, "metadata": metadata}
+                    ) + "\n")
+                if self.approximate:
+                    self._hnsw_insert(slot)
+
+            if self._quantizer is not None:
+                self._encode_slots(first, self._size)
+            else:
+                self._maybe_train_quantizer()
+
+            self.flush()
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """
+        Delete chunks by id.
+
+        Args:
+            ids: Chunk ids
+
+        Returns:
+            Number of chunks removed
+        """
+        removed = 0
+        with self._lock:
+            for chunk_id in ids:
+                if self._delete_record(chunk_id):
+                    removed += 1
+                    if self._log:
+                        self._log.write(json.dumps({"op": "delete", "id": chunk_id}) + "\n")
+            if removed:
+                self.flush()
+        return removed
+
+    def compact(self):
+        """Rewrite the index without tombstoned slots and rebuild the graph."""
+        with self._lock:
+            live = [slot for slot in range(self._size) if self._alive[slot]]
+            records = [
+                (self._ids[slot], np.array(self._vectors[slot]), self._texts[slot], self._metadata[slot])
+                for slot in live
+            ]
+
+            if self.path:
+                if self._log:
+                    self._log.close()
+                for name in ("records.jsonl", "vectors.f32", "meta.json", "graph.pkl", "quantizer.npz", "codes.i8"):
+                    if os.path.exists(self._file(name)):
+                        os.remove(self._file(name))
+                self._log = open(self._file("records.jsonl"), "a")
+
+            self.dim = None
+            self._capacity = 0
+            self._size = 0
+            self._live = 0
+            self._vectors = None
+            self._alive = np.zeros(0, dtype=bool)
+            self._codes = {field: np.zeros(0, dtype=np.int32) for field in self.filter_fields}
+            self._vocab = {field: {} for field in self.filter_fields}
+            self._ids, self._texts, self._metadata = [], [], []
+            self._slot_of = {}
+            self._graph, self._entry, self._max_level = [], None, -1
+            # Retrained on the surviving vectors
+            self._quantizer, self._qcodes = None, None
+
+            if records:
+                ids, vectors, texts, metadatas = zip(*records)
+                self.add(list(ids), np.stack(vectors), list(texts), list(metadatas))
+            self.save_graph()
+
+    # ------------------------------------------------------------------
+    # HNSW graph
+    # ------------------------------------------------------------------
+    def _max_degree(self, level: int) -> int:
+        return self.hnsw_m * 2 if level == 0 else self.hnsw_m
+
+    def _search_layer(self, query, entry_points, ef, level, accept=None) -> List[Tuple[float, int]]:
+        vectors = self._vectors
+        visited = set(entry_points)
+        sims = vectors[list(entry_points)] @ query
+
+        candidates = [(-float(s), p) for s, p in zip(sims, entry_points)]
+        heapq.heapify(candidates)
+        results = [(float(s), p) for s, p in zip(sims, entry_points) if accept is None or accept(p)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, current = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_sim < results[0][0]:
+                break
+
+            layers = self._graph[current]
+            if level >= len(layers):
+                continue
+            fresh = [n for n in layers[level] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+
+            for sim, node in zip(vectors[fresh] @ query, fresh):
+                sim = float(sim)
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, node))
+                    if accept is None or accept(node):
+                        heapq.heappush(results, (sim, node))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _hnsw_insert(self, slot: int):
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        self._graph.append([[] for _ in range(level + 1)])
+
+        if self._entry is None:
+            self._entry, self._max_level = slot, level
+            return
+
+        query = self._vectors[slot]
+        entry_points = [self._entry]
+        for layer in range(self._max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+
+        for layer in range(min(level, self._max_level), -1, -1):
+            found = self._search_layer(query, entry_points, self.ef_construction, layer)
+            neighbours = [node for _, node in found if node != slot][:self.hnsw_m]
+            self._graph[slot][layer] = neighbours
+
+            limit = self._max_degree(layer)
+            for node in neighbours:
+                links = self._graph[node][layer]
+                links.append(slot)
+                if len(links) > limit:
+                    sims = self._vectors[links] @ self._vectors[node]
+                    keep = np.argsort(-sims)[:limit]
+                    self._graph[node][layer] = [links[i] for i in keep]
+
+            entry_points = [node for _, node in found]
+
+        if level > self._max_level:
+            self._entry, self._max_level = slot, level
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def _filter_mask(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        n = self._size
+        mask = self._alive[:n].copy()
+        for field, value in (filters or {}).items():
+            if field not in self._codes:
+                raise ValueError(f"Field '{field}' is not an indexed filter field {self.filter_fields}")
+            code = self._code(field, value, create=False)
+            if code < 0:
+                return np.zeros(n, dtype=bool)
+            mask &= self._codes[field][:n] == code
+        return mask
+
+    def _records(self, hits: Iterable[Tuple[float, int]], include_vectors: bool = False) -> List[tuple]:
+        if include_vectors:
+            return [
+                (self._ids[slot], float(score), self._texts[slot], self._metadata[slot], np.array(self._vectors[slot]))
+                for score, slot in hits
+            ]
+        return [
+            (self._ids[slot], float(score), self._texts[slot], self._metadata[slot])
+            for score, slot in hits
+        ]
+
+    def _exact(self, queries: np.ndarray, k: int, mask: np.ndarray) -> List[List[Tuple[float, int]]]:
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return [[] for _ in range(len(queries))]
+
+        if self._quantizer is not None:
+            return self._rescored(queries, k, candidates)
+
+        scores = self._vectors[candidates] @ queries.T
+        k = min(k, candidates.size)
+        results = []
+        for column in range(queries.shape[0]):
+            column_scores = scores[:, column]
+            top = np.argpartition(-column_scores, k - 1)[:k]
+            top = top[np.argsort(-column_scores[top])]
+            results.append([(float(column_scores[i]), int(candidates[i])) for i in top])
+        return results
+
+    def _rescored(self, queries: np.ndarray, k: int, candidates: np.ndarray) -> List[List[Tuple[float, int]]]:
+        # Whole-index scans use a view; filtered scans copy only the subset
+        codes = self._qcodes[:self._size] if candidates.size == self._size else self._qcodes[candidates]
+        approx = self._quantizer.scores(codes, queries)
+
+        shortlist = min(candidates.size, k * self.rescore_factor)
+        results = []
+        for column in range(queries.shape[0]):
+            column_scores = approx[:, column]
+            top = np.argpartition(-column_scores, shortlist - 1)[:shortlist]
+            slots = np.sort(candidates[top])  # ascending slots read the memmap in file order
+            exact = self._vectors[slots] @ queries[column]
+            best = np.argsort(-exact)[:k]
+            results.append([(float(exact[i]), int(slots[i])) for i in best])
+        return results
+
+    def _approximate(self, query: np.ndarray, k: int, mask: np.ndarray) -> List[Tuple[float, int]]:
+        entry_points = [self._entry]
+        for layer in range(self._max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+
+        found = self._search_layer(
+            query, entry_points, max(self.ef_search, k), 0, accept=lambda slot: mask[slot]
+        )
+        return found[:k]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int = 4,
+        filters: Optional[Dict[str, Any]] = None,
+        approximate: Optional[bool] = None,
+        include_vectors: bool = False,
+    ) -> List[List[tuple]]:
+        """
+        Search several query vectors with the same filter.
+
+        Args:
+            query_vectors: Query embeddings
+            k: Results per query
+            filters: Exact-match pre-filters on indexed fields, e.g.
+                {"user_id": "u1", "source": "file.pdf"}
+            approximate: Force graph (True) or exact (False) search;
+                defaults to the index setting
+            include_vectors: Also return each hit's stored (unit) vector
+
+        Returns:
+            Per query, a list of (chunk_id, score, text, metadata) sorted
+            by descending cosine similarity, with the vector appended to
+            each tuple when include_vectors is set
+        """
+        queries = self._normalize(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+
+        with self._lock:
+            if not self._live:
+                return [[] for _ in range(len(queries))]
+
+            mask = self._filter_mask(filters)
+            use_graph = self.approximate if approximate is None else approximate
+            use_graph = use_graph and self._entry is not None and len(self._graph) == self._size
+
+            # Very selective filters are cheaper (and exact) on the subset
+            if use_graph and filters and mask.sum() < self.exact_filter_ratio * self._live:
+                use_graph = False
+
+            if use_graph:
+                hits = [self._approximate(query, k, mask) for query in queries]
+            else:
+                hits = self._exact(queries, k, mask)
+
+            return [self._records(query_hits, include_vectors) for query_hits in hits]
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int = 4,
+        filters: Optional[Dict[str, Any]] = None,
+        approximate: Optional[bool] = None,
+    ) -> List[Tuple[str, float, str, Dict[str, Any]]]:
+        """
+        Search one query vector. See search_batch for the arguments.
+        """
+        return self.search_batch([query_vector], k=k, filters=filters, approximate=approximate)[0]
+
+    def get_ids(self, filters: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        List live chunk ids, optionally restricted by a pre-filter.
+
+        Args:
+            filters: Exact-match pre-filters on indexed fields
+
+        Returns:
+            Chunk ids
+        """
+        with self._lock:
+            if not self._size:
+                return []
+            return [self._ids[slot] for slot in np.flatnonzero(self._filter_mask(filters))]
+
+    def stats(self) -> dict:
+        """
+        Snapshot of index size figures.
+
+        Returns:
+            Dictionary with counts and memory use
+        """
+        with self._lock:
+            matrix_bytes = int(self._capacity * (self.dim or 0) * 4)
+            code_bytes = int(self._qcodes.nbytes) if self._qcodes is not None else 0
+            # With trained codes the on-disk matrix is only paged in for re-scoring
+            on_disk = bool(self.path) and self._quantizer is not None
+            return {
+                "dim": self.dim,
+                "slots": self._size,
+                "live": self._live,
+                "capacity": self._capacity,
+                "approximate": self.approximate,
+                "quantization": self.quantization,
+                "quantizer_trained": self._quantizer is not None,
+                "code_dims": self._quantizer.code_dims if self._quantizer is not None else None,
+                "matrix_bytes": matrix_bytes,
+                "code_bytes": code_bytes,
+                "resident_bytes": code_bytes + (0 if on_disk else matrix_bytes),
+            }
+
+
+# =========================================================
+# LANGCHAIN ADAPTER
+# =========================================================
+def _parse_pre_filter(pre_filter: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Translate Atlas-style {"field": {"$eq": value}} filters to plain equality."""
+    filters = {}
+    for field, condition in (pre_filter or {}).items():
+        if isinstance(condition, dict):
+            if set(condition) != {"$eq"}:
+                raise ValueError(f"Unsupported filter operator for '{field}': {condition}")
+            filters[field] = condition["$eq"]
+        else:
+            filters[field] = condition
+    return filters
+
+
+# Metadata field carrying a hit's vector (same default as MongoDBAtlasVectorSearch)
+EMBEDDING_KEY = "embedding"
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain VectorStore backed by a LocalVectorIndex."""
+
+    def __init__(self, index: LocalVectorIndex, embedding: Embeddings):
+        self.index = index
+        self.embedding = embedding
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+        self.index.add(ids, vectors, texts, metadatas)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        return self.index.delete(ids) > 0
+
+    @staticmethod
+    def _to_document(chunk_id: str, text: str, metadata: Dict[str, Any]) -> Document:
+        return Document(page_content=text, metadata={**metadata, "_id": chunk_id})
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        pre_filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        hits = self.index.search(embedding, k=k, filters=_parse_pre_filter(pre_filter))
+        return [(self._to_document(chunk_id, text, metadata), score) for chunk_id, score, text, metadata in hits]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        pre_filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, pre_filter)]
+
+    def similarity_search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        pre_filter: Optional[Dict[str, Any]] = None,
+        include_embeddings: bool = False,
+        **kwargs: Any,
+    ) -> List[List[Document]]:
+        """
+        Search several query vectors in one pass over the index.
+
+        With include_embeddings, each document carries its stored vector in
+        metadata[EMBEDDING_KEY], as MongoDBAtlasVectorSearch does.
+        """
+        filters = _parse_pre_filter(pre_filter)
+        if not include_embeddings:
+            batches = self.index.search_batch(embeddings, k=k, filters=filters)
+            return [
+                [self._to_document(chunk_id, text, metadata) for chunk_id, _, text, metadata in hits]
+                for hits in batches
+            ]
+
+        batches = self.index.search_batch(embeddings, k=k, filters=filters, include_vectors=True)
+        return [
+            [
+                self._to_document(chunk_id, text, {**metadata, EMBEDDING_KEY: vector.tolist()})
+                for chunk_id, _, text, metadata, vector in hits
+            ]
+            for hits in batches
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        pre_filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, pre_filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        pre_filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k, pre_filter)
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        index: Optional[LocalVectorIndex] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(index or LocalVectorIndex(**kwargs), embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,96 @@
+"""
+MMR Module
+
+Vectorised maximal-marginal-relevance re-ranking. Picks a diverse top-k from
+a larger candidate pool so overlapping chunks (CHUNK_OVERLAP, near-duplicate
+uploads) do not all end up in the prompt.
+"""
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def maximal_marginal_relevance(
+    query_vectors: Optional[Sequence[Sequence[float]]],
+    candidate_vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.7,
+    duplicate_threshold: Optional[float] = None,
+    relevance: Optional[Sequence[float]] = None,
+    identifiers: Optional[Callable[[int], frozenset]] = None,
+    selected: Sequence[int] = (),
+) -> List[int]:
+    """
+    Select candidate indices by maximal marginal relevance.
+
+    Each step picks the candidate maximising
+    lambda * relevance - (1 - lambda) * max similarity to those already picked,
+    where relevance is the best cosine similarity to any of the queries unless
+    given explicitly (e.g. from a fused keyword + vector ranking).
+    Similarity to the selection is updated incrementally, so the cost is
+    O(k * n * d) rather than building the full n x n matrix.
+
+    Args:
+        query_vectors: One or more query embeddings (unused if relevance is given)
+        candidate_vectors: Candidate embeddings
+        k: Maximum number of candidates to select
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by diversity
+        duplicate_threshold: Candidates at least this similar to an already
+            selected one are never picked, so fewer than k may be returned
+        relevance: Relevance of each candidate, best around 1.0
+        identifiers: Returns the identifier tokens of a candidate index; when
+            given, the duplicate cut only applies between candidates whose sets
+            are equal. Only called for pairs above duplicate_threshold
+            ("FIR 302/2023" and "FIR 318/2023" embed alike but are not duplicates)
+        selected: Indices already chosen by the caller; they count towards
+            diversity and the duplicate cut but are not returned
+
+    Returns:
+        Newly selected candidate indices in selection order
+    """
+    if len(candidate_vectors) == 0 or k <= 0:
+        return []
+
+    candidates = _unit_rows(candidate_vectors)
+    if relevance is None:
+        relevance = (candidates @ _unit_rows(query_vectors).T).max(axis=1)
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    blocked = np.zeros(len(candidates), dtype=bool)
+
+    def take(index: int) -> None:
+        nonlocal redundancy
+        similarity = candidates @ candidates[index]
+        available[index] = False
+        redundancy = np.maximum(redundancy, similarity)
+        if duplicate_threshold is not None:
+            for other in np.flatnonzero(similarity >= duplicate_threshold):
+                if identifiers is None or identifiers(int(other)) == identifiers(index):
+                    blocked[other] = True
+
+    for index in selected:
+        take(index)
+
+    picked = []
+    while len(picked) < k and available.any():
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * penalty
+        scores[~available | blocked] = -np.inf
+
+        best = int(np.argmax(scores))
+        if not np.isfinite(scores[best]):
+            break
+
+        picked.append(best)
+        take(best)
+
+    return picked
@@ -0,0 +1,132 @@
+"""
+Quantization Module
+
+Compact int8 codes for embedding vectors. Vectors are optionally projected
+onto their top principal components and every remaining dimension is
+scalar-quantised to one byte, so a 384-d float32 vector (1536 bytes) shrinks
+to 384 bytes, or 192 with PCA to half the dimensions. The codes are only
+used to shortlist candidates; final scores come from the full-precision
+vectors.
+"""
+from typing import Optional
+
+import numpy as np
+
+# Rows decoded per block while scanning, bounds the temporary float buffer
+SCAN_BLOCK = 16384
+
+
+class ScalarQuantizer:
+    """Optional PCA projection followed by per-dimension int8 quantisation."""
+
+    def __init__(self, pca_dims: Optional[int] = None, clip_percentile: float = 0.1):
+        """
+        Args:
+            pca_dims: Keep this many principal components (None keeps all
+                dimensions and only quantises)
+            clip_percentile: Per-dimension range is taken between this
+                percentile and its mirror, so a few outliers do not waste
+                the 256 levels
+        """
+        self.pca_dims = pca_dims or None
+        self.clip_percentile = clip_percentile
+        self.mean = None
+        self.components = None  # (pca_dims, dim) or None
+        self.low = None
+        self.scale = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.scale is not None
+
+    @property
+    def code_dims(self) -> int:
+        return len(self.scale)
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        centred = np.asarray(vectors, dtype=np.float32) - self.mean
+        if self.components is not None:
+            return centred @ self.components.T
+        return centred
+
+    def fit(self, sample: np.ndarray) -> "ScalarQuantizer":
+        """
+        Learn the projection and quantisation ranges from sample vectors.
+
+        Args:
+            sample: (n, dim) float32 vectors, ideally a few thousand
+
+        Returns:
+            self
+        """
+        sample = np.asarray(sample, dtype=np.float32)
+        self.mean = sample.mean(axis=0)
+        self.components = None
+        if self.pca_dims and self.pca_dims < sample.shape[1]:
+            _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+            self.components = np.ascontiguousarray(vt[:self.pca_dims], dtype=np.float32)
+
+        projected = self._project(sample)
+        low = np.percentile(projected, self.clip_percentile, axis=0)
+        high = np.percentile(projected, 100 - self.clip_percentile, axis=0)
+        self.low = low.astype(np.float32)
+        self.scale = np.maximum((high - low) / 255.0, 1e-8).astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Quantise vectors to int8 codes (values outside the range are clipped).
+
+        Args:
+            vectors: (n, dim) float vectors
+
+        Returns:
+            (n, code_dims) int8 codes
+        """
+        levels = np.rint((self._project(vectors) - self.low) / self.scale)
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+    def scores(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """
+        Approximate dot products between coded vectors and queries.
+
+        The query is folded into the quantisation scale, so the scan is a
+        single int8-by-float product per block. Terms that are constant per
+        query are dropped: the result ranks candidates but is not a cosine.
+
+        Args:
+            codes: (n, code_dims) int8 codes
+            queries: (m, dim) float32 query vectors
+
+        Returns:
+            (n, m) float32 scores
+        """
+        projected = np.asarray(queries, dtype=np.float32)
+        if self.components is not None:
+            projected = projected @ self.components.T
+        weights = (projected * self.scale).T  # (code_dims, m)
+
+        out = np.empty((len(codes), weights.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_BLOCK):
+            block = codes[start:start + SCAN_BLOCK]
+            out[start:start + len(block)] = block.astype(np.float32) @ weights
+        return out
+
+    def state(self) -> dict:
+        """Arrays needed to restore the quantiser (see from_state)."""
+        return {
+            "mean": self.mean,
+            "components": self.components if self.components is not None else np.zeros((0, 0), np.float32),
+            "low": self.low,
+            "scale": self.scale,
+        }
+
+    @classmethod
+    def from_state(cls, state) -> "ScalarQuantizer":
+        components = np.asarray(state["components"], dtype=np.float32)
+        quantizer = cls(pca_dims=len(components) if components.size else None)
+        quantizer.mean = np.asarray(state["mean"], dtype=np.float32)
+        quantizer.components = components if components.size else None
+        quantizer.low = np.asarray(state["low"], dtype=np.float32)
+        quantizer.scale = np.asarray(state["scale"], dtype=np.float32)
+        return quantizer
@@ -1,6 +1,7 @@
 """
 RAG Chain Module
 """
+import asyncio
 import os
 import sys
 from langchain_core.prompts import PromptTemplate
@@ -12,6 +13,8 @@ from langchain_huggingface import ChatHuggingFace
 # Add parent directory to path for config import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from src.context_packer import pack_context
+from src.llm_scheduler import ScheduledLLM, get_scheduler
 
 
 class RAGChain:
@@ -56,7 +59,10 @@ class RAGChain:
             max_new_tokens=config.LLM_MAX_NEW_TOKENS,
         )
         
-        return ChatHuggingFace(llm=llm_endpoint)
+        return ScheduledLLM(
+            ChatHuggingFace(llm=llm_endpoint),
+            get_scheduler("huggingface", config.HF_LLM_MAX_IN_FLIGHT),
+        )
     
     def _build_chain(self):
         """Build the RAG chain (LLM + prompt). Retrieval is handled explicitly per query."""
@@ -88,7 +94,8 @@ class RAGChain:
 
     @staticmethod
     def _format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
+        # Fill the context token budget in relevance order
+        return pack_context(docs)
 
     def _expand_queries(self, question: str):
         """Generate multiple related queries for better retrieval coverage."""
@@ -157,12 +164,15 @@ class RAGChain:
 
         return all_docs
 
-    def query(self, question: str) -> str:
+    def query(self, question: str, callbacks=None) -> str:
         """
         Query the RAG chain with a question.
         
         Args:
             question: User's question
+            callbacks: Optional LangChain callback handlers; when given the
+                answer is generated in streaming mode, so handlers receive
+                every token (on_llm_new_token) as it is produced
             
         Returns:
             Answer from the RAG chain
@@ -170,11 +180,39 @@ class RAGChain:
         try:
             docs = self._get_relevant_docs(question)
             context = self._format_docs(docs)
-            response = self.chain.invoke({"context": context, "question": question})
+            inputs = {"context": context, "question": question}
+            if callbacks:
+                return "".join(self.chain.stream(inputs, config={"callbacks": callbacks}))
+            response = self.chain.invoke(inputs)
             return response
         except Exception as e:
             return f"Error generating response: {str(e)}"
 
+    async def aquery(self, question: str, callbacks=None) -> str:
+        """
+        Async variant of query().
+
+        Retrieval runs in a worker thread; the answer is awaited through
+        the model's async client, so no thread is held while it generates.
+
+        Args:
+            question: User's question
+            callbacks: Optional LangChain callback handlers (see query())
+
+        Returns:
+            Answer from the RAG chain
+        """
+        try:
+            docs = await asyncio.to_thread(self._get_relevant_docs, question)
+            context = self._format_docs(docs)
+            inputs = {"context": context, "question": question}
+            if callbacks:
+                chunks = [chunk async for chunk in self.chain.astream(inputs, config={"callbacks": callbacks})]
+                return "".join(chunks)
+            return await self.chain.ainvoke(inputs)
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
+
     def query_with_sources(self, question: str):
         """
         Query the RAG chain and also return the retrieved source documents.
@@ -0,0 +1,105 @@
+"""
+Ranking Module
+
+Turns the ranked hit lists of one retrieval (vector search and BM25, one
+list per query) into the final chunk order: reciprocal rank fusion,
+de-duplication by content, then optional MMR re-ranking for diversity.
+MMR works on the fused order (not on query cosine alone, which would undo
+the BM25 gains) and never moves a keyword hit on one of the query's
+identifiers, such as a FIR or case number.
+It touches no store or model, so the retrieval benchmark runs exactly the
+code and settings production retrieval does.
+"""
+import os
+import sys
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Add parent directory to path for config import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.bm25_index import identifier_tokens, reciprocal_rank_fusion
+from src.mmr import maximal_marginal_relevance
+
+
+def rank_hits(
+    vector_rankings: Sequence[List[str]],
+    keyword_rankings: Sequence[List[str]],
+    texts: Dict[str, str],
+    limit: int,
+    query_vectors: Optional[Sequence[Sequence[float]]] = None,
+    vectors_for: Optional[Callable[[List[str]], Sequence[Sequence[float]]]] = None,
+    rrf_k: int = config.RRF_K,
+    fetch_multiplier: int = config.MMR_FETCH_MULTIPLIER,
+    lambda_mult: float = config.MMR_LAMBDA,
+    duplicate_threshold: Optional[float] = config.MMR_DUPLICATE_THRESHOLD,
+    queries: Sequence[str] = (),
+) -> List[str]:
+    """
+    Final order of the chunks found by one retrieval.
+
+    Args:
+        vector_rankings: Chunk keys per vector search, best first
+        keyword_rankings: Chunk keys per BM25 search, best first
+        texts: Chunk key -> text, for de-duplication by content
+        limit: Number of chunks to return
+        query_vectors: Query embeddings (unused, relevance comes from the fused ranking)
+        vectors_for: Returns the embeddings of the given chunk keys; None
+            skips MMR and returns the fused order
+        rrf_k: RRF damping constant
+        fetch_multiplier: MMR chooses from a pool this many times larger than limit
+        lambda_mult: MMR relevance/diversity trade-off
+        duplicate_threshold: Cosine similarity at which MMR drops a chunk
+            carrying the same identifiers as one already picked
+        queries: Query texts; BM25 hits sharing an identifier with them keep
+            their fused position
+
+    Returns:
+        Chunk keys, best first
+    """
+    fused = []
+    fused_scores = []
+    seen_contents = set()
+    for key, score in reciprocal_rank_fusion(list(vector_rankings) + list(keyword_rankings), k=rrf_k, with_scores=True):
+        if texts[key] not in seen_contents:
+            seen_contents.add(texts[key])
+            fused.append(key)
+            fused_scores.append(score)
+
+    if vectors_for is None:
+        return fused[:limit]
+
+    pool = fused[:limit * fetch_multiplier]
+    if len(pool) <= 1:
+        return pool[:limit]
+
+    # Fused score rescaled to [0, 1] so it weighs like a cosine similarity
+    scores = fused_scores[:len(pool)]
+    spread = (scores[0] - scores[-1]) or 1.0
+    relevance = [(score - scores[-1]) / spread for score in scores]
+
+    # Tokenized on demand: only pinning candidates and near-duplicate pairs need it
+    identifiers = lru_cache(maxsize=None)(lambda i: identifier_tokens(texts[pool[i]]))
+    query_identifiers = frozenset().union(*(identifier_tokens(q) for q in queries))
+    keyword_keys = {key for ranking in keyword_rankings for key in ranking}
+    pinned = [
+        i for i in range(min(limit, len(pool)))
+        if query_identifiers and pool[i] in keyword_keys and identifiers(i) & query_identifiers
+    ]
+
+    picked = iter(maximal_marginal_relevance(
+        query_vectors,
+        vectors_for(pool),
+        limit - len(pinned),
+        lambda_mult=lambda_mult,
+        duplicate_threshold=duplicate_threshold,
+        relevance=relevance,
+        identifiers=identifiers,
+        selected=pinned,
+    ))
+    order = []
+    for position in range(limit):
+        index = position if position in pinned else next(picked, None)
+        if index is not None:
+            order.append(pool[index])
+    return order
@@ -0,0 +1,242 @@
+"""
+Single-Flight Module
+
+Coalesces identical calls that are in flight at the same time. The first
+caller for a fingerprint (the leader) does the work. Callers that arrive
+with the same fingerprint before it finishes wait for the leader and get
+its result, or its exception. Nothing is kept once the call completes, so
+this only removes duplicate concurrent work; caching is left to the
+answer, LLM and embedding caches.
+
+Synchronous and asyncio callers share the same groups: a coroutine can
+follow a call led by a thread and the other way round. A leader that is
+cancelled (its client went away) does not pass the cancellation on: its
+followers start over and one of them runs the work.
+"""
+import asyncio
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import threading
+from typing import Any, Callable, Optional
+
+
+def fingerprint(*parts) -> str:
+    """
+    Stable key for a request.
+
+    Args:
+        parts: JSON-serialisable values (anything else is keyed by str())
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "abandoned", "followers", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False  # Leader cancelled; followers must retry
+        self.followers = 0
+        self.waiters = []  # (loop, future) of asyncio followers
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        # Containers are copied so one caller cannot mutate another's result
+        return copy.copy(self.result)
+
+
+class SingleFlight:
+    """A group of in-flight calls, keyed by fingerprint."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._leaders = 0
+        self._coalesced = 0
+        self._abandoned = 0
+
+    def _join(self, key: str, loop=None):
+        """(call, leader, future) for a new caller; future only for asyncio followers."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._leaders += 1
+                return call, True, None
+            call.followers += 1
+            self._coalesced += 1
+            future = None
+            if loop is not None:
+                future = loop.create_future()
+                call.waiters.append((loop, future))
+            return call, False, future
+
+    def _complete(self, key: str, call: _Call):
+        with self._lock:
+            self._calls.pop(key, None)
+            if call.abandoned:
+                self._abandoned += 1
+            waiters = list(call.waiters)
+        call.done.set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs), unless a call with the same key is running,
+        in which case wait for that call and return its result.
+
+        Args:
+            key: Request fingerprint
+            fn: Work to run when this caller leads
+
+        Returns:
+            The result (a shallow copy of it for followers)
+        """
+        while True:
+            call, leader, _ = self._join(key)
+            if leader:
+                break
+            call.done.wait()
+            if not call.abandoned:
+                return call.outcome()
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._complete(key, call)
+
+    async def do_async(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Async counterpart of do(): fn is a coroutine function, and
+        followers wait without holding a thread.
+
+        Args:
+            key: Request fingerprint
+            fn: Coroutine function run when this caller leads
+
+        Returns:
+            The result (a shallow copy of it for followers)
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            call, leader, future = self._join(key, loop)
+            if leader:
+                break
+            await future
+            if not call.abandoned:
+                return call.outcome()
+
+        try:
+            call.result = await fn(*args, **kwargs)
+            return call.result
+        except asyncio.CancelledError:
+            # Only this caller was cancelled; the others run the work again
+            call.abandoned = True
+            raise
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._complete(key, call)
+
+    def stats(self) -> dict:
+        """Leader/coalesced/abandoned counts and calls currently in flight."""
+        with self._lock:
+            return {
+                "leaders": self._leaders,
+                "coalesced": self._coalesced,
+                "abandoned": self._abandoned,
+                "in_flight": len(self._calls),
+            }
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """
+    Get the process-wide group for a kind of call, creating it on first use.
+
+    Args:
+        name: Group name (e.g. "llm", "retrieval")
+
+    Returns:
+        Shared SingleFlight instance
+    """
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def single_flight_stats() -> dict:
+    """Metrics of every group created so far, keyed by name."""
+    with _groups_lock:
+        groups = dict(_groups)
+    return {name: group.stats() for name, group in groups.items()}
+
+
+def single_flight(name: str, key: Optional[Callable[..., Any]] = None):
+    """
+    Decorator coalescing concurrent calls that have the same arguments.
+    Works on plain and coroutine functions.
+
+    Args:
+        name: Group the calls belong to
+        key: Optional function taking the call's arguments and returning the
+            values to fingerprint, or None to run that call on its own.
+            Defaults to all arguments (with defaults applied).
+    """
+    group = get_single_flight(name)
+
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        def call_key(args, kwargs):
+            if key is not None:
+                parts = key(*args, **kwargs)
+            else:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                parts = bound.arguments
+            return None if parts is None else fingerprint(fn.__qualname__, parts)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                call = call_key(args, kwargs)
+                if call is None:
+                    return await fn(*args, **kwargs)
+                return await group.do_async(call, fn, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            call = call_key(args, kwargs)
+            if call is None:
+                return fn(*args, **kwargs)
+            return group.do(call, fn, *args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,157 @@
+"""
+Streaming Chunker Module
+
+Generator-based chunking for very large documents. Text is split window by
+window, so only one window of chunks exists at a time, and a bounded
+prefetch queue lets chunking run ahead of embedding by a fixed number of
+batches. Memory stays flat regardless of document size and the first
+batches can be stored before the rest of the document has been split.
+"""
+import queue
+import threading
+from typing import Iterable, Iterator, List, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+
+# Preferred cut points between windows, best first
+_WINDOW_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+
+def _pieces(source: Union[str, Iterable[str]], size: int) -> Iterator[str]:
+    if isinstance(source, str):
+        for start in range(0, len(source), size):
+            yield source[start:start + size]
+    else:
+        yield from source
+
+
+def _cut_point(buffer: str, limit: int) -> int:
+    for separator in _WINDOW_SEPARATORS:
+        cut = buffer.rfind(separator, limit // 2, limit)
+        if cut != -1:
+            return cut + len(separator)
+    return limit
+
+
+def iter_text_chunks(
+    source: Union[str, Iterable[str]],
+    splitter,
+    window_chars: int = 64_000,
+) -> Iterator[Tuple[str, int]]:
+    """
+    Lazily split a document into chunks.
+
+    The text is consumed in windows of about `window_chars` characters, cut
+    at a paragraph, line, sentence or word boundary. Each window is split
+    with the given text splitter, and consecutive windows overlap by the
+    splitter's chunk overlap so no context is lost at window edges.
+
+    Args:
+        source: Full text, or an iterable of text pieces (e.g. a file)
+        splitter: LangChain text splitter (its split_text is used)
+        window_chars: Approximate characters split at a time
+
+    Yields:
+        (chunk_text, start_index) with start_index the offset in the document
+    """
+    overlap = getattr(splitter, "_chunk_overlap", 0)
+    buffer = ""
+    offset = 0  # Document offset of buffer[0]
+
+    def split(window: str, window_offset: int):
+        search_from = 0
+        for chunk in splitter.split_text(window):
+            found = window.find(chunk, search_from)
+            start = found if found != -1 else search_from
+            search_from = start + 1
+            yield chunk, window_offset + start
+
+    for piece in _pieces(source, window_chars):
+        buffer += piece
+        while len(buffer) >= window_chars:
+            cut = _cut_point(buffer, window_chars)
+            yield from split(buffer[:cut], offset)
+
+            # Restart the next window a little before the cut, on a word boundary
+            restart = buffer.find(" ", max(0, cut - overlap), cut)
+            restart = restart + 1 if restart != -1 else cut
+            buffer = buffer[restart:]
+            offset += restart
+
+    if buffer.strip():
+        yield from split(buffer, offset)
+
+
+def iter_batches(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Group an iterable into lists of at most `size` items.
+
+    Args:
+        items: Any iterable
+        size: Batch size
+
+    Yields:
+        Lists of items
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_DONE = object()
+
+
+def prefetch(iterator: Iterable[T], max_pending: int = 2) -> Iterator[T]:
+    """
+    Run an iterator in a background thread, at most `max_pending` items ahead.
+
+    The producer blocks once the queue is full (backpressure), so a fast
+    chunker never piles up batches while a slow embedder catches up.
+    Exceptions raised by the producer are re-raised in the consumer.
+
+    Args:
+        iterator: Items to produce
+        max_pending: Queue bound
+
+    Yields:
+        The iterator's items, in order
+    """
+    pending = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(e)
+
+    worker = threading.Thread(target=produce, name="chunk-prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = pending.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Unblock the producer if the consumer stops early
+        stop.set()
@@ -1,8 +1,9 @@
 """
 Utility functions for YouTube RAG Chatbot
 """
+import hashlib
 import re
-from typing import Optional
+from typing import List, Optional
 
 
 def extract_video_id(url_or_id: str) -> Optional[str]:
@@ -52,3 +53,100 @@ def validate_video_id(video_id: str) -> bool:
     """
     return bool(re.match(r'^[a-zA-Z0-9_-]{11}$', video_id))
 
+
+
+def extract_video_ids(text: str) -> List[str]:
+    """
+    Extract every YouTube video ID from a block of text.
+
+    Accepts a newline/comma separated list of URLs or IDs, or a playlist
+    export (HTML, JSON or plain text). When the text contains YouTube URLs
+    only those are used; bare 11-character IDs are accepted otherwise, so
+    ordinary 11-letter words in a page dump are not mistaken for videos.
+
+    Args:
+        text: Free-form text containing YouTube URLs or video IDs
+
+    Returns:
+        Unique video IDs in the order they first appear
+    """
+    if not text:
+        return []
+
+    url_pattern = (
+        r'(?:youtube\.com\/watch\?(?:[^\s"\'<>]*?&(?:amp;)?)?v=|youtu\.be\/|'
+        r'youtube\.com\/embed\/|youtube\.com\/v\/|youtube\.com\/shorts\/)([a-zA-Z0-9_-]{11})'
+    )
+    candidates = re.findall(url_pattern, text)
+
+    if not candidates:
+        # JSON playlist exports carry bare IDs under a "videoId" key
+        candidates = re.findall(r'"videoId"\s*:\s*"([a-zA-Z0-9_-]{11})"', text)
+
+    if not candidates:
+        candidates = [
+            token for token in re.split(r'[\s,;]+', text)
+            if validate_video_id(token)
+        ]
+
+    return list(dict.fromkeys(candidates))
+
+
+def content_hash(text: str) -> str:
+    """
+    Stable hash of chunk content.
+    
+    Args:
+        text: Chunk text
+        
+    Returns:
+        Hex SHA-1 digest of the stripped text
+    """
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+
+
+class ChunkIdGenerator:
+    """
+    Deterministic chunk IDs for one source document, assigned in order.
+    
+    An ID combines the source, the chunk's content hash and its occurrence
+    number among identical chunks of the same source. The character offset
+    is deliberately left out: an edit near the top of a document shifts
+    every later offset, and keying on it would make every chunk look new.
+    Re-splitting an unchanged document therefore reproduces the same IDs,
+    and an edited one only changes the IDs of chunks whose text changed.
+    
+    Chunks may be fed in several calls (streaming ingest); occurrence
+    numbers carry over between calls.
+    """
+    
+    def __init__(self, source_id: str):
+        """
+        Args:
+            source_id: Identifies the document (e.g. video ID, "user:file")
+        """
+        self.source_key = hashlib.sha1(source_id.encode("utf-8")).hexdigest()[:12]
+        self._seen = {}
+    
+    def __call__(self, texts: List[str]) -> List[str]:
+        ids = []
+        for text in texts:
+            digest = content_hash(text)[:20]
+            occurrence = self._seen.get(digest, 0)
+            self._seen[digest] = occurrence + 1
+            ids.append(f"{self.source_key}-{digest}-{occurrence}")
+        return ids
+
+
+def make_chunk_ids(source_id: str, texts: List[str]) -> List[str]:
+    """
+    Build deterministic IDs for the chunks of one source document.
+    
+    Args:
+        source_id: Identifies the document (e.g. video ID, "user:file")
+        texts: Chunk texts in document order
+        
+    Returns:
+        One ID per chunk (see ChunkIdGenerator)
+    """
+    return ChunkIdGenerator(source_id)(texts)
@@ -3,10 +3,8 @@ Vector Store Module using ChromaDB
 """
 import os
 import sys
+import zlib
 from typing import List, Optional
-import chromadb
-from chromadb.config import Settings
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
@@ -14,83 +12,222 @@ from langchain_core.documents import Document
 # Add parent directory to path for config import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from src.answer_cache import invalidate_context
+from src.context_packer import count_tokens
+from src.embeddings import get_chroma_client, get_embedding_model
+from src.utils import make_chunk_ids
+
+
+def shard_collection_name(video_id: str, shard_count: int = None) -> str:
+    """
+    Name of the consolidated collection that holds a given video.
+    
+    Args:
+        video_id: YouTube video ID (or other context id)
+        shard_count: Number of shards (default from config)
+        
+    Returns:
+        Collection name
+    """
+    if shard_count is None:
+        shard_count = config.CHROMA_SHARD_COUNT
+    if shard_count <= 1:
+        return config.CHROMA_COLLECTION_NAME
+    shard = zlib.crc32(video_id.encode("utf-8")) % shard_count
+    return f"{config.CHROMA_COLLECTION_NAME}_shard{shard}"
 
 
 class VectorStoreManager:
     """Manages ChromaDB vector store for YouTube transcripts."""
     
-    def __init__(self, video_id: str):
+    def __init__(self, video_id: str, embeddings=None, client=None, user_id: str = None):
         """
         Initialize vector store manager for a specific video.
         
+        In "per_video" storage mode every video gets its own collection. In
+        "consolidated" mode videos share one (or a few sharded) collections
+        and are told apart by `video_id` / `user_id` metadata filters.
+        
         Args:
             video_id: YouTube video ID
+            embeddings: Optional embedding model (default: shared process-wide model)
+            client: Optional ChromaDB client (default: shared process-wide client)
+            user_id: Optional owner, stored as chunk metadata
         """
         self.video_id = video_id
-        self.collection_name = f"{config.CHROMA_COLLECTION_NAME}_{video_id}"
+        self.user_id = user_id
+        self.consolidated = config.CHROMA_STORAGE_MODE == "consolidated"
+        if self.consolidated:
+            self.collection_name = shard_collection_name(video_id)
+        else:
+            self.collection_name = f"{config.CHROMA_COLLECTION_NAME}_{video_id}"
         self.persist_directory = config.CHROMA_PERSIST_DIRECTORY
         
-        # Initialize embeddings
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=config.HUGGINGFACE_EMBEDDING_MODEL,
-            encode_kwargs={"normalize_embeddings": True}
-        )
+        # Shared embeddings (loaded once per process)
+        self.embeddings = embeddings or get_embedding_model(normalize=True)
         
         # Initialize text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=config.CHUNK_SIZE,
-            chunk_overlap=config.CHUNK_OVERLAP
+            chunk_overlap=config.CHUNK_OVERLAP,
+            add_start_index=True
         )
         
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
-            path=self.persist_directory,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        # Shared ChromaDB client
+        self.client = client or get_chroma_client()
         
         self.vector_store = None
+        self.last_upsert = None
     
-    def create_vector_store(self, transcript_text: str) -> Chroma:
+    @property
+    def where(self) -> dict:
+        """Metadata filter selecting this video's chunks in a shared collection."""
+        return {"video_id": self.video_id}
+    
+    def split_transcript(self, transcript_text: str) -> List[Document]:
         """
-        Create vector store from transcript text.
+        Split transcript text into chunk documents tagged with video metadata.
         
         Args:
             transcript_text: Full transcript text
             
         Returns:
-            Chroma vector store instance
+            List of chunk documents
         """
-        # Split transcript into chunks
         documents = self.text_splitter.create_documents([transcript_text])
         
-        # Add metadata to documents
         for i, doc in enumerate(documents):
             doc.metadata = {
                 'video_id': self.video_id,
                 'chunk_index': i,
+                'start_index': doc.metadata.get('start_index', -1),
+                'token_count': count_tokens(doc.page_content),
                 'source': 'youtube_transcript'
             }
+            if self.user_id:
+                doc.metadata['user_id'] = self.user_id
         
-        # Create or get collection
-        try:
-            # Try to get existing collection
-            collection = self.client.get_collection(name=self.collection_name)
-            # If exists, delete it to recreate with new data
-            self.client.delete_collection(name=self.collection_name)
-        except:
-            pass
-        
-        # Create vector store
-        self.vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
+        return documents
+    
+    def _open_store(self) -> Chroma:
+        return Chroma(
             collection_name=self.collection_name,
+            embedding_function=self.embeddings,
             persist_directory=self.persist_directory,
             client=self.client
         )
+    
+    def _stored_chunks(self, collection) -> dict:
+        """Chunk id -> metadata for everything this video currently has stored."""
+        if self.consolidated:
+            stored = collection.get(where=self.where, include=["metadatas"])
+        else:
+            stored = collection.get(include=["metadatas"])
+        return dict(zip(stored["ids"], stored["metadatas"]))
+    
+    def plan_upsert(self, documents: List[Document]) -> dict:
+        """
+        Diff chunk documents against what is stored for this video.
         
+        Every document is given a deterministic `chunk_id` (see
+        make_chunk_ids), so only chunks whose text is new need embedding.
+        
+        Args:
+            documents: Chunk documents from split_transcript
+            
+        Returns:
+            Dictionary with new_ids/new_documents to embed and insert,
+            stale_ids to delete, and moved (id -> metadata) for unchanged
+            chunks whose position metadata shifted
+        """
+        ids = make_chunk_ids(self.video_id, [doc.page_content for doc in documents])
+        for doc, chunk_id in zip(documents, ids):
+            doc.metadata['chunk_id'] = chunk_id
+        
+        collection = self.client.get_or_create_collection(
+            name=self.collection_name,
+            embedding_function=None
+        )
+        stored = self._stored_chunks(collection)
+        
+        plan = {"new_ids": [], "new_documents": [], "moved": {}, "unchanged": 0}
+        for chunk_id, doc in zip(ids, documents):
+            if chunk_id not in stored:
+                plan["new_ids"].append(chunk_id)
+                plan["new_documents"].append(doc)
+            else:
+                plan["unchanged"] += 1
+                if stored[chunk_id] != doc.metadata:
+                    plan["moved"][chunk_id] = doc.metadata
+        
+        wanted = set(ids)
+        plan["stale_ids"] = [chunk_id for chunk_id in stored if chunk_id not in wanted]
+        return plan
+    
+    def apply_upsert(self, plan: dict, vectors: List[List[float]]) -> Chroma:
+        """
+        Write a plan from plan_upsert.
+        
+        Args:
+            plan: Result of plan_upsert
+            vectors: One embedding per plan["new_documents"], in order
+            
+        Returns:
+            Chroma vector store instance
+        """
+        collection = self.client.get_or_create_collection(
+            name=self.collection_name,
+            embedding_function=None
+        )
+        
+        if plan["stale_ids"]:
+            collection.delete(ids=plan["stale_ids"])
+        if plan["new_ids"]:
+            collection.upsert(
+                ids=plan["new_ids"],
+                embeddings=vectors,
+                documents=[doc.page_content for doc in plan["new_documents"]],
+                metadatas=[doc.metadata for doc in plan["new_documents"]]
+            )
+        if plan["moved"]:
+            # Metadata-only update: the stored embedding is still valid
+            collection.update(
+                ids=list(plan["moved"].keys()),
+                metadatas=list(plan["moved"].values())
+            )
+        
+        self.last_upsert = {
+            "added": len(plan["new_ids"]),
+            "deleted": len(plan["stale_ids"]),
+            "unchanged": plan["unchanged"],
+        }
+        if plan["new_ids"] or plan["stale_ids"]:
+            invalidate_context(self.video_id)
+        print(f"✔ {self.video_id}: +{self.last_upsert['added']} "
+              f"-{self.last_upsert['deleted']} ={self.last_upsert['unchanged']} chunks")
+        
+        self.vector_store = self._open_store()
         return self.vector_store
     
+    def create_vector_store(self, transcript_text: str) -> Chroma:
+        """
+        Create or incrementally update the vector store from transcript text.
+        
+        Chunks that are already stored are left alone, chunks that no longer
+        appear are deleted, and only new chunks are embedded.
+        
+        Args:
+            transcript_text: Full transcript text
+            
+        Returns:
+            Chroma vector store instance
+        """
+        documents = self.split_transcript(transcript_text)
+        plan = self.plan_upsert(documents)
+        new_texts = [doc.page_content for doc in plan["new_documents"]]
+        vectors = self.embeddings.embed_documents(new_texts) if new_texts else []
+        return self.apply_upsert(plan, vectors)
+    
     def load_vector_store(self) -> Optional[Chroma]:
         """
         Load existing vector store if it exists.
@@ -102,13 +239,12 @@ class VectorStoreManager:
             # Check if collection exists
             collection = self.client.get_collection(name=self.collection_name)
             
+            # In a shared collection, the video must have at least one chunk
+            if self.consolidated and not collection.get(where=self.where, limit=1)["ids"]:
+                return None
+            
             # Load vector store
-            self.vector_store = Chroma(
-                collection_name=self.collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=self.persist_directory,
-                client=self.client
-            )
+            self.vector_store = self._open_store()
             
             return self.vector_store
         except:
@@ -145,6 +281,9 @@ class VectorStoreManager:
             else:
                 search_kwargs = {"k": k}
 
+        if self.consolidated:
+            search_kwargs = {**search_kwargs, "filter": self.where}
+
         return self.vector_store.as_retriever(
             search_type=search_type,
             search_kwargs=search_kwargs,
@@ -153,8 +292,11 @@ class VectorStoreManager:
     def delete_vector_store(self):
         """Delete the vector store for this video."""
         try:
-            self.client.delete_collection(name=self.collection_name)
+            if self.consolidated:
+                self.client.get_collection(name=self.collection_name).delete(where=self.where)
+            else:
+                self.client.delete_collection(name=self.collection_name)
             self.vector_store = None
+            invalidate_context(self.video_id)
         except:
             pass
-